@@ -1,15 +1,20 @@
-from fastapi import APIRouter, HTTPException, Response
-from typing import List, Dict, Optional
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from typing import Any, List, Dict, Optional
 import logging
+import asyncio
 from ..parser.models import SearchRequest, SearchResponse, SearchResult
 from ..parser.parser_service import ParserService
 from ..parser.playwright_runner import PlaywrightRunner
+from ..parser.storage import get_storage
+from ..parser.async_io import file_io
+from ..db.session import db_metrics
+from ..parser.export import (MEDIA_TYPES, export_snapshot, pinned_snapshot, export_etag, export_stream,
+                             parse_range, byte_range, stream_length, known_length, remember_length, measured)
 from ..parser.config.parser_config import config
 from pydantic import BaseModel, validator
 import os
 from enum import Enum
-from fastapi.responses import FileResponse
-import json
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/api/parser", tags=["parser"])
@@ -17,6 +22,8 @@ router = APIRouter(prefix="/api/parser", tags=["parser"])
 # Global instances
 playwright_runner = None
 parser_service = ParserService()
+parquet_export_task = None
+retention_task = None
 
 class SearchRequest(BaseModel):
     query: str
@@ -44,7 +51,7 @@ class SearchRequest(BaseModel):
         return v
 
 class SearchResponse(BaseModel):
-    results: List[Dict[str, str]]
+    results: List[Dict[str, Any]]
     total: int
     cached: int
     new: int
@@ -52,7 +59,13 @@ class SearchResponse(BaseModel):
     suppliers: Optional[int] = 0
     others: Optional[int] = 0
     duplicates_removed: Optional[int] = 0
+    entities_collapsed: Optional[int] = 0
+    run_id: Optional[str] = None
+    timings: Optional[Dict[str, float]] = None
     errors: Optional[int] = 0
+    pending: Optional[int] = 0
+    fetches_avoided: Optional[int] = 0
+    fetches_avoided_ratio: Optional[float] = 0.0
     saved_to_file: Optional[str] = None
 
 class FileFormat(str, Enum):
@@ -60,6 +73,11 @@ class FileFormat(str, Enum):
     csv = "csv"
     txt = "txt"
 
+class ExportFormat(str, Enum):
+    ndjson = "ndjson"
+    csv = "csv"
+    xlsx = "xlsx"
+
 class SaveRequest(BaseModel):
     query: str
     file_format: FileFormat = FileFormat.json
@@ -70,6 +88,18 @@ async def startup_event():
     global playwright_runner
     playwright_runner = PlaywrightRunner(config)
     await playwright_runner.initialize()
+    # Сверяем индекс файлов результатов с диском (файлы, записанные до запуска)
+    await parser_service.results_manifest.reconcile()
+    # Периодическая дозапись новых результатов в Parquet
+    global parquet_export_task
+    if parser_service.config.parquet_export_interval > 0:
+        parquet_export_task = asyncio.create_task(
+            parser_service.parquet_exporter.run_periodically(parser_service.config.parquet_export_interval))
+    # Периодическая очистка директорий по бюджетам размера и срока хранения
+    global retention_task
+    if parser_service.config.retention_interval > 0:
+        retention_task = asyncio.create_task(
+            parser_service.retention.run_periodically(parser_service.config.retention_interval))
     logger.info("✅ Parser service initialized")
 
 @router.on_event("shutdown")
@@ -78,6 +108,11 @@ async def shutdown_event():
     global playwright_runner
     if playwright_runner:
         await playwright_runner.cleanup()
+    if parquet_export_task:
+        parquet_export_task.cancel()
+    if retention_task:
+        retention_task.cancel()
+    await parser_service.results_manifest.close()
     logger.info("✅ Parser service cleaned up")
 
 @router.post("/search", response_model=SearchResponse)
@@ -197,99 +232,53 @@ async def save_last_search(request: SaveRequest):
         logger.exception("Полный стек ошибки:")
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.get("/search/results/{filename}")
-async def get_saved_results(filename: str):
-    """Возвращает сохраненные результаты поиска.
-    
-    Args:
-        filename: Имя файла с результатами
-            
-    Returns:
-        FileResponse: Файл с результатами
-    """
+async def _list_results(categories: List[Optional[str]], query: Optional[str], file_format: Optional[FileFormat],
+                        sort: str, order: str, cursor: Optional[str], limit: int) -> Dict[str, Any]:
+    """Возвращает страницу файлов результатов из индекса (см. ResultsManifest.list)."""
     try:
-        logger.info(f"Получен запрос на получение файла: {filename}")
-        
-        # Проверяем наличие файла
-        results_dir = parser_service.results_dir
-        file_path = os.path.join(results_dir, filename)
-        
-        if not os.path.exists(file_path):
-            raise HTTPException(status_code=404, detail=f"Файл {filename} не найден")
-        
-        logger.info(f"Файл найден: {file_path}")
-        
-        # Определяем MIME-тип
-        if filename.endswith(".json"):
-            media_type = "application/json"
-        elif filename.endswith(".csv"):
-            media_type = "text/csv"
-        elif filename.endswith(".txt"):
-            media_type = "text/plain"
-        else:
-            media_type = "application/octet-stream"
-        
-        # Возвращаем файл для скачивания
-        return FileResponse(
-            path=file_path,
-            filename=filename,
-            media_type=media_type
+        page = await parser_service.results_manifest.list(
+            categories=categories,
+            query=query,
+            file_format=file_format.value if file_format else None,
+            sort=sort,
+            descending=(order == "desc"),
+            cursor=cursor,
+            limit=limit
         )
-        
-    except Exception as e:
-        logger.error(f"Ошибка при получении файла: {str(e)}")
-        logger.exception("Полный стек ошибки:")
-        raise HTTPException(status_code=500, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {
+        "count": len(page["files"]),
+        "total": page["total"],
+        "next_cursor": page["next_cursor"],
+        "files": page["files"]
+    }
 
 @router.get("/search/results")
-async def list_saved_results():
+async def list_saved_results(query: Optional[str] = None, format: Optional[FileFormat] = None,
+                            sort: str = Query("created", pattern="^(created|size|count|query|filename)$"),
+                            order: str = Query("desc", pattern="^(asc|desc)$"), cursor: Optional[str] = None,
+                            limit: int = Query(100, ge=1, le=1000)):
     """Возвращает список сохраненных результатов поиска.
     
+    Список строится из индекса файлов (ResultsManifest), без чтения файлов на каждый запрос.
+    
+    Args:
+        query: Подстрока поискового запроса
+        format: Формат файла (json, csv, txt)
+        sort: Поле сортировки (created, size, count, query, filename)
+        order: Порядок сортировки (asc, desc)
+        cursor: Курсор следующей страницы (next_cursor из предыдущего ответа)
+        limit: Размер страницы
+    
     Returns:
-        List[Dict]: Список файлов с результатами
+        Dict: count, total, next_cursor и files
     """
     try:
         logger.info("Получен запрос на получение списка файлов с результатами")
-        
-        # Получаем список файлов
-        results_dir = parser_service.results_dir
-        files = []
-        
-        for filename in os.listdir(results_dir):
-            if filename.endswith((".json", ".csv", ".txt")):
-                file_path = os.path.join(results_dir, filename)
-                
-                # Получаем информацию о файле
-                file_info = {
-                    "filename": filename,
-                    "size": os.path.getsize(file_path),
-                    "created": os.path.getctime(file_path),
-                    "format": filename.split(".")[-1]
-                }
-                
-                # Если это JSON, извлекаем информацию о запросе
-                if filename.endswith(".json"):
-                    try:
-                        with open(file_path, "r", encoding="utf-8") as f:
-                            data = json.load(f)
-                            file_info["query"] = data.get("query", "")
-                            file_info["count"] = data.get("count", 0)
-                            file_info["timestamp"] = data.get("timestamp", "")
-                    except:
-                        pass
-                
-                files.append(file_info)
-        
-        # Сортируем по времени создания (новые сначала)
-        files.sort(key=lambda x: x["created"], reverse=True)
-        
-        logger.info(f"Найдено файлов: {len(files)}")
-        
-        return {
-            "count": len(files),
-            "files": files
-        }
-        
+        return await _list_results([None], query, format, sort, order, cursor, limit)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Ошибка при получении списка файлов: {str(e)}")
         logger.exception("Полный стек ошибки:")
@@ -302,202 +291,88 @@ async def get_search_mode():
     return {"mode": current_mode}
 
 @router.get("/search/results/suppliers")
-async def list_supplier_results():
+async def list_supplier_results(query: Optional[str] = None, format: Optional[FileFormat] = None,
+                               sort: str = Query("created", pattern="^(created|size|count|query|filename)$"),
+                               order: str = Query("desc", pattern="^(asc|desc)$"), cursor: Optional[str] = None,
+                               limit: int = Query(100, ge=1, le=1000)):
     """Возвращает список сохраненных результатов поиска поставщиков.
     
+    Список строится из индекса файлов (ResultsManifest), без чтения файлов на каждый запрос.
+    
+    Args:
+        query: Подстрока поискового запроса
+        format: Формат файла (json, csv, txt)
+        sort: Поле сортировки (created, size, count, query, filename)
+        order: Порядок сортировки (asc, desc)
+        cursor: Курсор следующей страницы (next_cursor из предыдущего ответа)
+        limit: Размер страницы
+    
     Returns:
-        Dict: Список файлов с результатами поставщиков
+        Dict: count, total, next_cursor и files
     """
     try:
         logger.info("Получен запрос на получение списка файлов с результатами поставщиков")
-        
-        # Получаем список файлов из директории suppliers
-        results_dir = os.path.join(parser_service.results_dir, "suppliers")
-        files = []
-        
-        if os.path.exists(results_dir):
-            for filename in os.listdir(results_dir):
-                if filename.endswith((".json", ".csv", ".txt")):
-                    file_path = os.path.join(results_dir, filename)
-                    
-                    # Получаем информацию о файле
-                    file_info = {
-                        "filename": filename,
-                        "size": os.path.getsize(file_path),
-                        "created": os.path.getctime(file_path),
-                        "format": filename.split(".")[-1],
-                        "category": "suppliers"
-                    }
-                    
-                    # Если это JSON, извлекаем информацию о запросе
-                    if filename.endswith(".json"):
-                        try:
-                            with open(file_path, "r", encoding="utf-8") as f:
-                                data = json.load(f)
-                                file_info["query"] = data.get("query", "")
-                                file_info["count"] = data.get("count", 0)
-                                file_info["timestamp"] = data.get("timestamp", "")
-                        except:
-                            pass
-                    
-                    files.append(file_info)
-        
-        # Сортируем по времени создания (новые сначала)
-        files.sort(key=lambda x: x["created"], reverse=True)
-        
-        logger.info(f"Найдено файлов поставщиков: {len(files)}")
-        
-        return {
-            "count": len(files),
-            "files": files
-        }
-        
+        return await _list_results(["suppliers"], query, format, sort, order, cursor, limit)
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Ошибка при получении списка файлов поставщиков: {str(e)}")
+        logger.error(f"Ошибка при получении списка файлов: {str(e)}")
         logger.exception("Полный стек ошибки:")
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/search/results/others")
-async def list_other_results():
+async def list_other_results(query: Optional[str] = None, format: Optional[FileFormat] = None,
+                            sort: str = Query("created", pattern="^(created|size|count|query|filename)$"),
+                            order: str = Query("desc", pattern="^(asc|desc)$"), cursor: Optional[str] = None,
+                            limit: int = Query(100, ge=1, le=1000)):
     """Возвращает список сохраненных результатов поиска других сайтов.
     
+    Список строится из индекса файлов (ResultsManifest), без чтения файлов на каждый запрос.
+    
+    Args:
+        query: Подстрока поискового запроса
+        format: Формат файла (json, csv, txt)
+        sort: Поле сортировки (created, size, count, query, filename)
+        order: Порядок сортировки (asc, desc)
+        cursor: Курсор следующей страницы (next_cursor из предыдущего ответа)
+        limit: Размер страницы
+    
     Returns:
-        Dict: Список файлов с результатами других сайтов
+        Dict: count, total, next_cursor и files
     """
     try:
         logger.info("Получен запрос на получение списка файлов с результатами других сайтов")
-        
-        # Получаем список файлов из директории others
-        results_dir = os.path.join(parser_service.results_dir, "others")
-        files = []
-        
-        if os.path.exists(results_dir):
-            for filename in os.listdir(results_dir):
-                if filename.endswith((".json", ".csv", ".txt")):
-                    file_path = os.path.join(results_dir, filename)
-                    
-                    # Получаем информацию о файле
-                    file_info = {
-                        "filename": filename,
-                        "size": os.path.getsize(file_path),
-                        "created": os.path.getctime(file_path),
-                        "format": filename.split(".")[-1],
-                        "category": "others"
-                    }
-                    
-                    # Если это JSON, извлекаем информацию о запросе
-                    if filename.endswith(".json"):
-                        try:
-                            with open(file_path, "r", encoding="utf-8") as f:
-                                data = json.load(f)
-                                file_info["query"] = data.get("query", "")
-                                file_info["count"] = data.get("count", 0)
-                                file_info["timestamp"] = data.get("timestamp", "")
-                        except:
-                            pass
-                    
-                    files.append(file_info)
-        
-        # Сортируем по времени создания (новые сначала)
-        files.sort(key=lambda x: x["created"], reverse=True)
-        
-        logger.info(f"Найдено файлов других сайтов: {len(files)}")
-        
-        return {
-            "count": len(files),
-            "files": files
-        }
-        
+        return await _list_results(["others"], query, format, sort, order, cursor, limit)
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Ошибка при получении списка файлов других сайтов: {str(e)}")
+        logger.error(f"Ошибка при получении списка файлов: {str(e)}")
         logger.exception("Полный стек ошибки:")
         raise HTTPException(status_code=500, detail=str(e))
-        
+
 @router.get("/search/results/classified")
-async def list_classified_results():
-    """Возвращает список всех классифицированных результатов поиска.
+async def list_classified_results(query: Optional[str] = None, format: Optional[FileFormat] = None,
+                                  sort: str = Query("created", pattern="^(created|size|count|query|filename)$"),
+                                  order: str = Query("desc", pattern="^(asc|desc)$"), cursor: Optional[str] = None,
+                                  limit: int = Query(100, ge=1, le=1000)):
+    """Возвращает список всех классифицированных результатов поиска, сгруппированных по запросам.
+    
+    Группы queries строятся по файлам текущей страницы.
     
     Returns:
-        Dict: Список файлов с классифицированными результатами
+        Dict: count, total, next_cursor, queries и files
     """
     try:
         logger.info("Получен запрос на получение списка всех классифицированных файлов")
-        
-        # Получаем список файлов из директории suppliers и others
-        suppliers_dir = os.path.join(parser_service.results_dir, "suppliers")
-        others_dir = os.path.join(parser_service.results_dir, "others")
-        files = []
-        
-        # Собираем файлы поставщиков
-        if os.path.exists(suppliers_dir):
-            for filename in os.listdir(suppliers_dir):
-                if filename.endswith((".json", ".csv", ".txt")):
-                    file_path = os.path.join(suppliers_dir, filename)
-                    
-                    # Получаем информацию о файле
-                    file_info = {
-                        "filename": filename,
-                        "size": os.path.getsize(file_path),
-                        "created": os.path.getctime(file_path),
-                        "format": filename.split(".")[-1],
-                        "category": "suppliers",
-                        "path": f"suppliers/{filename}"
-                    }
-                    
-                    # Если это JSON, извлекаем информацию о запросе
-                    if filename.endswith(".json"):
-                        try:
-                            with open(file_path, "r", encoding="utf-8") as f:
-                                data = json.load(f)
-                                file_info["query"] = data.get("query", "")
-                                file_info["count"] = data.get("count", 0)
-                                file_info["timestamp"] = data.get("timestamp", "")
-                        except:
-                            pass
-                    
-                    files.append(file_info)
-        
-        # Собираем файлы других сайтов
-        if os.path.exists(others_dir):
-            for filename in os.listdir(others_dir):
-                if filename.endswith((".json", ".csv", ".txt")):
-                    file_path = os.path.join(others_dir, filename)
-                    
-                    # Получаем информацию о файле
-                    file_info = {
-                        "filename": filename,
-                        "size": os.path.getsize(file_path),
-                        "created": os.path.getctime(file_path),
-                        "format": filename.split(".")[-1],
-                        "category": "others",
-                        "path": f"others/{filename}"
-                    }
-                    
-                    # Если это JSON, извлекаем информацию о запросе
-                    if filename.endswith(".json"):
-                        try:
-                            with open(file_path, "r", encoding="utf-8") as f:
-                                data = json.load(f)
-                                file_info["query"] = data.get("query", "")
-                                file_info["count"] = data.get("count", 0)
-                                file_info["timestamp"] = data.get("timestamp", "")
-                        except:
-                            pass
-                    
-                    files.append(file_info)
-        
-        # Сортируем по времени создания (новые сначала)
-        files.sort(key=lambda x: x["created"], reverse=True)
-        
-        logger.info(f"Найдено классифицированных файлов: {len(files)}")
+        page = await _list_results(["suppliers", "others"], query, format, sort, order, cursor, limit)
         
         # Группируем файлы по запросам
         queries = {}
-        for file in files:
-            query = file.get("query", "unknown")
-            if query not in queries:
-                queries[query] = {
-                    "query": query,
+        for file in page["files"]:
+            file_query = file.get("query", "unknown")
+            if file_query not in queries:
+                queries[file_query] = {
+                    "query": file_query,
                     "suppliers": [],
                     "others": [],
                     "total_suppliers": 0,
@@ -505,23 +380,75 @@ async def list_classified_results():
                 }
             
             if file["category"] == "suppliers":
-                queries[query]["suppliers"].append(file)
-                queries[query]["total_suppliers"] += file.get("count", 0)
+                queries[file_query]["suppliers"].append(file)
+                queries[file_query]["total_suppliers"] += file.get("count", 0)
             else:
-                queries[query]["others"].append(file)
-                queries[query]["total_others"] += file.get("count", 0)
+                queries[file_query]["others"].append(file)
+                queries[file_query]["total_others"] += file.get("count", 0)
         
-        return {
-            "count": len(files),
-            "queries": list(queries.values()),
-            "files": files
-        }
+        page["queries"] = list(queries.values())
+        return page
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Ошибка при получении списка классифицированных файлов: {str(e)}")
         logger.exception("Полный стек ошибки:")
         raise HTTPException(status_code=500, detail=str(e))
         
+
+# Маршрут с параметром объявлен после /search/results/suppliers, /others и /classified,
+# иначе их пути совпали бы с {filename}
+@router.get("/search/results/{filename}")
+async def get_saved_results(filename: str):
+    """Возвращает сохраненные результаты поиска.
+    
+    Args:
+        filename: Имя файла с результатами
+            
+    Returns:
+        FileResponse: Файл с результатами
+    """
+    try:
+        logger.info(f"Получен запрос на получение файла: {filename}")
+        
+        # Проверяем наличие файла
+        results_dir = parser_service.results_dir
+        file_path = os.path.join(results_dir, filename)
+        
+        if not await file_io.exists(file_path):
+            # Старые файлы результатов перенесены в месячные архивы (см. RetentionService)
+            data = await parser_service.retention.read_bundled(filename)
+            if data is not None:
+                return JSONResponse(content=data)
+            raise HTTPException(status_code=404, detail=f"Файл {filename} не найден")
+        
+        logger.info(f"Файл найден: {file_path}")
+        
+        # Определяем MIME-тип
+        if filename.endswith(".json"):
+            media_type = "application/json"
+        elif filename.endswith(".csv"):
+            media_type = "text/csv"
+        elif filename.endswith(".txt"):
+            media_type = "text/plain"
+        else:
+            media_type = "application/octet-stream"
+        
+        # Возвращаем файл для скачивания
+        return FileResponse(
+            path=file_path,
+            filename=filename,
+            media_type=media_type
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Ошибка при получении файла: {str(e)}")
+        logger.exception("Полный стек ошибки:")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.get("/search/results/category/{category}/{filename}")
 async def get_category_results(category: str, filename: str):
     """Возвращает файл с результатами поиска из указанной категории.
@@ -546,7 +473,10 @@ async def get_category_results(category: str, filename: str):
         # Проверяем наличие файла
         file_path = os.path.join(category_dir, filename)
         
-        if not os.path.exists(file_path):
+        if not await file_io.exists(file_path):
+            data = await parser_service.retention.read_bundled(f"{category}/{filename}")
+            if data is not None:
+                return JSONResponse(content=data)
             raise HTTPException(status_code=404, detail=f"Файл {filename} не найден в категории {category}")
         
         logger.info(f"Файл найден: {file_path}")
@@ -571,4 +501,226 @@ async def get_category_results(category: str, filename: str):
     except Exception as e:
         logger.error(f"Ошибка при получении файла: {str(e)}")
         logger.exception("Полный стек ошибки:")
-        raise HTTPException(status_code=500, detail=str(e)) 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e)) 
+
+@router.get("/storage/keywords")
+async def list_storage_keywords(offset: int = Query(0, ge=0), limit: int = Query(100, ge=1, le=1000)):
+    """Возвращает ключевые слова сохраненных сайтов постранично.
+    
+    Args:
+        offset: Сколько ключевых слов пропустить
+        limit: Размер страницы
+            
+    Returns:
+        Dict: total (всего ключевых слов), offset, limit и items
+    """
+    storage = get_storage()
+    await storage.refresh()
+    return {
+        "total": storage.count_keywords(),
+        "offset": offset,
+        "limit": limit,
+        "items": storage.get_all_keywords(offset, limit)
+    }
+
+@router.get("/storage/keywords/{keyword}/sites")
+async def list_storage_sites_by_keyword(keyword: str, offset: int = Query(0, ge=0),
+                                        limit: int = Query(100, ge=1, le=1000)):
+    """Возвращает домены, сохраненные по ключевому слову, постранично.
+    
+    Args:
+        keyword: Ключевое слово
+        offset: Сколько доменов пропустить
+        limit: Размер страницы
+            
+    Returns:
+        Dict: total (всего доменов), offset, limit и items
+    """
+    storage = get_storage()
+    await storage.refresh()
+    return {
+        "keyword": keyword,
+        "total": storage.count_sites_by_keyword(keyword),
+        "offset": offset,
+        "limit": limit,
+        "items": storage.get_sites_by_keyword(keyword, offset, limit)
+    }
+
+@router.get("/storage/categories/{category}/sites")
+async def list_storage_sites_by_category(category: str, offset: int = Query(0, ge=0),
+                                         limit: int = Query(100, ge=1, le=1000)):
+    """Возвращает домены категории (suppliers или others) постранично.
+    
+    Args:
+        category: Категория сайтов
+        offset: Сколько доменов пропустить
+        limit: Размер страницы
+            
+    Returns:
+        Dict: total (всего доменов), offset, limit и items
+    """
+    if category not in ["suppliers", "others"]:
+        raise HTTPException(status_code=400, detail=f"Недопустимая категория: {category}")
+    storage = get_storage()
+    await storage.refresh()
+    return {
+        "category": category,
+        "total": storage.count_sites_by_category(category),
+        "offset": offset,
+        "limit": limit,
+        "items": storage.get_sites_by_category(category, offset, limit)
+    }
+
+@router.get("/storage/sites/{domain}")
+async def get_storage_site(domain: str):
+    """Возвращает сведения о сохраненном сайте и ключевые слова, по которым он найден.
+    
+    Args:
+        domain: Домен сайта
+            
+    Returns:
+        Dict: Запись о сайте и список keywords
+    """
+    storage = get_storage()
+    await storage.refresh()
+    info = storage.get_site_info(domain)
+    if info is None:
+        raise HTTPException(status_code=404, detail=f"Сайт {domain} не найден")
+    return {
+        "domain": domain,
+        **info,
+        "keywords": storage.get_site_keywords(domain)
+    }
+
+@router.get("/storage/sites/{domain}/html")
+async def get_storage_site_html(domain: str):
+    """Отдает сохраненный HTML сайта, распаковывая его из архива потоком.
+    
+    Args:
+        domain: Домен сайта
+            
+    Returns:
+        StreamingResponse: HTML сайта
+    """
+    storage = get_storage()
+    await storage.refresh()
+    chunks = storage.iter_site_html(domain)
+    if chunks is None:
+        raise HTTPException(status_code=404, detail=f"HTML сайта {domain} не найден")
+    return StreamingResponse(chunks, media_type="text/html; charset=utf-8")
+
+@router.get("/export")
+async def export_results(request: Request, query: Optional[str] = None, format: ExportFormat = ExportFormat.ndjson,
+                         gzip: bool = False, until_id: Optional[int] = Query(None, ge=0), after_id: int = Query(0, ge=0)):
+    """Выгружает результаты поиска из базы потоком (NDJSON, CSV или XLSX).
+    
+    Строки читаются из базы пачками и сразу отдаются клиенту, поэтому память не зависит
+    от размера выгрузки. Ответ содержит X-Export-Until-Id и ETag: запрос с тем же until_id
+    выдает те же байты, поэтому оборванную загрузку NDJSON и CSV можно продолжить
+    заголовком Range (bytes=N-), при необходимости с If-Range. Для продолжения
+    построчно служит after_id (id последней полученной строки).
+    
+    Args:
+        query: Поисковый запрос (по умолчанию все запросы)
+        format: Формат выгрузки (ndjson, csv, xlsx)
+        gzip: Сжать выгрузку в gzip (файл .gz)
+        until_id: Граница выгрузки из X-Export-Until-Id предыдущего ответа
+        after_id: Выгрузить строки с id больше этого
+            
+    Returns:
+        StreamingResponse: Файл выгрузки
+    """
+    try:
+        snapshot = await export_snapshot(query) if until_id is None else await pinned_snapshot(query, until_id)
+        etag = export_etag(snapshot, query, format.value, gzip, after_id)
+        safe_query = "".join(c if c.isalnum() else "_" for c in (query or "all"))
+        filename = f"{safe_query}.{format.value}" + (".gz" if gzip else "")
+        resumable = format != ExportFormat.xlsx
+        headers = {
+            "ETag": etag,
+            "X-Export-Until-Id": str(snapshot["until_id"]),
+            "Accept-Ranges": "bytes" if resumable else "none",
+            "Content-Disposition": f'attachment; filename="{filename}"'
+        }
+        media_type = "application/gzip" if gzip else MEDIA_TYPES[format.value]
+        
+        def stream():
+            return export_stream(format.value, query, until_id=snapshot["until_id"], after_id=after_id, compress=gzip)
+        
+        requested = parse_range(request.headers.get("range"))
+        if_range = request.headers.get("if-range")
+        if resumable and requested and (if_range is None or if_range == etag):
+            # Длина выгрузки известна только после ее построения: берем ее из прошлой выгрузки
+            # с тем же ETag, а если такой не было - считаем один раз отдельным проходом
+            total = known_length(etag)
+            if total is None:
+                total = await stream_length(stream())
+                remember_length(etag, total)
+            start, end = requested
+            if start >= total:
+                return Response(status_code=416, headers={"Content-Range": f"bytes */{total}"})
+            end = total - 1 if end is None else min(end, total - 1)
+            logger.info(f"Продолжение выгрузки {filename}: байты {start}-{end} из {total}")
+            headers.update({"Content-Range": f"bytes {start}-{end}/{total}", "Content-Length": str(end - start + 1)})
+            return StreamingResponse(byte_range(stream(), start, end), status_code=206,
+                                     media_type=media_type, headers=headers)
+        
+        logger.info(f"Выгрузка {filename}: строки до id {snapshot['until_id']} ({snapshot['rows']} строк)")
+        return StreamingResponse(measured(stream(), etag), media_type=media_type, headers=headers)
+        
+    except Exception as e:
+        logger.error(f"Ошибка при выгрузке результатов: {str(e)}")
+        logger.exception("Полный стек ошибки:")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/export/parquet")
+async def export_parquet(full: bool = False):
+    """Дописывает новые и обновленные результаты поиска с классификацией доменов в набор данных Parquet.
+    
+    Args:
+        full: Пересобрать набор данных заново
+            
+    Returns:
+        Dict: Количество выгруженных строк и файлов, отметка последней строки (updated_at, id) и длительность
+    """
+    try:
+        stats = await parser_service.parquet_exporter.export(full=full)
+        return {"output_dir": parser_service.parquet_exporter.output_dir, **stats}
+    except Exception as e:
+        logger.error(f"Ошибка при выгрузке в Parquet: {str(e)}")
+        logger.exception("Полный стек ошибки:")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/retention/run")
+async def run_retention():
+    """Проверяет директории результатов и скриншотов по бюджетам размера и срока хранения.
+    
+    Returns:
+        Dict: Количество файлов, перенесенных в месячные архивы и удаленных, и освобожденный объем
+    """
+    try:
+        return await parser_service.retention.run_once()
+    except Exception as e:
+        logger.error(f"Ошибка при очистке директорий: {str(e)}")
+        logger.exception("Полный стек ошибки:")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/io/stats")
+async def get_io_stats():
+    """Статистика файлового ввода-вывода и блокировок цикла событий.
+    
+    Returns:
+        Dict: Количество операций, пачек записи и байт, время ввода-вывода,
+            суммарное и максимальное время блокировки цикла событий
+    """
+    return file_io.get_stats()
+
+@router.get("/db/stats")
+async def get_db_stats():
+    """Метрики базы данных: состояние пула, ожидание соединения и время запросов.
+    
+    Returns:
+        Dict: Размер и занятость пула, среднее и максимальное ожидание соединения,
+            количество, среднее и максимальное время запросов, гистограмма времени запросов
+    """
+    return db_metrics.get_stats()
@@ -1,8 +1,4 @@
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy import create_engine
-from app.core.config import settings
+from sqlalchemy.orm import declarative_base
 
+# Базовый класс моделей SQLAlchemy без SQLModel; движок и сессии - в app.db.session
 Base = declarative_base()
-engine = create_engine(settings.DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
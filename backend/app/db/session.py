@@ -1,12 +1,177 @@
+"""
+Единственный модуль работы с базой данных: движок, фабрика сессий и метрики.
+
+Все роутеры, сервисы и скрипты берут движок и сессии отсюда. Параметры задаются
+переменными окружения:
+
+    DATABASE_URL              адрес базы (postgresql+asyncpg://...)
+    DB_ECHO                   логировать каждый SQL-запрос (только для отладки, по умолчанию выключено)
+    WEB_CONCURRENCY           количество процессов приложения (у каждого свой пул соединений)
+    DB_MAX_CONNECTIONS        сколько соединений база выделяет приложению на все процессы
+    DB_POOL_SIZE, DB_MAX_OVERFLOW  явный размер пула (по умолчанию вычисляется из двух предыдущих)
+    DB_POOL_TIMEOUT           сколько секунд ждать свободного соединения
+    DB_POOL_RECYCLE           через сколько секунд соединение пересоздается
+    DB_STATEMENT_CACHE_SIZE   размер кэша подготовленных запросов asyncpg на соединение
+    DB_SLOW_QUERY_MS          запросы дольше этого пишутся в лог
+"""
+import os
+import time
+import logging
+from typing import Any, AsyncIterator, Dict
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
-import os
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlmodel import SQLModel
+
+logger = logging.getLogger(__name__)
+
+# Получаем URL базы данных из переменной окружения или используем значение по умолчанию (docker-compose)
+DATABASE_URL = os.getenv("DATABASE_URL", "postgresql+asyncpg://b2b_user:b2b_pass@db:5432/b2b_db")
+
+def _env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    return int(value) if value else default
+
+def pool_settings() -> Dict[str, int]:
+    """
+    Размер пула соединений одного процесса.
+
+    Соединения делятся между процессами приложения: на процесс приходится
+    DB_MAX_CONNECTIONS / WEB_CONCURRENCY, из них две трети держатся в пуле постоянно,
+    остальные открываются при пиковой нагрузке (max_overflow).
+    """
+    workers = max(1, _env_int("WEB_CONCURRENCY", 1))
+    per_worker = max(2, _env_int("DB_MAX_CONNECTIONS", 90) // workers)
+    pool_size = _env_int("DB_POOL_SIZE", max(1, min(20, per_worker * 2 // 3)))
+    return {
+        "workers": workers,
+        "pool_size": pool_size,
+        "max_overflow": _env_int("DB_MAX_OVERFLOW", max(0, per_worker - pool_size)),
+    }
+
+class DatabaseMetrics:
+    """
+    Метрики базы данных процесса: ожидание свободного соединения из пула
+    и время выполнения запросов.
+    """
+
+    # Границы корзин гистограммы времени запросов (мс)
+    BUCKETS_MS = (1, 5, 10, 50, 100, 500, 1000)
+
+    def __init__(self, slow_query_ms: float = 500.0):
+        self.slow_query_ms = slow_query_ms
+        self.reset()
+
+    def reset(self) -> None:
+        self.checkouts = 0
+        self.checkout_wait_seconds = 0.0
+        self.checkout_wait_max = 0.0
+        self.checkout_timeouts = 0
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.query_max = 0.0
+        self.slow_queries = 0
+        self.query_buckets = [0] * (len(self.BUCKETS_MS) + 1)
 
-# Получаем URL базы данных из переменной окружения или используем значение по умолчанию
-DATABASE_URL = os.getenv("DATABASE_URL", "postgresql+asyncpg://postgres:postgres@db:5432/b2b")
+    def observe_checkout(self, seconds: float, timed_out: bool = False) -> None:
+        self.checkouts += 1
+        self.checkout_wait_seconds += seconds
+        self.checkout_wait_max = max(self.checkout_wait_max, seconds)
+        if timed_out:
+            self.checkout_timeouts += 1
 
-# Создаем асинхронный движок SQLAlchemy
-engine = create_async_engine(DATABASE_URL, echo=True)
+    def observe_query(self, seconds: float, statement: str) -> None:
+        self.queries += 1
+        self.query_seconds += seconds
+        self.query_max = max(self.query_max, seconds)
+        milliseconds = seconds * 1000
+        bucket = 0
+        while bucket < len(self.BUCKETS_MS) and milliseconds > self.BUCKETS_MS[bucket]:
+            bucket += 1
+        self.query_buckets[bucket] += 1
+        if milliseconds >= self.slow_query_ms:
+            self.slow_queries += 1
+            logger.warning(f"Медленный запрос ({milliseconds:.0f} мс): {statement[:300]}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Возвращает метрики и текущее состояние пула."""
+        pool = engine.sync_engine.pool
+        labels = [f"<={bound}ms" for bound in self.BUCKETS_MS] + [f">{self.BUCKETS_MS[-1]}ms"]
+        return {
+            "pool": {
+                "class": type(pool).__name__,
+                "size": pool.size() if hasattr(pool, "size") else None,
+                "checked_out": pool.checkedout() if hasattr(pool, "checkedout") else None,
+                "overflow": pool.overflow() if hasattr(pool, "overflow") else None,
+                **POOL_SETTINGS,
+            },
+            "checkouts": self.checkouts,
+            "checkout_wait_avg_ms": round(self.checkout_wait_seconds / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+            "checkout_wait_max_ms": round(self.checkout_wait_max * 1000, 3),
+            "checkout_timeouts": self.checkout_timeouts,
+            "queries": self.queries,
+            "query_avg_ms": round(self.query_seconds / self.queries * 1000, 3) if self.queries else 0.0,
+            "query_max_ms": round(self.query_max * 1000, 3),
+            "slow_queries": self.slow_queries,
+            "query_histogram": dict(zip(labels, self.query_buckets)),
+        }
+
+db_metrics = DatabaseMetrics(slow_query_ms=float(os.getenv("DB_SLOW_QUERY_MS", "500")))
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """Пул соединений, замеряющий время получения соединения (ожидание свободного или открытие нового)."""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except Exception:
+            db_metrics.observe_checkout(time.perf_counter() - started, timed_out=True)
+            raise
+        db_metrics.observe_checkout(time.perf_counter() - started)
+        return connection
+
+def _engine_options(url: str) -> Dict[str, Any]:
+    options: Dict[str, Any] = {"echo": os.getenv("DB_ECHO", "").lower() in ("1", "true", "yes")}
+    if ":memory:" in url:
+        # База в памяти живет в одном соединении, пул ей не нужен
+        return options
+    options.update(
+        poolclass=InstrumentedPool,
+        pool_size=POOL_SETTINGS["pool_size"],
+        max_overflow=POOL_SETTINGS["max_overflow"],
+        pool_timeout=_env_int("DB_POOL_TIMEOUT", 30),
+        # Проверка соединения перед выдачей: после перезапуска базы не будет ошибок на первом запросе
+        pool_pre_ping=True,
+        # Соединения пересоздаются раньше, чем их закроют база или балансировщик по простою
+        pool_recycle=_env_int("DB_POOL_RECYCLE", 1800),
+    )
+    if url.startswith("postgresql+asyncpg"):
+        # Подготовленные запросы кэшируются на соединении: повторные запросы не разбираются заново
+        options["connect_args"] = {"prepared_statement_cache_size": _env_int("DB_STATEMENT_CACHE_SIZE", 500)}
+    return options
+
+POOL_SETTINGS = pool_settings()
+
+# Создаем асинхронный движок SQLAlchemy (один на процесс)
+engine = create_async_engine(DATABASE_URL, **_engine_options(DATABASE_URL))
+
+@event.listens_for(engine.sync_engine, "before_cursor_execute")
+def _before_cursor_execute(connection, cursor, statement, parameters, context, executemany):
+    connection.info.setdefault("query_started", []).append(time.perf_counter())
+
+@event.listens_for(engine.sync_engine, "after_cursor_execute")
+def _after_cursor_execute(connection, cursor, statement, parameters, context, executemany):
+    started = connection.info["query_started"].pop()
+    db_metrics.observe_query(time.perf_counter() - started, statement)
+
+@event.listens_for(engine.sync_engine, "handle_error")
+def _handle_error(context):
+    # Запрос с ошибкой не дошел до after_cursor_execute
+    started = context.connection.info.get("query_started") if context.connection is not None else None
+    if started:
+        started.pop()
 
 # Создаем фабрику сессий
 async_session = sessionmaker(
@@ -15,4 +180,21 @@ async_session = sessionmaker(
     expire_on_commit=False,
     autocommit=False,
     autoflush=False,
-) 
\ No newline at end of file
+)
+
+async def get_session() -> AsyncIterator[AsyncSession]:
+    """Сессия базы данных для зависимостей FastAPI (Depends(get_session))."""
+    async with async_session() as session:
+        yield session
+
+async def init_db() -> None:
+    """Создает таблицы всех моделей (схему в рабочей базе ведут миграции Alembic)."""
+    import app.models  # регистрирует модели в SQLModel.metadata
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+    logger.info(f"База данных: пул {POOL_SETTINGS['pool_size']}+{POOL_SETTINGS['max_overflow']} соединений "
+                f"на процесс ({POOL_SETTINGS['workers']} процессов)")
+
+async def close_db() -> None:
+    """Закрывает все соединения пула."""
+    await engine.dispose()
@@ -1,12 +1,16 @@
 from fastapi import FastAPI, Depends
 from fastapi.middleware.cors import CORSMiddleware
 import logging
-from .database import init_db
+from .db.session import init_db, close_db
 from .api.parser import router as parser_router
 from .parser.main import router as test_router
 from .parser.playwright_runner import PlaywrightRunner
 from .parser.search_google import GoogleSearch
 from .api.test import router as simple_test_router
+from .parser.cpu_pool import cpu_pool
+from .parser.storage import close_storage
+from .parser.async_io import file_io
+from .parser.parser_config import ParserConfig
 
 # Setup logging
 logging.basicConfig(
@@ -84,3 +88,20 @@ async def startup_event():
     logger.info("Инициализация базы данных...")
     await init_db()
     logger.info("База данных инициализирована")
+    
+    # Пул процессов для разбора HTML и поиска по регулярным выражениям
+    config = ParserConfig()
+    cpu_pool.start(
+        workers=config.cpu_pool_workers,
+        inline_threshold=config.cpu_pool_inline_threshold,
+        batch_size=config.cpu_pool_batch_size,
+    )
+    # Измерение блокировок цикла событий (GET /api/parser/io/stats)
+    file_io.start_monitor()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await cpu_pool.shutdown()
+    await close_storage()
+    await file_io.shutdown()
+    await close_db()
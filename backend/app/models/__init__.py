@@ -1,5 +1,8 @@
 from .product import Product
 from .company import Company
-from .search_result import SearchResult
+from .search_query import SearchQuery
+from .search_run import SearchRun
+from .domain import Domain
+from .query_result import QueryResult
 
-__all__ = ['Product', 'Company', 'SearchResult'] 
\ No newline at end of file
+__all__ = ['Product', 'Company', 'SearchQuery', 'SearchRun', 'Domain', 'QueryResult'] 
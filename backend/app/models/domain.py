@@ -0,0 +1,40 @@
+from datetime import datetime, timedelta
+from sqlmodel import SQLModel, Field
+from typing import Optional
+
+
+class Domain(SQLModel, table=True):
+    """
+    Модель домена: классификация, реквизиты и контакты компании.
+
+    Строка создается и для еще не классифицированного домена из результатов поиска
+    (category и classified_at пустые, rules_version 0); кэш классификации такие строки не отдает.
+    """
+    __tablename__ = "domains"
+    __table_args__ = (
+        {"extend_existing": True}
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    domain: str = Field(max_length=255, unique=True, index=True)
+    category: Optional[str] = Field(default=None, max_length=32)
+    evidence: Optional[str] = Field(default=None, max_length=255)
+    inn: Optional[str] = Field(default=None, max_length=12, index=True)
+    ogrn: Optional[str] = Field(default=None, max_length=15)
+    kpp: Optional[str] = Field(default=None, max_length=9)
+    company_name: Optional[str] = Field(default=None, max_length=255)
+    email: Optional[str] = Field(default=None, max_length=255)
+    phone: Optional[str] = Field(default=None, max_length=64)
+    region: Optional[str] = Field(default=None, max_length=128)
+    rules_version: int = Field(default=0)
+    classified_at: Optional[datetime] = None
+    updated_at: datetime = Field(default_factory=datetime.utcnow)  # Последнее изменение классификации или контактов
+
+    def is_expired(self, ttl: timedelta) -> bool:
+        """
+        Проверяет, истек ли срок действия классификации
+        """
+        return self.classified_at is None or datetime.utcnow() - self.classified_at > ttl
+
+    def __repr__(self):
+        return f"<Domain(id={self.id}, domain='{self.domain}', category='{self.category}')>"
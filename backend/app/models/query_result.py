@@ -0,0 +1,43 @@
+from datetime import datetime
+from sqlalchemy import Column, JSON
+from sqlmodel import SQLModel, Field, Index, UniqueConstraint
+from typing import Dict, List, Optional
+
+
+class QueryResult(SQLModel, table=True):
+    """
+    Модель результата поиска: домен на позиции rank в выдаче по запросу.
+
+    Запрос, домен (с классификацией и контактами) и запуск хранятся в своих таблицах,
+    здесь - ссылки на них и то, что относится к самой позиции выдачи, включая результат
+    классификации и контакты сайта в этом запуске (из них кэш собирает ответ поиска).
+    На пару (запрос, домен) одна строка: повторный поиск переносит ее в новый запуск.
+    """
+    __tablename__ = "query_results"
+    __table_args__ = (
+        UniqueConstraint("query_id", "domain_id", name="uq_query_results_query_id_domain_id"),
+        # Результаты последнего запуска по запросу в порядке выдачи
+        Index("ix_query_results_query_id_run_id_rank", "query_id", "run_id", "rank"),
+        Index("ix_query_results_domain_id", "domain_id"),
+        # Дозапись новых и обновленных строк в Parquet (отметка updated_at, id)
+        Index("ix_query_results_updated_at_id", "updated_at", "id"),
+        {"extend_existing": True}
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    query_id: int = Field(foreign_key="queries.id")
+    domain_id: int = Field(foreign_key="domains.id")
+    run_id: int = Field(foreign_key="search_runs.id")
+    rank: int = Field(default=0)  # Позиция в выдаче запуска (с 1)
+    url: str = Field(max_length=2048)
+    title: Optional[str] = Field(default=None, max_length=512)
+    snippet: Optional[str] = None
+    category: Optional[str] = Field(default=None, max_length=16)  # supplier, other или pending
+    evidence: Optional[str] = Field(default=None, max_length=255)
+    inn: Optional[str] = Field(default=None, max_length=12)
+    contacts: Optional[Dict[str, List[str]]] = Field(default=None, sa_column=Column(JSON))
+    created_at: datetime = Field(default_factory=datetime.utcnow)  # Первое появление домена по запросу
+    updated_at: datetime = Field(default_factory=datetime.utcnow)  # Последний запуск, в котором он найден
+
+    def __repr__(self):
+        return f"<QueryResult(id={self.id}, query_id={self.query_id}, domain_id={self.domain_id}, rank={self.rank})>"
@@ -0,0 +1,21 @@
+from datetime import datetime
+from sqlmodel import SQLModel, Field
+from typing import Optional
+
+
+class SearchQuery(SQLModel, table=True):
+    """
+    Модель поискового запроса (один раз на нормализованный запрос)
+    """
+    __tablename__ = "queries"
+    __table_args__ = (
+        {"extend_existing": True}
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    query: str = Field(max_length=255)  # Запрос в том виде, в котором его ввели впервые
+    query_norm: str = Field(max_length=255, unique=True, index=True)  # Нижний регистр, одиночные пробелы
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<SearchQuery(id={self.id}, query='{self.query}')>"
@@ -0,0 +1,29 @@
+from datetime import datetime
+from sqlalchemy import Column, JSON
+from sqlmodel import SQLModel, Field, Index
+from typing import Any, Dict, Optional
+
+
+class SearchRun(SQLModel, table=True):
+    """
+    Модель запуска поиска по запросу.
+
+    summary - сводка запуска из ответа поиска (счетчики классификации, удаленные
+    дубликаты, сохраненные файлы), чтобы ответ из кэша совпадал с ответом поиска.
+    """
+    __tablename__ = "search_runs"
+    __table_args__ = (
+        # Последний запуск по запросу в пределах срока хранения
+        Index("ix_search_runs_query_id_created_at", "query_id", "created_at"),
+        {"extend_existing": True}
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    query_id: int = Field(foreign_key="queries.id")
+    search_mode: Optional[str] = Field(default=None, max_length=16)
+    results: int = Field(default=0)  # Количество результатов запуска
+    summary: Optional[Dict[str, Any]] = Field(default=None, sa_column=Column(JSON))
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<SearchRun(id={self.id}, query_id={self.query_id}, results={self.results})>"
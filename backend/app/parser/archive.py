@@ -0,0 +1,214 @@
+import os
+import gzip
+import json
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterator, Optional, Union
+from .async_io import file_io
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+# Расширения файлов архива по способу сжатия (по расширению архив читает объект,
+# даже если сейчас используется другой способ)
+EXTENSIONS = {"zstd": ".html.zst", "gzip": ".html.gz"}
+
+Content = Union[str, bytes]
+
+def default_codec() -> str:
+    """Возвращает zstd, если установлен пакет zstandard, иначе gzip."""
+    return "zstd" if zstandard is not None else "gzip"
+
+class HtmlArchive:
+    """
+    Архив HTML-страниц со сжатием и адресацией по содержимому.
+
+    Страница хранится один раз под SHA-256 своего содержимого (UTF-8):
+    objects/ab/cd/<hash>.html.zst (или .html.gz без пакета zstandard). Одинаковые
+    страницы разных доменов занимают место один раз, а двухуровневые каталоги
+    не дают одной директории разрастись до сотен тысяч файлов. Объект пишется
+    во временный файл и атомарно подменяется (os.replace), поэтому читатели не видят
+    недописанных объектов. Чтение распаковывает объект потоком (open, stream),
+    без загрузки всего файла в память.
+
+    Для записей, у которых нет собственной базы (например, файлы <домен>.html),
+    архив хранит именованные ссылки name -> hash в refs.jsonl (побеждает последняя запись).
+    """
+
+    def __init__(self, root: Union[str, Path], codec: Optional[str] = None, level: Optional[int] = None):
+        """
+        Args:
+            root: Директория архива
+            codec: Способ сжатия новых объектов: zstd или gzip (по умолчанию zstd, если доступен)
+            level: Уровень сжатия (по умолчанию 10 для zstd и 6 для gzip)
+        """
+        self.root = Path(root)
+        self.objects_dir = self.root / "objects"
+        self.refs_path = self.root / "refs.jsonl"
+        self.codec = codec or default_codec()
+        if self.codec not in EXTENSIONS:
+            raise ValueError(f"Неизвестный способ сжатия: {self.codec}")
+        if self.codec == "zstd" and zstandard is None:
+            raise RuntimeError("Для сжатия zstd нужен пакет zstandard")
+        self.level = level if level is not None else (10 if self.codec == "zstd" else 6)
+        self._refs: Optional[Dict[str, str]] = None
+        self._refs_lock = threading.Lock()
+
+    @staticmethod
+    def digest(content: Content) -> str:
+        """Возвращает адрес (SHA-256) содержимого."""
+        data = content.encode("utf-8") if isinstance(content, str) else content
+        return hashlib.sha256(data).hexdigest()
+
+    def path(self, digest: str, codec: Optional[str] = None) -> Path:
+        """Путь к объекту с заданным адресом."""
+        return self.objects_dir / digest[:2] / digest[2:4] / f"{digest}{EXTENSIONS[codec or self.codec]}"
+
+    def locate(self, digest: str) -> Optional[Path]:
+        """Находит объект, сжатый любым из поддерживаемых способов."""
+        for codec in (self.codec, *EXTENSIONS):
+            path = self.path(digest, codec)
+            if path.exists():
+                return path
+        return None
+
+    def exists(self, digest: str) -> bool:
+        """Есть ли объект в архиве."""
+        return self.locate(digest) is not None
+
+    def put(self, content: Content) -> Dict[str, Union[str, int]]:
+        """
+        Сохраняет страницу в архив (если такой страницы еще нет).
+
+        Args:
+            content: HTML (строка или байты в UTF-8)
+
+        Returns:
+            Dict: digest, codec, size (исходный размер), stored_size (размер в архиве),
+            path и created (записан ли новый объект)
+        """
+        data = content.encode("utf-8") if isinstance(content, str) else bytes(content)
+        digest = self.digest(data)
+        existing = self.locate(digest)
+        if existing is not None:
+            return self._entry(digest, existing, len(data), created=False)
+
+        path = self.path(digest)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temporary = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            with open(temporary, "wb") as f:
+                f.write(self._compress(data))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temporary, path)
+        except Exception:
+            if temporary.exists():
+                temporary.unlink()
+            raise
+        return self._entry(digest, path, len(data), created=True)
+
+    def _entry(self, digest: str, path: Path, size: int, created: bool) -> Dict[str, Union[str, int]]:
+        """Описание объекта архива."""
+        codec = "zstd" if path.name.endswith(EXTENSIONS["zstd"]) else "gzip"
+        return {
+            "digest": digest,
+            "codec": codec,
+            "size": size,
+            "stored_size": path.stat().st_size,
+            "path": str(path),
+            "created": created,
+        }
+
+    def _compress(self, data: bytes) -> bytes:
+        if self.codec == "zstd":
+            return zstandard.ZstdCompressor(level=self.level).compress(data)
+        # mtime=0: одинаковое содержимое дает одинаковый файл
+        return gzip.compress(data, compresslevel=self.level, mtime=0)
+
+    def open(self, digest: str) -> BinaryIO:
+        """
+        Открывает объект для потокового чтения распакованного содержимого.
+
+        Raises:
+            FileNotFoundError: Если объекта нет в архиве
+        """
+        path = self.locate(digest)
+        if path is None:
+            raise FileNotFoundError(f"Объект {digest} не найден в архиве {self.root}")
+        if path.name.endswith(EXTENSIONS["gzip"]):
+            return gzip.open(path, "rb")
+        if zstandard is None:
+            raise RuntimeError(f"Для чтения {path} нужен пакет zstandard")
+        return zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True)
+
+    def stream(self, digest: str, chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+        """Читает распакованное содержимое объекта частями."""
+        with self.open(digest) as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+
+    def get(self, digest: str) -> bytes:
+        """Возвращает распакованное содержимое объекта целиком."""
+        with self.open(digest) as f:
+            return f.read()
+
+    def get_text(self, digest: str) -> str:
+        """Возвращает страницу как строку."""
+        return self.get(digest).decode("utf-8", errors="replace")
+
+    async def put_async(self, content: Content) -> Dict[str, Union[str, int]]:
+        """put() в отдельном потоке, не блокируя цикл событий сжатием и записью."""
+        return await file_io.run(self.put, content)
+
+    async def get_text_async(self, digest: str) -> str:
+        """get_text() в отдельном потоке."""
+        return await file_io.run(self.get_text, digest)
+
+    def _load_refs(self) -> Dict[str, str]:
+        if self._refs is None:
+            refs: Dict[str, str] = {}
+            if self.refs_path.exists():
+                with open(self.refs_path, "r", encoding="utf-8") as f:
+                    for line in f:
+                        try:
+                            record = json.loads(line)
+                            refs[record["name"]] = record["digest"]
+                        except (json.JSONDecodeError, KeyError):
+                            # Недописанная при сбое последняя строка
+                            continue
+            self._refs = refs
+        return self._refs
+
+    def link(self, name: str, digest: str) -> None:
+        """Связывает имя (например, suppliers/example.ru) с объектом архива."""
+        with self._refs_lock:
+            refs = self._load_refs()
+            if refs.get(name) == digest:
+                return
+            self.root.mkdir(parents=True, exist_ok=True)
+            with open(self.refs_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps({"name": name, "digest": digest}, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            refs[name] = digest
+
+    def resolve(self, name: str) -> Optional[str]:
+        """Возвращает адрес объекта, связанного с именем, или None."""
+        with self._refs_lock:
+            return self._load_refs().get(name)
+
+    def put_named(self, name: str, content: Content) -> Dict[str, Union[str, int]]:
+        """Сохраняет страницу и связывает ее с именем."""
+        entry = self.put(content)
+        self.link(name, entry["digest"])
+        return entry
@@ -0,0 +1,219 @@
+import os
+import json
+import time
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+Data = Union[str, bytes]
+
+def _write_file(path: str, data: Data, encoding: str = "utf-8", atomic: bool = True) -> int:
+    """Записывает файл (атомарно: через временный файл и os.replace) и возвращает размер в байтах."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    raw = data.encode(encoding) if isinstance(data, str) else data
+    target = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp" if atomic else path
+    with open(target, "wb") as f:
+        f.write(raw)
+    if atomic:
+        os.replace(target, path)
+    return len(raw)
+
+def _write_batch(items: List[Tuple[str, Data, str, bool]]) -> List[Tuple[bool, Any]]:
+    """Записывает пачку файлов в одном потоке; ошибка одного файла не прерывает пачку."""
+    results = []
+    for path, data, encoding, atomic in items:
+        try:
+            results.append((True, _write_file(path, data, encoding, atomic)))
+        except Exception as e:
+            results.append((False, e))
+    return results
+
+class AsyncFileIO:
+    """
+    Файловый ввод-вывод для асинхронного кода.
+
+    Все операции с файлами (запись, чтение, сериализация JSON, листинг директорий)
+    выполняются в отдельном пуле потоков, а не в цикле событий, поэтому запись
+    результатов не останавливает обработку остальных запросов. Свой пул, а не пул
+    по умолчанию, нужен, чтобы долгий ввод-вывод не занимал потоки, которыми
+    пользуются другие части приложения (to_thread, run_in_executor).
+
+    Записи, запрошенные почти одновременно (в пределах batch_delay), собираются
+    в пачку и выполняются одним заданием пула. Монитор цикла событий (start_monitor)
+    измеряет, насколько цикл опаздывает с пробуждением, то есть сколько он был
+    заблокирован синхронным кодом; статистика доступна через get_stats().
+    """
+
+    def __init__(self, workers: int = 4, batch_size: int = 32, batch_delay: float = 0.005):
+        """
+        Args:
+            workers: Количество потоков ввода-вывода
+            batch_size: Максимальное количество файлов в одной пачке записи
+            batch_delay: Сколько секунд пачка ожидает другие записи перед отправкой
+        """
+        self.workers = workers
+        self.batch_size = batch_size
+        self.batch_delay = batch_delay
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pending: List[Tuple[str, Data, str, bool, asyncio.Future]] = []
+        self._monitor: Optional[asyncio.Task] = None
+        self.stats = {
+            "operations": 0, "writes": 0, "batches": 0, "bytes_written": 0, "errors": 0, "io_seconds": 0.0,
+            "loop_checks": 0, "loop_blocked_seconds": 0.0, "loop_max_blocked": 0.0, "loop_stalls": 0,
+        }
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="file-io")
+        return self._executor
+
+    async def run(self, function: Callable[..., Any], *args, **kwargs) -> Any:
+        """Выполняет синхронную функцию ввода-вывода в пуле потоков."""
+        started = time.perf_counter()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, lambda: function(*args, **kwargs))
+        except Exception:
+            self.stats["errors"] += 1
+            raise
+        finally:
+            self.stats["operations"] += 1
+            self.stats["io_seconds"] += time.perf_counter() - started
+
+    async def write(self, path: str, data: Data, encoding: str = "utf-8", atomic: bool = True) -> int:
+        """
+        Записывает файл (в пачке с другими записями того же момента).
+
+        Args:
+            path: Путь к файлу (директории создаются)
+            data: Содержимое (строка или байты)
+            encoding: Кодировка для строк
+            atomic: Писать через временный файл, чтобы читатели не видели недописанный файл
+
+        Returns:
+            int: Размер записанного файла в байтах
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((path, data, encoding, atomic, future))
+        if len(self._pending) >= self.batch_size:
+            self._flush()
+        elif len(self._pending) == 1:
+            loop.call_later(self.batch_delay, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        """Отправляет накопленные записи в пул одним заданием."""
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        self.stats["batches"] += 1
+        items = [(path, data, encoding, atomic) for path, data, encoding, atomic, _ in batch]
+        futures = [future for *_, future in batch]
+        started = time.perf_counter()
+        job = asyncio.get_running_loop().run_in_executor(self.executor, _write_batch, items)
+
+        def deliver(done: asyncio.Future) -> None:
+            self.stats["io_seconds"] += time.perf_counter() - started
+            if done.exception() is not None:
+                results = [(False, done.exception())] * len(futures)
+            else:
+                results = done.result()
+            for future, (ok, result) in zip(futures, results):
+                self.stats["operations"] += 1
+                if ok:
+                    self.stats["writes"] += 1
+                    self.stats["bytes_written"] += result
+                else:
+                    self.stats["errors"] += 1
+                if future.done():
+                    continue
+                if ok:
+                    future.set_result(result)
+                else:
+                    future.set_exception(result)
+
+        job.add_done_callback(deliver)
+
+    async def write_json(self, path: str, data: Any, **options) -> int:
+        """Сериализует данные в JSON (в пуле потоков) и записывает файл."""
+        text = await self.run(json.dumps, data, **options)
+        return await self.write(path, text)
+
+    async def read_text(self, path: str, encoding: str = "utf-8") -> str:
+        def read() -> str:
+            with open(path, "r", encoding=encoding) as f:
+                return f.read()
+        return await self.run(read)
+
+    async def read_json(self, path: str) -> Any:
+        def read() -> Any:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        return await self.run(read)
+
+    async def exists(self, path: str) -> bool:
+        return await self.run(os.path.exists, path)
+
+    async def listdir(self, path: str) -> List[str]:
+        return await self.run(os.listdir, path)
+
+    async def remove(self, path: str) -> None:
+        await self.run(os.remove, path)
+
+    async def makedirs(self, path: str) -> None:
+        await self.run(os.makedirs, path, exist_ok=True)
+
+    def start_monitor(self, interval: float = 0.1, stall_threshold: float = 0.05) -> None:
+        """
+        Запускает измерение блокировок цикла событий.
+
+        Args:
+            interval: Период проверки в секундах
+            stall_threshold: Опоздание в секундах, с которого блокировка пишется в лог
+        """
+        if self._monitor is None or self._monitor.done():
+            self._monitor = asyncio.create_task(self._watch_loop(interval, stall_threshold))
+
+    async def _watch_loop(self, interval: float, stall_threshold: float) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + interval
+            await asyncio.sleep(interval)
+            lag = max(0.0, loop.time() - expected)
+            self.stats["loop_checks"] += 1
+            self.stats["loop_blocked_seconds"] += lag
+            if lag > self.stats["loop_max_blocked"]:
+                self.stats["loop_max_blocked"] = lag
+            if lag >= stall_threshold:
+                self.stats["loop_stalls"] += 1
+                logger.warning(f"Цикл событий был заблокирован {lag * 1000:.0f} мс")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Возвращает статистику операций и блокировок цикла событий."""
+        stats = dict(self.stats, workers=self.workers, pending=len(self._pending))
+        for key in ("io_seconds", "loop_blocked_seconds", "loop_max_blocked"):
+            stats[key] = round(stats[key], 4)
+        return stats
+
+    async def shutdown(self) -> None:
+        """Останавливает монитор, дописывает накопленные файлы и останавливает пул."""
+        if self._monitor is not None:
+            self._monitor.cancel()
+            self._monitor = None
+        if self._pending:
+            futures = [future for *_, future in self._pending]
+            self._flush()
+            await asyncio.gather(*futures, return_exceptions=True)
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            await asyncio.get_running_loop().run_in_executor(None, executor.shutdown)
+
+# Общий экземпляр процесса
+file_io = AsyncFileIO()
@@ -0,0 +1,206 @@
+import logging
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from app.db.session import async_session
+from app.models.domain import Domain
+from .utils import registrable_domain
+
+logger = logging.getLogger(__name__)
+
+class ClassificationCache:
+    """
+    Кэш классификации доменов.
+    
+    Результаты хранятся в общей таблице domains (ключ - регистрируемый домен), поэтому
+    ими пользуются все воркеры и они переживают перезапуск. Перед таблицей стоит
+    ограниченный LRU-кэш процесса, чтобы повторные обращения не шли в базу.
+    """
+    
+    def __init__(self, rules_version: int, ttl_days: int = 30, lru_size: int = 10000, persistent: bool = True):
+        """
+        Инициализирует кэш.
+        
+        Args:
+            rules_version: Версия правил классификатора; записи другой версии считаются устаревшими
+            ttl_days: Срок действия классификации в днях
+            lru_size: Максимальное количество доменов в памяти процесса
+            persistent: Использовать ли таблицу domains (False - только память процесса)
+        """
+        self.rules_version = rules_version
+        self.ttl = timedelta(days=ttl_days)
+        self.lru_size = lru_size
+        self.persistent = persistent
+        self._lru: "OrderedDict[str, Dict]" = OrderedDict()
+    
+    async def get(self, domain: str) -> Optional[Dict]:
+        """
+        Возвращает действующую классификацию домена.
+        
+        Args:
+            domain: Домен или URL
+            
+        Returns:
+            Optional[Dict]: Словарь с ключами category, evidence, classified_at или None
+        """
+        return (await self.get_many([domain])).get(registrable_domain(domain))
+    
+    async def get_many(self, domains: Iterable[str]) -> Dict[str, Dict]:
+        """
+        Возвращает действующие классификации для набора доменов одним запросом к базе.
+        
+        Args:
+            domains: Домены или URL
+            
+        Returns:
+            Dict[str, Dict]: Классификации по регистрируемому домену (только найденные);
+            запись содержит также реквизиты компании inn, ogrn, kpp, если они известны
+        """
+        found: Dict[str, Dict] = {}
+        missing = set()
+        
+        for key in {registrable_domain(domain) for domain in domains if domain}:
+            entry = self._lru_get(key)
+            if entry:
+                found[key] = entry
+            else:
+                missing.add(key)
+        
+        if not missing or not self.persistent:
+            return found
+        
+        try:
+            async with async_session() as session:
+                rows = await session.execute(
+                    select(Domain)
+                    .where(Domain.domain.in_(missing))
+                    .where(Domain.rules_version == self.rules_version)
+                    .where(Domain.classified_at >= datetime.utcnow() - self.ttl)
+                )
+                for row in rows.scalars().all():
+                    entry = self._entry(row)
+                    self._lru_put(row.domain, entry)
+                    found[row.domain] = entry
+        except Exception as e:
+            logger.error(f"Ошибка при чтении кэша классификации: {str(e)}")
+        
+        return found
+    
+    async def get_by_inn(self, inns: Iterable[str]) -> Dict[str, List[Dict]]:
+        """
+        Возвращает действующие классификации доменов, принадлежащих компаниям с указанными ИНН.
+        
+        Args:
+            inns: ИНН компаний
+            
+        Returns:
+            Dict[str, List[Dict]]: Записи доменов (с ключом domain) по ИНН (только найденные)
+        """
+        inns = {inn for inn in inns if inn}
+        found: Dict[str, List[Dict]] = {}
+        if not inns or not self.persistent:
+            return found
+        
+        try:
+            async with async_session() as session:
+                rows = await session.execute(
+                    select(Domain)
+                    .where(Domain.inn.in_(inns))
+                    .where(Domain.rules_version == self.rules_version)
+                    .where(Domain.classified_at >= datetime.utcnow() - self.ttl)
+                )
+                for row in rows.scalars().all():
+                    found.setdefault(row.inn, []).append(dict(self._entry(row), domain=row.domain))
+        except Exception as e:
+            logger.error(f"Ошибка при поиске доменов по ИНН: {str(e)}")
+        
+        return found
+    
+    async def set(self, domain: str, category: str, evidence: Optional[str] = None, persist: bool = True,
+                  requisites: Optional[Dict[str, Optional[str]]] = None) -> None:
+        """
+        Сохраняет классификацию домена.
+        
+        Args:
+            domain: Домен или URL
+            category: 'supplier' или 'other'
+            evidence: Признак, по которому принято решение
+            persist: Записывать ли результат в общую таблицу (временные ошибки
+                скачивания запоминаются только в памяти процесса)
+            requisites: Реквизиты компании (ключи inn, ogrn, kpp), найденные на сайте
+        """
+        key = registrable_domain(domain)
+        requisites = requisites or {}
+        entry = {
+            "category": category,
+            "evidence": evidence[:255] if evidence else evidence,
+            "classified_at": datetime.utcnow(),
+            "inn": requisites.get("inn"),
+            "ogrn": requisites.get("ogrn"),
+            "kpp": requisites.get("kpp")
+        }
+        self._lru_put(key, entry)
+        
+        if not persist or not self.persistent:
+            return
+        
+        try:
+            async with async_session() as session:
+                statement = insert(Domain).values(
+                    domain=key,
+                    rules_version=self.rules_version,
+                    updated_at=entry["classified_at"],
+                    **entry
+                )
+                await session.execute(statement.on_conflict_do_update(
+                    index_elements=[Domain.domain],
+                    set_={
+                        "category": statement.excluded.category,
+                        "evidence": statement.excluded.evidence,
+                        "rules_version": statement.excluded.rules_version,
+                        "classified_at": statement.excluded.classified_at,
+                        "inn": statement.excluded.inn,
+                        "ogrn": statement.excluded.ogrn,
+                        "kpp": statement.excluded.kpp,
+                        "updated_at": statement.excluded.updated_at
+                    }
+                ))
+                await session.commit()
+        except Exception as e:
+            logger.error(f"Ошибка при сохранении классификации домена {key}: {str(e)}")
+    
+    @staticmethod
+    def _entry(row: Domain) -> Dict:
+        """Преобразует строку таблицы domains в запись кэша."""
+        return {
+            "category": row.category,
+            "evidence": row.evidence,
+            "classified_at": row.classified_at,
+            "inn": row.inn,
+            "ogrn": row.ogrn,
+            "kpp": row.kpp
+        }
+    
+    def clear(self) -> None:
+        """Очищает кэш процесса (общая таблица не затрагивается)."""
+        self._lru.clear()
+    
+    def _lru_get(self, key: str) -> Optional[Dict]:
+        """Возвращает запись из памяти процесса, если она не устарела."""
+        entry = self._lru.get(key)
+        if entry is None:
+            return None
+        if datetime.utcnow() - entry["classified_at"] > self.ttl:
+            del self._lru[key]
+            return None
+        self._lru.move_to_end(key)
+        return entry
+    
+    def _lru_put(self, key: str, entry: Dict) -> None:
+        """Добавляет запись в память процесса, вытесняя самые старые."""
+        self._lru[key] = entry
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.lru_size:
+            self._lru.popitem(last=False)
@@ -0,0 +1,310 @@
+import re
+import heapq
+import asyncio
+import logging
+import itertools
+import aiohttp
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from urllib.parse import urlparse
+from .contacts import empty_contacts
+from .requisites import empty_requisites, primary_requisites
+from .cpu_pool import cpu_pool
+
+logger = logging.getLogger(__name__)
+
+# Признаки страниц с контактами и реквизитами в адресе или тексте ссылки и их вес.
+# Ссылка получает вес самого сильного признака; ссылки без признаков не обходятся.
+LINK_HINTS = (
+    (10.0, re.compile(r'rekvizit|requisit|реквизит|bank-details|company-details')),
+    (8.0, re.compile(r'kontakt|contact|контакт|svyaz|связат')),
+    (5.0, re.compile(r'o-kompanii|o_kompanii|okompanii|about|о компании|о нас|o-nas|onas|company|kompaniya|компани')),
+    (2.0, re.compile(r'dokument|document|документ|oferta|оферт|privacy|policy|politika|политик|dostavka|доставк|oplata|оплат')),
+)
+
+# Ссылки, которые не стоит скачивать: файлы, корзина, вход, лента новостей
+SKIP_LINK_REGEX = re.compile(
+    r'\.(?:pdf|docx?|xlsx?|zip|rar|7z|jpe?g|png|gif|svg|webp|mp4|avi)(?:$|\?)'
+    r'|/(?:cart|basket|korzina|login|auth|register|search|poisk|news|novosti|blog)(?:/|$|\?)'
+)
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36'
+
+def link_priority(url: str, text: str = "") -> float:
+    """
+    Оценивает, насколько вероятно найти на странице контакты или реквизиты компании.
+
+    Args:
+        url: Абсолютный URL ссылки
+        text: Текст ссылки
+
+    Returns:
+        float: Приоритет ссылки (0 - страницу обходить не нужно)
+    """
+    path = urlparse(url).path.lower()
+    if SKIP_LINK_REGEX.search(path):
+        return 0.0
+    haystack = f"{path} {text.lower()}"
+    for weight, pattern in LINK_HINTS:
+        if pattern.search(haystack):
+            # Из одинаковых по смыслу ссылок предпочитаем короткие пути (/contacts, а не /shop/a/b/contacts)
+            return weight - 0.1 * path.rstrip('/').count('/')
+    return 0.0
+
+class _SiteState:
+    """Состояние обхода одного сайта: бюджет страниц и времени и найденные данные."""
+
+    def __init__(self, url: str):
+        self.url = url
+        # Бюджет времени отсчитывается с момента, когда сайт впервые получил слот для скачивания
+        self.deadline: Optional[float] = None
+        self.scheduled = 0
+        self.in_flight = 0
+        self.done = False
+        self.seen = {url}
+        self.pages: List[str] = []
+        self.contacts = empty_contacts()
+        self.requisites = empty_requisites()
+        # Оставшиеся в очереди ссылки: (приоритет, глубина, URL)
+        self.frontier: List[Tuple[float, int, str]] = []
+
+    def resume(self, result: Dict) -> List[Tuple[float, int, str]]:
+        """
+        Восстанавливает состояние по итогу предыдущего обхода сайта.
+
+        Скачанные страницы засчитываются в max_pages и повторно не скачиваются.
+
+        Returns:
+            List[Tuple[float, int, str]]: Ссылки, которые предыдущий обход не успел скачать
+        """
+        self.pages = list(result['pages'])
+        self.scheduled = len(self.pages)
+        self.seen.update(self.pages)
+        self.merge({
+            'contacts': result['contacts'],
+            'requisites': {key: [value] for key, value in result['requisites'].items() if value},
+        })
+        frontier = [tuple(item) for item in result.get('frontier', [])]
+        self.seen.update(link for _, _, link in frontier)
+        return frontier
+
+    def merge(self, found: Dict[str, Dict[str, List[str]]]) -> None:
+        """Добавляет данные очередной страницы без повторов."""
+        for target, values in ((self.contacts, found['contacts']), (self.requisites, found['requisites'])):
+            for key, items in values.items():
+                target[key].extend(item for item in items if item not in target[key])
+
+    def has(self, fields: Sequence[str]) -> bool:
+        """Проверяет, найдены ли все нужные поля."""
+        return all(self.contacts.get(field) or self.requisites.get(field) for field in fields)
+
+    def result(self, fields: Sequence[str]) -> Dict:
+        """Возвращает итог обхода сайта."""
+        return {
+            "url": self.url,
+            "pages": self.pages,
+            "contacts": self.contacts,
+            "requisites": primary_requisites(self.requisites),
+            "complete": self.has(fields),
+            "frontier": sorted(self.frontier, reverse=True),
+        }
+
+class ContactCrawler:
+    """
+    Обходит страницы сайтов, на которых обычно указаны контакты и реквизиты компании.
+
+    С главной страницы сайта собираются внутренние ссылки и ранжируются по признакам
+    в адресе и тексте (реквизиты, контакты, "о компании", документы). Ссылки всех сайтов
+    попадают в общую очередь с приоритетом, из которой страницы скачиваются с общим
+    ограничением параллелизма. Для каждого сайта скачивается не больше max_pages страниц
+    за site_budget секунд, и обход сайта прекращается, как только найдены все нужные поля.
+    Разбор страниц выполняется в пуле процессов (cpu_pool).
+    """
+
+    # Приоритет главной страницы: ее ссылки нужны для всего остального обхода
+    LANDING_PRIORITY = 100.0
+
+    def __init__(self, max_pages: int = 5, site_budget: float = 20.0, concurrency: int = 10,
+                 per_site_concurrency: int = 2, max_depth: int = 2, page_timeout: float = 10.0,
+                 max_bytes: int = 1024 * 1024, required: Sequence[str] = ('emails', 'inn')):
+        """
+        Args:
+            max_pages: Максимальное количество страниц одного сайта
+            site_budget: Лимит времени на обход одного сайта в секундах
+            concurrency: Общее максимальное количество одновременно скачиваемых страниц
+            per_site_concurrency: Максимальное количество одновременно скачиваемых страниц одного сайта
+            max_depth: Максимальная глубина ссылок от главной страницы
+            page_timeout: Таймаут скачивания одной страницы в секундах
+            max_bytes: Максимальный объем одной страницы
+            required: Поля, после нахождения которых обход сайта прекращается
+                (emails, phones, whatsapp, telegram, inn, ogrn, kpp)
+        """
+        self.max_pages = max_pages
+        self.site_budget = site_budget
+        self.concurrency = concurrency
+        self.per_site_concurrency = per_site_concurrency
+        self.max_depth = max_depth
+        self.page_timeout = page_timeout
+        self.max_bytes = max_bytes
+        self.required = tuple(required)
+        # Общее ограничение для всех одновременных обходов (и всех их сайтов)
+        self._semaphore = asyncio.Semaphore(concurrency)
+
+    async def crawl_site(self, url: str, required: Optional[Sequence[str]] = None) -> Dict:
+        """
+        Обходит один сайт.
+
+        Args:
+            url: URL главной (или найденной в выдаче) страницы сайта
+            required: Поля, после нахождения которых обход прекращается (по умолчанию self.required)
+
+        Returns:
+            Dict: Ключи url, pages (скачанные страницы), contacts, requisites (inn, ogrn, kpp),
+            complete (найдены ли все нужные поля) и frontier (не скачанные ссылки для продолжения обхода)
+        """
+        return (await self.crawl([url], required))[url]
+
+    async def crawl(self, urls: Iterable[str], required: Optional[Sequence[str]] = None,
+                    resume: Optional[Dict[str, Dict]] = None) -> Dict[str, Dict]:
+        """
+        Обходит несколько сайтов с общей очередью страниц.
+
+        Args:
+            urls: URL страниц сайтов, с которых начинается обход
+            required: Поля, после нахождения которых обход сайта прекращается
+            resume: Итоги предыдущих обходов по URL: такие сайты обходятся с того места,
+                где остановился предыдущий обход, без повторного скачивания страниц
+
+        Returns:
+            Dict[str, Dict]: Итоги обхода по исходным URL (см. crawl_site)
+        """
+        required = tuple(required or self.required)
+        loop = asyncio.get_running_loop()
+        order = itertools.count()
+        states: Dict[str, _SiteState] = {}
+        # Элементы очереди: (-приоритет, глубина, порядковый номер, URL сайта, URL страницы)
+        frontier: List[Tuple[float, int, int, str, str]] = []
+
+        for url in urls:
+            if url and url not in states:
+                state = states[url] = _SiteState(url)
+                previous = (resume or {}).get(url)
+                if not previous or not previous['pages']:
+                    heapq.heappush(frontier, (-self.LANDING_PRIORITY, 0, next(order), url, url))
+                    continue
+                links = state.resume(previous)
+                if state.has(required):
+                    state.done = True
+                    state.frontier = links
+                    continue
+                for priority, depth, link in links:
+                    heapq.heappush(frontier, (-priority, depth, next(order), url, link))
+
+        tasks: Dict[asyncio.Task, Tuple[_SiteState, int]] = {}
+        async with aiohttp.ClientSession(headers={'User-Agent': USER_AGENT}) as session:
+            try:
+                while frontier or tasks:
+                    deferred = []
+                    while frontier and len(tasks) < self.concurrency:
+                        item = heapq.heappop(frontier)
+                        _, depth, _, site_url, url = item
+                        state = states[site_url]
+                        if (state.done or state.scheduled >= self.max_pages
+                                or (state.deadline is not None and loop.time() >= state.deadline)):
+                            # Ссылка не скачивается в этом обходе, но остается для продолжения
+                            state.frontier.append((-item[0], depth, url))
+                            continue
+                        if state.in_flight >= self.per_site_concurrency:
+                            deferred.append(item)
+                            continue
+                        if state.deadline is None:
+                            state.deadline = loop.time() + self.site_budget
+                        state.scheduled += 1
+                        state.in_flight += 1
+                        task = asyncio.create_task(self._visit(session, state, url, required))
+                        tasks[task] = (state, depth)
+                    for item in deferred:
+                        heapq.heappush(frontier, item)
+                    if not tasks:
+                        break
+
+                    done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        state, depth = tasks.pop(task)
+                        state.in_flight -= 1
+                        if depth >= self.max_depth:
+                            continue
+                        # Ссылки завершенных сайтов тоже сохраняются: по ним обход можно продолжить
+                        # с другим набором нужных полей
+                        for priority, link in task.result():
+                            if link not in state.seen:
+                                state.seen.add(link)
+                                heapq.heappush(frontier, (-priority, depth + 1, next(order), state.url, link))
+            finally:
+                for task in tasks:
+                    task.cancel()
+
+        for priority, depth, _, site_url, url in frontier:
+            states[site_url].frontier.append((-priority, depth, url))
+
+        results = {url: state.result(required) for url, state in states.items()}
+        complete = sum(1 for result in results.values() if result['complete'])
+        logger.info(f"Обход контактов: {len(results)} сайтов, скачано страниц "
+                    f"{sum(len(result['pages']) for result in results.values())}, все поля найдены у {complete}")
+        return results
+
+    async def _visit(self, session: aiohttp.ClientSession, state: _SiteState, url: str,
+                     required: Sequence[str]) -> List[Tuple[float, str]]:
+        """
+        Скачивает и разбирает страницу сайта.
+
+        Returns:
+            List[Tuple[float, str]]: Внутренние ссылки страницы с положительным приоритетом
+        """
+        try:
+            async with self._semaphore:
+                # Бюджет сайта считается после получения слота: ожидание в очереди тоже его расходует
+                remaining = state.deadline - asyncio.get_running_loop().time()
+                if remaining <= 0:
+                    logger.debug(f"Пропуск {url}: бюджет сайта {state.url} исчерпан в очереди")
+                    state.scheduled -= 1
+                    return []
+                html, final_url = await self._fetch(session, url, min(self.page_timeout, remaining))
+            if html is None:
+                return []
+
+            found = await cpu_pool.run('page', html, base_url=final_url)
+            state.pages.append(url)
+            state.merge(found)
+            if state.has(required) and not state.done:
+                state.done = True
+                logger.info(f"Все нужные данные сайта {state.url} найдены на {len(state.pages)} страницах")
+
+            links = [(link_priority(anchor['url'], anchor['text']), anchor['url']) for anchor in found['anchors']]
+            return [(priority, link) for priority, link in links if priority > 0]
+        except asyncio.TimeoutError:
+            logger.warning(f"Таймаут при скачивании {url}")
+        except Exception as e:
+            logger.error(f"Ошибка при обходе страницы {url}: {str(e)}")
+        return []
+
+    async def _fetch(self, session: aiohttp.ClientSession, url: str, timeout: float) -> Tuple[Optional[str], str]:
+        """
+        Скачивает HTML страницы (не больше max_bytes).
+
+        Returns:
+            Tuple[Optional[str], str]: HTML (или None, если это не HTML-страница) и итоговый URL после редиректов
+        """
+        async with session.get(url, timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+            if response.status != 200 or 'html' not in (response.content_type or ''):
+                logger.debug(f"Пропуск {url}: статус {response.status}, тип {response.content_type}")
+                return None, url
+            body = bytearray()
+            async for chunk in response.content.iter_chunked(64 * 1024):
+                body.extend(chunk)
+                if len(body) >= self.max_bytes:
+                    break
+            body = bytes(body[:self.max_bytes])
+            try:
+                return body.decode(response.charset or 'utf-8', errors='replace'), str(response.url)
+            except LookupError:
+                return body.decode('utf-8', errors='replace'), str(response.url)
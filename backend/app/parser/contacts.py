@@ -0,0 +1,157 @@
+import re
+import html
+import logging
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import unquote
+
+logger = logging.getLogger(__name__)
+
+# Разделители в записи телефона: пробелы, дефисы, скобки, точки
+_PHONE_SEP = r'[\s\-().]{0,3}'
+
+# Все виды контактов ищутся одним выражением, поэтому документ просматривается один раз.
+# Порядок альтернатив важен: ссылки (mailto:, tel:, мессенджеры) проверяются раньше
+# обычных адресов и телефонов, чтобы их содержимое не разбиралось повторно.
+# Выражение применяется к тексту в нижнем регистре: так оно работает заметно быстрее,
+# чем с флагом IGNORECASE.
+CONTACTS_REGEX = re.compile(
+    # Быстрый отсев позиций, с которых не может начинаться ни один контакт
+    r'(?=[a-z0-9+&%\[({])(?:'
+    r'mailto:(?P<mailto>[^\s"\'<>?&]+)'
+    r'|tel:(?P<tel>[+\d\s().\-%]{5,32})'
+    r'|(?:wa\.me/|whatsapp\.com/send/?\?phone=|whatsapp://send\?phone=)(?P<whatsapp>%2b\d{7,15}|\+?\d{7,15})'
+    r'|(?:t|telegram)\.me/(?P<telegram>[a-z][a-z0-9_]{3,31})(?![a-z0-9_])'
+    r'|tg://resolve\?domain=(?P<tg>[a-z][a-z0-9_]{3,31})'
+    r'|(?<![a-z0-9._%+\-])(?P<user>[a-z0-9][a-z0-9._%+\-]*)'
+    r'(?:(?P<at>@|&#0*64;|&#x0*40;|%40)|\s*(?:\[at\]|\(at\)|\{at\}|\[собака\]|\(собака\))\s*)'
+    r'(?P<domain>[a-z0-9\-]+(?:(?:\.|\s*(?:\[dot\]|\(dot\)|\{dot\}|\[точка\])\s*)[a-z0-9\-]+)*'
+    r'(?:\.|\s*(?:\[dot\]|\(dot\)|\{dot\}|\[точка\])\s*)[a-z]{2,24})(?![a-z0-9\-])'
+    rf'|(?<![\d+])(?P<phone>(?:\+7|8){_PHONE_SEP}\d{{3}}{_PHONE_SEP}\d{{3}}{_PHONE_SEP}\d{{2}}{_PHONE_SEP}\d{{2}}'
+    rf'|\+[1-9]\d{{0,2}}{_PHONE_SEP}\d{{2,4}}(?:{_PHONE_SEP}\d{{2,4}}){{2,3}})(?!\d)'
+    r')'
+)
+
+# Разделитель "dot" в обфусцированных адресах
+_DOT_REGEX = re.compile(r'\s*(?:\[dot\]|\(dot\)|\{dot\}|\[точка\])\s*')
+
+# "Адреса", которые на самом деле являются именами файлов (logo@2x.png)
+_FILE_EXTENSIONS = {
+    'png', 'jpg', 'jpeg', 'gif', 'svg', 'webp', 'bmp', 'ico', 'css', 'js', 'woff', 'woff2', 'ttf', 'eot'
+}
+
+# Служебные пути t.me, не являющиеся аккаунтами
+_TELEGRAM_RESERVED = {'share', 'joinchat', 'addstickers', 'addtheme', 'proxy', 'socks', 'iv', 'setlanguage'}
+
+def empty_contacts() -> Dict[str, List[str]]:
+    """Возвращает пустой набор контактов."""
+    return {"emails": [], "phones": [], "whatsapp": [], "telegram": []}
+
+def normalize_phone(raw: str) -> Optional[str]:
+    """
+    Приводит телефон к формату E.164.
+
+    Российские номера в формате 8XXXXXXXXXX и 10-значные номера без кода страны
+    дополняются кодом +7.
+
+    Args:
+        raw: Номер телефона в произвольной записи
+
+    Returns:
+        Optional[str]: Номер вида +79991234567 или None, если номер некорректен
+    """
+    raw = unquote(raw)
+    digits = re.sub(r'\D', '', raw)
+    if len(digits) == 11 and digits[0] == '8' and not raw.lstrip().startswith('+'):
+        digits = '7' + digits[1:]
+    elif len(digits) == 10 and digits[0] == '9':
+        digits = '7' + digits
+    if not 8 <= len(digits) <= 15 or digits[0] == '0':
+        return None
+    if digits[0] == '7' and len(digits) != 11:
+        return None
+    return '+' + digits
+
+def normalize_email(raw: str) -> Optional[str]:
+    """
+    Нормализует адрес электронной почты.
+
+    Args:
+        raw: Адрес (возможно, из mailto: или обфусцированный и уже раскодированный)
+
+    Returns:
+        Optional[str]: Адрес в нижнем регистре или None, если это не адрес
+    """
+    email = unquote(html.unescape(raw)).strip().strip('.').lower()
+    if email.count('@') != 1:
+        return None
+    user, domain = email.split('@')
+    if not user or '.' not in domain or domain.rsplit('.', 1)[-1] in _FILE_EXTENSIONS:
+        return None
+    return email
+
+class ContactExtractor:
+    """
+    Извлекает контакты из текста или HTML страницы за один проход.
+
+    Находит адреса электронной почты (включая mailto: и обфусцированные вида
+    "info [at] example [dot] ru"), телефоны в формате E.164 (включая ссылки tel:),
+    ссылки WhatsApp и Telegram. Результаты нормализуются и не повторяются.
+    """
+
+    def extract(self, text: str) -> Dict[str, List[str]]:
+        """
+        Извлекает контакты из одного документа.
+
+        Args:
+            text: Текст или HTML страницы
+
+        Returns:
+            Dict[str, List[str]]: Контакты по ключам emails, phones, whatsapp, telegram
+            в порядке появления в документе
+        """
+        contacts = empty_contacts()
+        seen = set()
+
+        for match in CONTACTS_REGEX.finditer(text.lower()):
+            kind, value = self._normalize(match)
+            if value and (kind, value) not in seen:
+                seen.add((kind, value))
+                contacts[kind].append(value)
+        return contacts
+
+    def extract_many(self, documents: Iterable[str]) -> List[Dict[str, List[str]]]:
+        """
+        Извлекает контакты из пакета документов.
+
+        Args:
+            documents: Тексты или HTML страниц
+
+        Returns:
+            List[Dict[str, List[str]]]: Контакты каждого документа в порядке входных данных
+        """
+        return [self.extract(document or "") for document in documents]
+
+    @staticmethod
+    def _normalize(match: re.Match) -> tuple:
+        """Определяет вид контакта по совпадению и нормализует его значение."""
+        group = match.lastgroup
+        if group == 'mailto':
+            return 'emails', normalize_email(match.group('mailto'))
+        if group == 'tel':
+            return 'phones', normalize_phone(match.group('tel'))
+        if group == 'whatsapp':
+            return 'whatsapp', normalize_phone('+' + match.group('whatsapp').replace('%2b', '').lstrip('+'))
+        if group in ('telegram', 'tg'):
+            name = match.group(group).lower()
+            return 'telegram', (None if name in _TELEGRAM_RESERVED else f"https://t.me/{name}")
+        if group == 'domain':
+            domain = match.group('domain') if match.group('at') else _DOT_REGEX.sub('.', match.group('domain'))
+            return 'emails', normalize_email(f"{match.group('user')}@{domain}")
+        return 'phones', normalize_phone(match.group('phone'))
+
+# Общий экземпляр для модулей парсера
+contact_extractor = ContactExtractor()
+
+def extract_contacts(text: str) -> Dict[str, List[str]]:
+    """Извлекает контакты из документа общим экземпляром ContactExtractor."""
+    return contact_extractor.extract(text)
@@ -0,0 +1,284 @@
+import os
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+from .html_parsing import serp_items, visible_text, extract_links, extract_anchors, extract_meta
+from .contacts import extract_contacts
+from .requisites import extract_requisites, primary_requisites
+from .markers import MarkerMatcher, COMPANY_MARKERS
+
+logger = logging.getLogger(__name__)
+
+Payload = Union[str, bytes]
+
+def _decode(data: bytes, encoding: str = "utf-8") -> str:
+    """Декодирует документ, заменяя некорректные последовательности."""
+    return data.decode(encoding, errors="replace")
+
+@lru_cache(maxsize=32)
+def _matcher(markers: Tuple[str, ...]) -> MarkerMatcher:
+    """Строит автомат поиска маркеров (один раз на процесс для каждого набора)."""
+    return MarkerMatcher(markers)
+
+def parse_job(data: bytes, base_url: Optional[str] = None) -> Dict[str, Any]:
+    """Разбирает страницу: видимый текст, ссылки и метаданные."""
+    # lexbor разбирает байты напрямую, документ не декодируется отдельно
+    return {
+        "text": visible_text(data),
+        "links": extract_links(data, base_url=base_url),
+        "meta": extract_meta(data),
+    }
+
+def serp_job(data: bytes, item_selector: str, link_selector: str = "a",
+             title_selector: Optional[str] = None, snippet_selector: Optional[str] = None) -> List[Dict[str, str]]:
+    """Извлекает результаты поисковой выдачи (см. html_parsing.serp_items)."""
+    return serp_items(data, item_selector, link_selector, title_selector, snippet_selector)
+
+def extract_job(data: bytes, encoding: str = "utf-8") -> Dict[str, Any]:
+    """Извлекает контакты и реквизиты компании из документа."""
+    text = _decode(data, encoding)
+    return {"contacts": extract_contacts(text), "requisites": extract_requisites(text)}
+
+def classify_job(data: bytes, markers: Sequence[str] = COMPANY_MARKERS, encoding: str = "utf-8") -> Dict[str, Any]:
+    """Ищет маркеры юридического лица и основные реквизиты компании в документе."""
+    text = _decode(data, encoding)
+    # Маркеры в UTF-8 ищутся прямо в байтах, без копии документа в нижнем регистре
+    found = _matcher(tuple(markers)).matched(data if encoding == "utf-8" else text)
+    return {"markers": found, "requisites": primary_requisites(extract_requisites(text))}
+
+def page_job(data: bytes, base_url: str, encoding: str = "utf-8") -> Dict[str, Any]:
+    """Извлекает из страницы сайта контакты, реквизиты и внутренние ссылки с их текстом."""
+    text = _decode(data, encoding)
+    return {
+        "contacts": extract_contacts(text),
+        "requisites": extract_requisites(text),
+        "anchors": extract_anchors(data, base_url),
+    }
+
+# Задания, которые можно выполнять в пуле. Функции определены на уровне модуля,
+# поэтому рабочие процессы получают по каналу только имя задания и данные.
+JOBS: Dict[str, Callable[..., Any]] = {
+    "parse": parse_job,
+    "serp": serp_job,
+    "extract": extract_job,
+    "classify": classify_job,
+    "page": page_job,
+}
+
+def _run_batch(job: str, items: List[Tuple[bytes, Dict[str, Any]]]) -> List[Tuple[bool, Any]]:
+    """
+    Выполняет пакет заданий в рабочем процессе.
+
+    Ошибка одного документа не прерывает пакет: для него возвращается текст ошибки.
+
+    Returns:
+        List[Tuple[bool, Any]]: Пары (успех, результат или текст ошибки) в порядке входных данных
+    """
+    function = JOBS[job]
+    results = []
+    for data, options in items:
+        try:
+            results.append((True, function(data, **options)))
+        except Exception as e:
+            results.append((False, f"{type(e).__name__}: {e}"))
+    return results
+
+def _warm_up() -> None:
+    """Инициализирует рабочий процесс: компилирует выражения до первого задания."""
+    _matcher(COMPANY_MARKERS)
+
+class CpuPool:
+    """
+    Пул процессов для разбора HTML и поиска по регулярным выражениям.
+
+    Тяжелая по CPU работа над целыми документами (разбор страницы, поиск маркеров,
+    извлечение контактов и реквизитов) выполняется в отдельных процессах, а асинхронный
+    конвейер только ожидает результат, поэтому большая страница не останавливает
+    обработку остальных запросов воркера.
+
+    Документы передаются в процессы как байты (UTF-8), без повторного кодирования.
+    Одновременные задания одного вида собираются в пакет (до batch_size документов
+    или batch_bytes байт, либо по истечении batch_delay секунд), и пакет передается
+    в процесс одним вызовом. Документы меньше inline_threshold байт, а также все
+    задания до запуска пула выполняются сразу в текущем процессе: для них передача
+    данных дороже самой работы.
+    """
+
+    def __init__(self, inline_threshold: int = 64 * 1024, batch_size: int = 16,
+                 batch_bytes: int = 2 * 1024 * 1024, batch_delay: float = 0.002):
+        """
+        Args:
+            inline_threshold: Размер документа в байтах, до которого задание выполняется в текущем процессе
+            batch_size: Максимальное количество документов в одном пакете
+            batch_bytes: Максимальный суммарный размер документов в одном пакете
+            batch_delay: Сколько секунд пакет ожидает другие задания перед отправкой
+        """
+        self.inline_threshold = inline_threshold
+        self.batch_size = batch_size
+        self.batch_bytes = batch_bytes
+        self.batch_delay = batch_delay
+        self.workers = 0
+        self._executor: Optional[ProcessPoolExecutor] = None
+        # Незавершенные пакеты по видам заданий: документы, параметры и ожидающие их futures
+        self._pending: Dict[str, List[Tuple[bytes, Dict[str, Any], asyncio.Future]]] = {}
+        self._pending_bytes: Dict[str, int] = {}
+        self.stats = {"inline": 0, "offloaded": 0, "batches": 0, "errors": 0}
+
+    @property
+    def running(self) -> bool:
+        """Запущен ли пул процессов."""
+        return self._executor is not None
+
+    def start(self, workers: int = 0, **settings) -> None:
+        """
+        Запускает рабочие процессы.
+
+        Args:
+            workers: Количество процессов (0 - ядра минус одно, поделенные между процессами
+                приложения WEB_CONCURRENCY, но не меньше одного)
+            **settings: Значения inline_threshold, batch_size, batch_bytes, batch_delay
+        """
+        for name, value in settings.items():
+            if value is not None and hasattr(self, name):
+                setattr(self, name, value)
+        if self._executor is not None:
+            return
+
+        # Пул запускается в каждом процессе приложения, поэтому ядра делятся между ними
+        try:
+            app_processes = max(1, int(os.getenv("WEB_CONCURRENCY", "1")))
+        except ValueError:
+            app_processes = 1
+        self.workers = workers or max(1, ((os.cpu_count() or 2) - 1) // app_processes)
+        # spawn вместо fork: процесс с работающим циклом событий и потоками копировать небезопасно
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_warm_up,
+        )
+        logger.info(f"Пул процессов запущен: {self.workers} процессов, "
+                    f"документы до {self.inline_threshold} байт обрабатываются на месте")
+
+    async def shutdown(self) -> None:
+        """Отправляет накопленные пакеты и останавливает рабочие процессы."""
+        for job in list(self._pending):
+            self._flush(job)
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            await asyncio.get_running_loop().run_in_executor(None, executor.shutdown)
+            logger.info(f"Пул процессов остановлен, статистика: {self.stats}")
+
+    async def run(self, job: str, payload: Payload, **options) -> Any:
+        """
+        Выполняет задание над одним документом.
+
+        Args:
+            job: Имя задания (parse, serp, extract, classify, page)
+            payload: Документ (строка или байты)
+            **options: Параметры задания
+
+        Returns:
+            Any: Результат задания
+
+        Raises:
+            RuntimeError: Если задание завершилось ошибкой в рабочем процессе
+        """
+        if job not in JOBS:
+            raise ValueError(f"Неизвестное задание: {job}")
+        data = payload.encode("utf-8") if isinstance(payload, str) else (payload or b"")
+
+        if self._executor is None or len(data) < self.inline_threshold:
+            self.stats["inline"] += 1
+            return JOBS[job](data, **options)
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        bucket = self._pending.setdefault(job, [])
+        bucket.append((data, options, future))
+        self._pending_bytes[job] = self._pending_bytes.get(job, 0) + len(data)
+
+        if len(bucket) >= self.batch_size or self._pending_bytes[job] >= self.batch_bytes:
+            self._flush(job)
+        elif len(bucket) == 1:
+            loop.call_later(self.batch_delay, self._flush, job)
+
+        ok, result = await future
+        if not ok:
+            raise RuntimeError(f"Ошибка задания {job}: {result}")
+        return result
+
+    async def map(self, job: str, payloads: Sequence[Payload], **options) -> List[Any]:
+        """
+        Выполняет задание над несколькими документами с общими параметрами.
+
+        Returns:
+            List[Any]: Результаты в порядке входных документов
+        """
+        return list(await asyncio.gather(*(self.run(job, payload, **options) for payload in payloads)))
+
+    def _flush(self, job: str) -> None:
+        """Отправляет накопленный пакет заданий одного вида в пул."""
+        bucket = self._pending.pop(job, None)
+        self._pending_bytes.pop(job, None)
+        if not bucket:
+            return
+
+        items = [(data, options) for data, options, _ in bucket]
+        futures = [future for _, _, future in bucket]
+        self.stats["offloaded"] += len(items)
+        self.stats["batches"] += 1
+
+        if self._executor is None:
+            # Пул остановлен, пока пакет ожидал отправки
+            self._deliver(futures, _run_batch(job, items))
+            return
+        try:
+            batch = asyncio.get_running_loop().run_in_executor(self._executor, _run_batch, job, items)
+        except (RuntimeError, BrokenProcessPool) as e:
+            # Пул остановлен или сломан: выполняем пакет на месте, чтобы не терять задания
+            logger.error(f"Не удалось отправить пакет {job} в пул процессов: {e}")
+            self._deliver(futures, _run_batch(job, items))
+            return
+        batch.add_done_callback(lambda done: self._on_batch_done(done, job, futures))
+
+    def _on_batch_done(self, done: asyncio.Future, job: str, futures: List[asyncio.Future]) -> None:
+        """Передает результаты пакета ожидающим заданиям."""
+        if done.cancelled():
+            for future in futures:
+                if not future.done():
+                    future.cancel()
+            return
+
+        error = done.exception()
+        if error is None:
+            self._deliver(futures, done.result())
+            return
+
+        self.stats["errors"] += 1
+        logger.error(f"Сбой пула процессов при выполнении пакета {job}: {error}")
+        if isinstance(error, BrokenProcessPool):
+            # Рабочий процесс аварийно завершился: пересоздаем пул для следующих заданий
+            executor, self._executor = self._executor, None
+            if executor is not None:
+                executor.shutdown(wait=False, cancel_futures=True)
+                self.start(self.workers)
+        self._deliver(futures, [(False, str(error))] * len(futures))
+
+    @staticmethod
+    def _deliver(futures: List[asyncio.Future], results: List[Tuple[bool, Any]]) -> None:
+        """Устанавливает результаты futures, которые еще ожидаются."""
+        for future, result in zip(futures, results):
+            if not future.done():
+                future.set_result(result)
+
+    def get_stats(self) -> Dict[str, int]:
+        """Возвращает количество заданий, выполненных на месте и в пуле, число пакетов и сбоев."""
+        return dict(self.stats, workers=self.workers)
+
+# Общий пул процесса (запускается при старте приложения)
+cpu_pool = CpuPool()
@@ -0,0 +1,146 @@
+import logging
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Set
+from .classification_cache import ClassificationCache
+from .utils import registrable_domain
+
+logger = logging.getLogger(__name__)
+
+class EntityIndex:
+    """
+    Индекс юридических лиц: ИНН -> домены компании.
+
+    Одна компания часто встречается в выдаче под несколькими доменами (зеркала, региональные
+    сайты, лендинги). Индекс связывает домены по ИНН, найденному на сайте или в сниппете,
+    чтобы не классифицировать повторно сайты уже известной компании и сворачивать
+    результаты до одной строки на юридическое лицо. В памяти процесса хранится
+    ограниченное количество недавно встреченных компаний (LRU), а остальные берутся
+    из таблицы domains через кэш классификации.
+    """
+
+    def __init__(self, cache: ClassificationCache, size: Optional[int] = None):
+        """
+        Инициализирует индекс.
+
+        Args:
+            cache: Кэш классификации доменов, в таблице которого хранятся реквизиты
+            size: Максимальное количество компаний в памяти процесса
+                (по умолчанию - как у LRU-кэша классификации)
+        """
+        self.cache = cache
+        self.size = size or cache.lru_size
+        self._entities: "OrderedDict[str, Dict]" = OrderedDict()
+        self._domain_inn: Dict[str, str] = {}
+
+    def add(self, domain: str, requisites: Dict[str, Optional[str]], category: Optional[str] = None) -> Optional[str]:
+        """
+        Добавляет домен к компании.
+
+        Args:
+            domain: Домен или URL сайта компании
+            requisites: Реквизиты компании (ключи inn, ogrn, kpp)
+            category: Категория, присвоенная сайту компании
+
+        Returns:
+            Optional[str]: ИНН компании или None, если ИНН не известен
+        """
+        inn = requisites.get("inn")
+        if not inn:
+            return None
+
+        key = registrable_domain(domain)
+        entity = self._entities.setdefault(inn, {"inn": inn, "ogrn": None, "kpp": None,
+                                                 "category": None, "domains": set()})
+        entity["ogrn"] = entity["ogrn"] or requisites.get("ogrn")
+        entity["kpp"] = entity["kpp"] or requisites.get("kpp")
+        # Поставщиком компания считается, если поставщиком признан хотя бы один ее сайт
+        if category == 'supplier' or (category and not entity["category"]):
+            entity["category"] = category
+
+        if key not in entity["domains"] and entity["domains"]:
+            logger.info(f"Домен {key} принадлежит компании с ИНН {inn}, уже известной по доменам "
+                        f"{', '.join(sorted(entity['domains']))}")
+        entity["domains"].add(key)
+        self._domain_inn[key] = inn
+        self._entities.move_to_end(inn)
+        self._evict()
+        return inn
+
+    def _evict(self) -> None:
+        """Удаляет давно не встречавшиеся компании сверх size вместе с их доменами."""
+        while len(self._entities) > self.size:
+            inn, entity = self._entities.popitem(last=False)
+            for domain in entity["domains"]:
+                if self._domain_inn.get(domain) == inn:
+                    del self._domain_inn[domain]
+
+    def get(self, inn: str) -> Optional[Dict]:
+        """Возвращает компанию по ИНН (ключи inn, ogrn, kpp, category, domains) или None."""
+        entity = self._entities.get(inn)
+        if entity:
+            self._entities.move_to_end(inn)
+        return entity
+
+    def inn_of(self, domain: str) -> Optional[str]:
+        """Возвращает ИНН компании, которой принадлежит домен, или None."""
+        return self._domain_inn.get(registrable_domain(domain))
+
+    def domains(self, inn: str) -> Set[str]:
+        """Возвращает все известные домены компании."""
+        entity = self._entities.get(inn)
+        return set(entity["domains"]) if entity else set()
+
+    async def lookup(self, inns: Iterable[str]) -> Dict[str, Dict]:
+        """
+        Возвращает известные компании по ИНН, дополняя индекс сохраненными в базе доменами.
+
+        Args:
+            inns: ИНН компаний
+
+        Returns:
+            Dict[str, Dict]: Компании по ИНН (только найденные)
+        """
+        inns = {inn for inn in inns if inn}
+        missing = {inn for inn in inns if inn not in self._entities}
+
+        for inn, rows in (await self.cache.get_by_inn(missing)).items():
+            for row in rows:
+                self.add(row["domain"], row, row["category"])
+
+        return {inn: entity for inn, entity in ((inn, self.get(inn)) for inn in inns) if entity}
+
+    def collapse(self, sites: List[Dict]) -> List[Dict]:
+        """
+        Сворачивает результаты до одной строки на юридическое лицо.
+
+        Первая строка компании остается на своем месте и получает список mirrors с URL
+        остальных ее сайтов. Сайты без известного ИНН не изменяются.
+
+        Args:
+            sites: Результаты поиска (ИНН берется из ключа inn или из индекса по домену)
+
+        Returns:
+            List[Dict]: Результаты без повторов компаний
+        """
+        collapsed = []
+        leaders: Dict[str, Dict] = {}
+
+        for site in sites:
+            inn = site.get("inn") or self.inn_of(site.get("url", ""))
+            if not inn:
+                collapsed.append(site)
+                continue
+
+            if inn in leaders:
+                leaders[inn]["mirrors"].append(site.get("url", ""))
+                continue
+
+            leaders[inn] = dict(site, inn=inn, mirrors=[])
+            collapsed.append(leaders[inn])
+
+        return collapsed
+
+    def clear(self) -> None:
+        """Очищает индекс в памяти процесса."""
+        self._entities.clear()
+        self._domain_inn.clear()
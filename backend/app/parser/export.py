@@ -0,0 +1,328 @@
+import io
+import os
+import csv
+import json
+import zlib
+import asyncio
+import hashlib
+import logging
+import tempfile
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+from sqlalchemy import select, func, and_, or_
+from app.db.session import async_session
+from app.models.domain import Domain
+from app.models.query_result import QueryResult
+from app.models.search_query import SearchQuery
+from .result_writer import normalize_query
+
+logger = logging.getLogger(__name__)
+
+# Колонки выгрузки в порядке вывода
+EXPORT_FIELDS = (
+    "id", "query", "url", "domain", "title", "snippet", "company_name",
+    "email", "phone", "region", "category", "created_at", "updated_at",
+)
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+Chunks = AsyncIterator[bytes]
+
+# Длины уже построенных выгрузок по ETag (ETag определяет байты выгрузки), чтобы запросы
+# с Range не строили выгрузку лишний раз только ради ее длины
+EXPORT_LENGTHS_SIZE = 1024
+_export_lengths: "OrderedDict[str, int]" = OrderedDict()
+
+def results_select():
+    """
+    Запрос строк выгрузки: результат поиска с запросом, классификацией, реквизитами
+    и контактами домена (колонки названы так же, как поля выгрузки). Классификация,
+    ИНН и контакты самого результата (в его запуске) - колонки с префиксом result_.
+    """
+    return (
+        select(
+            QueryResult.id, SearchQuery.query, QueryResult.url, Domain.domain, QueryResult.title,
+            QueryResult.snippet, Domain.company_name, Domain.email, Domain.phone, Domain.region,
+            Domain.category, QueryResult.created_at, QueryResult.updated_at, Domain.evidence,
+            Domain.inn, Domain.ogrn, Domain.kpp, Domain.classified_at, QueryResult.run_id,
+            QueryResult.category.label("result_category"), QueryResult.evidence.label("result_evidence"),
+            QueryResult.inn.label("result_inn"), QueryResult.contacts.label("result_contacts"),
+        )
+        .join(SearchQuery, SearchQuery.id == QueryResult.query_id)
+        .join(Domain, Domain.id == QueryResult.domain_id)
+    )
+
+def _query_filter(statement, query: Optional[str]):
+    """Ограничивает запрос результатами одного поискового запроса (по нормализованному тексту)."""
+    if query is None:
+        return statement
+    query_id = select(SearchQuery.id).where(SearchQuery.query_norm == normalize_query(query)).scalar_subquery()
+    return statement.where(QueryResult.query_id == query_id)
+
+def _row(result) -> Dict[str, Any]:
+    """Запись результата поиска для выгрузки."""
+    row = {}
+    for field in EXPORT_FIELDS:
+        value = getattr(result, field)
+        row[field] = value.isoformat() if isinstance(value, datetime) else value
+    return row
+
+async def export_snapshot(query: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Фиксирует границу выгрузки: последний id и отпечаток строк до него.
+
+    Выгрузка с той же границей (until_id) выдает те же байты, пока строки до границы
+    не изменились, поэтому ее можно докачивать с места обрыва (Range). Отпечаток
+    (количество строк, время последнего изменения строк и их доменов) меняется при
+    удалении или обновлении строк, классификации и контактов доменов и входит в ETag.
+
+    Returns:
+        Dict: until_id, rows, updated_at и domains_updated_at
+    """
+    async with async_session() as session:
+        statement = _query_filter(select(func.max(QueryResult.id)), query)
+        until_id = (await session.execute(statement)).scalar() or 0
+        return await _fingerprint(session, query, until_id)
+
+async def _fingerprint(session, query: Optional[str], until_id: int) -> Dict[str, Any]:
+    statement = _query_filter(
+        select(func.count(QueryResult.id), func.max(QueryResult.updated_at), func.max(Domain.updated_at))
+        .join(Domain, Domain.id == QueryResult.domain_id)
+        .where(QueryResult.id <= until_id),
+        query
+    )
+    rows, updated_at, domains_updated_at = (await session.execute(statement)).one()
+    return {"until_id": until_id, "rows": rows, "updated_at": updated_at.isoformat() if updated_at else None,
+            "domains_updated_at": domains_updated_at.isoformat() if domains_updated_at else None}
+
+async def pinned_snapshot(query: Optional[str], until_id: int) -> Dict[str, Any]:
+    """Отпечаток строк до уже зафиксированной границы (для повторного запроса выгрузки)."""
+    async with async_session() as session:
+        return await _fingerprint(session, query, until_id)
+
+def export_etag(snapshot: Dict[str, Any], query: Optional[str], file_format: str, compress: bool,
+                after_id: int = 0) -> str:
+    """ETag выгрузки: параметры и отпечаток строк."""
+    key = json.dumps([query, file_format, compress, after_id, snapshot], ensure_ascii=False, default=str)
+    return '"' + hashlib.sha1(key.encode("utf-8")).hexdigest() + '"'
+
+async def iter_search_results(query: Optional[str] = None, after_id: int = 0, until_id: Optional[int] = None,
+                              batch_size: int = 1000,
+                              row: Callable[[Any], Any] = _row) -> AsyncIterator[List[Any]]:
+    """
+    Читает результаты поиска из базы пачками по возрастанию id.
+
+    Каждая пачка - отдельный запрос по ключу (id > последний прочитанный), поэтому память
+    не зависит от размера выгрузки и соединение не удерживается между пачками.
+
+    Args:
+        query: Поисковый запрос (None - все запросы)
+        after_id: Начать после этого id
+        until_id: Не читать строки с id больше этого
+        batch_size: Размер пачки
+        row: Преобразование строки results_select() (по умолчанию - запись с полями EXPORT_FIELDS,
+            даты в ISO 8601)
+
+    Yields:
+        List[Any]: Пачка преобразованных строк
+    """
+    last_id = after_id
+    while True:
+        statement = _query_filter(results_select().where(QueryResult.id > last_id), query)
+        if until_id is not None:
+            statement = statement.where(QueryResult.id <= until_id)
+        statement = statement.order_by(QueryResult.id).limit(batch_size)
+        async with async_session() as session:
+            results = (await session.execute(statement)).all()
+        if not results:
+            return
+        yield [row(result) for result in results]
+        if len(results) < batch_size:
+            return
+        last_id = results[-1].id
+
+async def iter_changed_results(after: Tuple[Optional[datetime], int], until: datetime, batch_size: int = 1000,
+                               row: Callable[[Any], Any] = _row) -> AsyncIterator[List[Any]]:
+    """
+    Читает результаты поиска, добавленные или обновленные после отметки, пачками
+    по возрастанию (updated_at, id).
+
+    Повторный поиск обновляет строку на месте (id не меняется, updated_at - время запуска),
+    поэтому отметка по id такие строки пропустила бы.
+
+    Args:
+        after: Отметка (updated_at, id) последней прочитанной строки ((None, 0) - с начала)
+        until: Не читать строки с updated_at позже этого времени
+        batch_size: Размер пачки
+        row: Преобразование строки results_select()
+
+    Yields:
+        List[Any]: Пачка преобразованных строк
+    """
+    last_updated_at, last_id = after
+    while True:
+        statement = results_select().where(QueryResult.updated_at <= until)
+        if last_updated_at is not None:
+            statement = statement.where(or_(
+                QueryResult.updated_at > last_updated_at,
+                and_(QueryResult.updated_at == last_updated_at, QueryResult.id > last_id),
+            ))
+        statement = statement.order_by(QueryResult.updated_at, QueryResult.id).limit(batch_size)
+        async with async_session() as session:
+            results = (await session.execute(statement)).all()
+        if not results:
+            return
+        yield [row(result) for result in results]
+        if len(results) < batch_size:
+            return
+        last_updated_at, last_id = results[-1].updated_at, results[-1].id
+
+async def ndjson_chunks(batches: AsyncIterator[List[Dict[str, Any]]]) -> Chunks:
+    """Выгрузка в NDJSON: одна запись - одна строка JSON."""
+    async for batch in batches:
+        yield "".join(json.dumps(row, ensure_ascii=False) + "\n" for row in batch).encode("utf-8")
+
+async def csv_chunks(batches: AsyncIterator[List[Dict[str, Any]]], bom: bool = True) -> Chunks:
+    """
+    Выгрузка в CSV (RFC 4180, кавычки и переводы строк экранирует модуль csv).
+
+    Args:
+        bom: Добавить метку порядка байтов UTF-8, чтобы Excel открыл кириллицу без выбора кодировки
+    """
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS, extrasaction="ignore", lineterminator="\r\n")
+    writer.writeheader()
+    yield (("\ufeff" if bom else "") + buffer.getvalue()).encode("utf-8")
+    async for batch in batches:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(batch)
+        yield buffer.getvalue().encode("utf-8")
+
+def _xlsx_append(sheet, batch: List[Dict[str, Any]]) -> None:
+    for row in batch:
+        sheet.append([row.get(field) for field in EXPORT_FIELDS])
+
+async def xlsx_chunks(batches: AsyncIterator[List[Dict[str, Any]]], chunk_size: int = 256 * 1024) -> Chunks:
+    """
+    Выгрузка в XLSX.
+
+    XLSX - zip-архив, и его оглавление пишется в конце, поэтому книга собирается
+    во временном файле (openpyxl в режиме write_only держит в памяти только текущую
+    строку) и затем отдается частями; файл удаляется по окончании.
+    """
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("results")
+    sheet.append(list(EXPORT_FIELDS))
+    async for batch in batches:
+        await asyncio.to_thread(_xlsx_append, sheet, batch)
+
+    descriptor, path = tempfile.mkstemp(suffix=".xlsx")
+    os.close(descriptor)
+    try:
+        await asyncio.to_thread(workbook.save, path)
+        with open(path, "rb") as f:
+            while True:
+                chunk = await asyncio.to_thread(f.read, chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+    finally:
+        os.remove(path)
+
+async def gzip_chunks(chunks: Chunks, level: int = 6) -> Chunks:
+    """Сжимает поток в gzip на лету (без времени в заголовке, поэтому результат воспроизводим)."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    async for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+async def byte_range(chunks: Chunks, start: int, end: Optional[int] = None) -> Chunks:
+    """Оставляет из потока байты с start по end включительно."""
+    position = 0
+    async for chunk in chunks:
+        chunk_start, position = position, position + len(chunk)
+        if position <= start:
+            continue
+        if end is not None and chunk_start > end:
+            break
+        yield chunk[max(0, start - chunk_start):(end + 1 - chunk_start) if end is not None else None]
+        if end is not None and position > end:
+            break
+
+async def stream_length(chunks: Chunks) -> int:
+    """Длина потока в байтах (поток генерируется и отбрасывается)."""
+    total = 0
+    async for chunk in chunks:
+        total += len(chunk)
+    return total
+
+def known_length(etag: str) -> Optional[int]:
+    """Длина выгрузки с этим ETag, если она уже строилась целиком (иначе None)."""
+    total = _export_lengths.get(etag)
+    if total is not None:
+        _export_lengths.move_to_end(etag)
+    return total
+
+def remember_length(etag: str, total: int) -> None:
+    """Запоминает длину выгрузки с этим ETag."""
+    _export_lengths[etag] = total
+    _export_lengths.move_to_end(etag)
+    while len(_export_lengths) > EXPORT_LENGTHS_SIZE:
+        _export_lengths.popitem(last=False)
+
+async def measured(chunks: Chunks, etag: str) -> Chunks:
+    """Передает поток без изменений и запоминает его длину, если поток отдан до конца."""
+    total = 0
+    async for chunk in chunks:
+        total += len(chunk)
+        yield chunk
+    remember_length(etag, total)
+
+def export_stream(file_format: str, query: Optional[str] = None, until_id: Optional[int] = None,
+                  after_id: int = 0, compress: bool = False, batch_size: int = 1000) -> Chunks:
+    """
+    Собирает поток выгрузки результатов поиска.
+
+    Args:
+        file_format: ndjson, csv или xlsx
+        query: Поисковый запрос (None - все запросы)
+        until_id: Граница выгрузки (см. export_snapshot)
+        after_id: Продолжить после этого id
+        compress: Сжать поток в gzip
+        batch_size: Сколько строк читать из базы за раз
+
+    Returns:
+        AsyncIterator[bytes]: Части файла выгрузки
+
+    Raises:
+        ValueError: При неизвестном формате
+    """
+    writers: Dict[str, Callable[..., Chunks]] = {"ndjson": ndjson_chunks, "csv": csv_chunks, "xlsx": xlsx_chunks}
+    if file_format not in writers:
+        raise ValueError(f"Неподдерживаемый формат выгрузки: {file_format}")
+    chunks = writers[file_format](iter_search_results(query, after_id, until_id, batch_size))
+    return gzip_chunks(chunks) if compress else chunks
+
+def parse_range(header: Optional[str]) -> Optional[Tuple[int, Optional[int]]]:
+    """
+    Разбирает заголовок Range с одним диапазоном байтов (bytes=N- или bytes=N-M).
+
+    Returns:
+        Optional[Tuple[int, Optional[int]]]: Начало и конец диапазона или None
+    """
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    start, _, end = header[len("bytes="):].strip().partition("-")
+    if not start.isdigit() or (end and not end.isdigit()):
+        return None
+    return int(start), (int(end) if end else None)
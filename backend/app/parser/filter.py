@@ -3,7 +3,11 @@ import logging
 import traceback
 from typing import Dict, List
 from urllib.parse import urlparse
-from .storage import Storage
+from .storage import get_storage
+from .archive import HtmlArchive
+from .async_io import file_io
+from .cpu_pool import cpu_pool
+from .markers import company_matcher
 
 # Настройка логирования
 logging.basicConfig(
@@ -18,6 +22,8 @@ base_dir = os.path.join(os.getcwd(), "results")
 suppliers_dir = os.path.join(base_dir, "suppliers")
 others_dir = os.path.join(base_dir, "others")
 sites_dir = os.path.join(base_dir, "sites")
+# HTML хранится сжатым в общем с Storage архиве (results/archive)
+archive = HtmlArchive(os.path.join(base_dir, "archive"))
 
 logger.debug(f"Текущая рабочая директория: {os.getcwd()}")
 logger.debug(f"Полный путь к base_dir: {os.path.abspath(base_dir)}")
@@ -32,63 +38,29 @@ for directory in [base_dir, suppliers_dir, others_dir, sites_dir]:
         logger.error(f"Ошибка при создании директории {directory}: {e}")
         logger.error(traceback.format_exc())
 
-# Инициализация хранилища
-try:
-    storage = Storage()
-    logger.info("Хранилище успешно инициализировано")
-except Exception as e:
-    logger.error(f"Ошибка при инициализации хранилища: {e}")
-    logger.error(traceback.format_exc())
-    raise
-
-def save_html_to_file(domain: str, html: str, category: str) -> None:
-    """Сохраняет HTML-контент в файл"""
+async def save_html_to_file(domain: str, html: str, category: str) -> None:
+    """Сохраняет HTML-контент в сжатый архив под именем <категория>/<домен>"""
     logger.debug(f"=== Начало save_html_to_file ===")
     logger.debug(f"Домен: {domain}")
     logger.debug(f"Категория: {category}")
     logger.debug(f"Размер HTML: {len(html) if html else 0} байт")
     
-    try:
-        # Определяем путь к файлу
-        target_dir = suppliers_dir if category == 'suppliers' else others_dir
-        file_path = os.path.join(target_dir, f"{domain}.html")
-        
-        logger.debug(f"Целевая директория: {target_dir}")
-        logger.debug(f"Полный путь к файлу: {file_path}")
-        logger.debug(f"Директория существует: {os.path.exists(target_dir)}")
-        logger.debug(f"Права доступа к директории: {oct(os.stat(target_dir).st_mode)}")
+    if not html:
+        logger.warning("Получен пустой HTML-контент")
+        return
         
-        if not html:
-            logger.warning("Получен пустой HTML-контент")
-            return
-            
-        # Проверяем права доступа к директории
-        if not os.access(target_dir, os.W_OK):
-            logger.error(f"Нет прав на запись в директорию: {target_dir}")
-            return
-            
-        # Сохраняем HTML в файл
-        logger.debug("Начало записи в файл...")
-        with open(file_path, 'w', encoding='utf-8') as f:
-            f.write(html)
-            
-        if os.path.exists(file_path):
-            file_size = os.path.getsize(file_path)
-            logger.info(f"HTML-контент успешно сохранен в файл: {file_path}")
-            logger.info(f"Размер файла: {file_size} байт")
-        else:
-            logger.error(f"Файл не был создан: {file_path}")
+    name = f"{'suppliers' if category == 'suppliers' else 'others'}/{domain}"
+    try:
+        entry = await file_io.run(archive.put_named, name, html)
+        logger.info(f"HTML-контент {name} сохранен в архив: {entry['path']}")
+        logger.info(f"Размер: {entry['size']} байт, в архиве {entry['stored_size']} байт")
         
     except Exception as e:
-        logger.error(f"Ошибка при сохранении HTML в файл: {str(e)}")
+        logger.error(f"Ошибка при сохранении HTML в архив: {str(e)}")
         logger.error(f"Тип ошибки: {type(e).__name__}")
         logger.error(traceback.format_exc())
         if isinstance(e, PermissionError):
-            logger.error(f"Ошибка прав доступа к {file_path}")
-        elif isinstance(e, FileNotFoundError):
-            logger.error(f"Директория не найдена: {target_dir}")
-        elif isinstance(e, IOError):
-            logger.error(f"Ошибка ввода-вывода при работе с {file_path}")
+            logger.error(f"Ошибка прав доступа к {archive.root}")
 
 def has_company_markers(html: str) -> bool:
     """Проверяет наличие маркеров компании в HTML-контенте"""
@@ -98,22 +70,11 @@ def has_company_markers(html: str) -> bool:
         logger.warning("Получен пустой HTML-контент")
         return False
         
-    company_markers = [
-        'ИНН',
-        'ООО',
-        'ОАО',
-        'АО',
-        'ИП',
-        'реквизиты'
-    ]
-    
     logger.debug(f"Размер HTML: {len(html)} байт")
-    logger.debug(f"Поиск маркеров: {company_markers}")
+    logger.debug(f"Поиск маркеров: {company_matcher.markers}")
     
-    found_markers = []
-    for marker in company_markers:
-        if marker.lower() in html.lower():
-            found_markers.append(marker)
+    # Все маркеры ищутся за один проход, без копии документа в нижнем регистре
+    found_markers = company_matcher.matched(html)
             
     if found_markers:
         logger.info(f"Найдены маркеры компании: {found_markers}")
@@ -194,7 +155,11 @@ async def process_results(results: List[Dict], keyword: str) -> None:
             
             # Определяем категорию на основе HTML-контента
             logger.debug("Начало проверки маркеров компании...")
-            is_supplier = has_company_markers(html)
+            # Поиск по всему документу выполняется в пуле процессов, не блокируя цикл событий
+            classification = await cpu_pool.run('classify', html)
+            is_supplier = bool(classification['markers'])
+            if is_supplier:
+                logger.info(f"Найдены маркеры компании: {classification['markers']}")
             category = 'suppliers' if is_supplier else 'others'
             logger.info(f"Определена категория: {category}")
             
@@ -207,7 +172,7 @@ async def process_results(results: List[Dict], keyword: str) -> None:
                 logger.debug(f"- keyword: {keyword}")
                 logger.debug(f"- размер HTML: {len(html)} байт")
                 
-                await storage.save_site(domain, html, keyword, category)
+                await get_storage().save_site(domain, html, keyword, category)
                 
                 if category == 'suppliers':
                     suppliers_count += 1
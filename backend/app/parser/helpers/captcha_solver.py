@@ -6,6 +6,7 @@ import datetime
 from typing import Optional, Dict, Any, List
 from playwright.async_api import Page
 from ..config.parser_config import config
+from ..async_io import file_io
 
 logger = logging.getLogger(__name__)
 
@@ -102,8 +103,7 @@ class CaptchaSolver:
             html_filepath = os.path.join(config.captcha_screenshot_path, f"captcha_{timestamp}.html")
             html_content = await page.content()
             
-            with open(html_filepath, "w", encoding="utf-8") as f:
-                f.write(html_content)
+            await file_io.write(html_filepath, html_content)
                 
             logger.info(f"Сохранен скриншот капчи: {filepath} и HTML-код")
             return filepath
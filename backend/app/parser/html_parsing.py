@@ -0,0 +1,188 @@
+import re
+import logging
+from typing import Dict, Iterable, List, Optional, Union
+from urllib.parse import urljoin, urlparse
+from selectolax.lexbor import LexborHTMLParser as HTMLParser, LexborNode as Node
+
+logger = logging.getLogger(__name__)
+
+# Теги, содержимое которых не отображается на странице
+INVISIBLE_TAGS = ['script', 'style', 'noscript', 'template', 'svg', 'iframe', 'head']
+
+_WHITESPACE_REGEX = re.compile(r'\s+')
+
+Document = Union[str, bytes, HTMLParser]
+
+def parse_html(html: Document) -> HTMLParser:
+    """
+    Разбирает HTML быстрым парсером на C (selectolax с движком lexbor).
+
+    Args:
+        html: HTML-код страницы или уже разобранный документ
+
+    Returns:
+        HTMLParser: Разобранный документ
+    """
+    if isinstance(html, HTMLParser):
+        return html
+    return HTMLParser(html or "")
+
+def node_text(node: Optional[Node]) -> str:
+    """Возвращает текст узла без лишних пробелов (пустую строку, если узла нет)."""
+    if node is None:
+        return ""
+    return _WHITESPACE_REGEX.sub(' ', node.text(deep=True, separator=' ')).strip()
+
+def serp_items(html: Document, item_selector: str, link_selector: str = "a",
+               title_selector: Optional[str] = None, snippet_selector: Optional[str] = None) -> List[Dict[str, str]]:
+    """
+    Извлекает результаты поисковой выдачи.
+
+    Args:
+        html: HTML страницы выдачи
+        item_selector: CSS-селектор блока одного результата
+        link_selector: CSS-селектор ссылки внутри блока
+        title_selector: CSS-селектор заголовка (по умолчанию текст ссылки)
+        snippet_selector: CSS-селектор сниппета (по умолчанию сниппет не извлекается)
+
+    Returns:
+        List[Dict[str, str]]: Результаты с ключами url, title, snippet (без пустых ссылок)
+    """
+    items = []
+    for item in parse_html(html).css(item_selector):
+        link = item.css_first(link_selector)
+        url = (link.attributes.get("href") or "") if link else ""
+        if not url:
+            continue
+
+        title = node_text(item.css_first(title_selector)) if title_selector else node_text(link)
+        snippet = node_text(item.css_first(snippet_selector)) if snippet_selector else ""
+        items.append({"url": url, "title": title, "snippet": snippet})
+    return items
+
+def visible_text(html: Document, separator: str = " ") -> str:
+    """
+    Возвращает видимый текст страницы без скриптов, стилей и служебных блоков.
+
+    Args:
+        html: HTML страницы
+        separator: Разделитель текста соседних элементов
+
+    Returns:
+        str: Текст страницы с нормализованными пробелами
+    """
+    # Уже разобранный документ копируем, чтобы не изменять его у вызывающего кода
+    tree = html.clone() if isinstance(html, HTMLParser) else parse_html(html)
+    tree.strip_tags(INVISIBLE_TAGS)
+    root = tree.body or tree.root
+    if root is None:
+        return ""
+    return _WHITESPACE_REGEX.sub(' ', root.text(deep=True, separator=separator)).strip()
+
+def extract_links(html: Document, base_url: Optional[str] = None, selector: str = "a[href]",
+                  external_only: bool = False) -> List[str]:
+    """
+    Извлекает ссылки страницы без повторов, в порядке появления.
+
+    Args:
+        html: HTML страницы
+        base_url: URL страницы для преобразования относительных ссылок в абсолютные
+        selector: CSS-селектор ссылок
+        external_only: Оставлять только ссылки на другие домены (требует base_url)
+
+    Returns:
+        List[str]: Ссылки
+    """
+    base_host = urlparse(base_url).netloc if base_url else ""
+    links = []
+    seen = set()
+
+    for node in parse_html(html).css(selector):
+        href = (node.attributes.get("href") or "").strip()
+        if not href or href.startswith(("#", "javascript:")):
+            continue
+        if base_url:
+            href = urljoin(base_url, href)
+        if external_only and (not href.startswith("http") or urlparse(href).netloc == base_host):
+            continue
+        if href not in seen:
+            seen.add(href)
+            links.append(href)
+    return links
+
+def extract_anchors(html: Document, base_url: str, internal_only: bool = True) -> List[Dict[str, str]]:
+    """
+    Извлекает ссылки страницы вместе с текстом (и подсказками title/aria-label) без повторов.
+
+    Args:
+        html: HTML страницы
+        base_url: URL страницы для преобразования относительных ссылок в абсолютные
+        internal_only: Оставлять только ссылки на тот же домен
+
+    Returns:
+        List[Dict[str, str]]: Ссылки с ключами url и text в порядке появления (без фрагментов #)
+    """
+    base_host = urlparse(base_url).netloc
+    anchors = []
+    seen = set()
+
+    for node in parse_html(html).css("a[href]"):
+        href = (node.attributes.get("href") or "").strip()
+        if not href or href.startswith(("#", "javascript:", "mailto:", "tel:")):
+            continue
+        url = urljoin(base_url, href).split("#", 1)[0]
+        if not url.startswith("http") or (internal_only and urlparse(url).netloc != base_host):
+            continue
+        if url not in seen:
+            seen.add(url)
+            hint = node.attributes.get("title") or node.attributes.get("aria-label") or ""
+            anchors.append({"url": url, "text": f"{node_text(node)} {hint}".strip()})
+    return anchors
+
+def select_links(html: Document, selectors: Iterable[str]) -> List[str]:
+    """
+    Извлекает значения href по нескольким CSS-селекторам за один разбор документа.
+
+    Args:
+        html: HTML страницы
+        selectors: CSS-селекторы ссылок (проверяются по порядку)
+
+    Returns:
+        List[str]: Значения href в порядке селекторов (с повторами, как в документе)
+    """
+    tree = parse_html(html)
+    hrefs = []
+    for selector in selectors:
+        for node in tree.css(selector):
+            href = node.attributes.get("href")
+            if href:
+                hrefs.append(href)
+    return hrefs
+
+def extract_meta(html: Document) -> Dict[str, str]:
+    """
+    Извлекает заголовок и метаданные страницы.
+
+    Args:
+        html: HTML страницы
+
+    Returns:
+        Dict[str, str]: Ключи title, description, keywords, canonical, а также og:* и другие
+        meta-теги с атрибутами name или property (только найденные)
+    """
+    tree = parse_html(html)
+    meta: Dict[str, str] = {}
+
+    title = tree.css_first("title")
+    if title is not None:
+        meta["title"] = node_text(title)
+
+    for node in tree.css("meta[content]"):
+        key = node.attributes.get("name") or node.attributes.get("property")
+        if key:
+            meta.setdefault(key.lower(), (node.attributes.get("content") or "").strip())
+
+    canonical = tree.css_first('link[rel="canonical"]')
+    if canonical is not None and canonical.attributes.get("href"):
+        meta["canonical"] = canonical.attributes["href"]
+    return meta
@@ -0,0 +1,294 @@
+import os
+import json
+import fcntl
+import asyncio
+import logging
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Отпечаток файла снимка: меняется при каждой подмене снимка (compact)
+Token = Optional[Tuple[int, int, int]]
+
+class Journal:
+    """
+    Журнал изменений в формате JSON Lines с периодическим снимком состояния.
+
+    Каждое изменение дописывается в конец файла журнала одной строкой, поэтому запись
+    стоит O(размер изменения), а не O(размер всего состояния). append() возвращается только
+    после того, как запись надежно сохранена (fsync). Одиночная запись фиксируется сразу,
+    а записи, поступившие, пока идет фиксация предыдущих, собираются в пачку и фиксируются
+    одним вызовом fsync (групповая фиксация без дополнительной задержки).
+
+    Когда журнал становится длинным, владелец состояния записывает снимок (compact):
+    снимок пишется во временный файл, фиксируется и атомарно подменяет предыдущий
+    (os.replace), после чего журнал очищается. При старте состояние восстанавливается
+    чтением снимка и журнала (load). Недописанная последняя строка после сбоя
+    пропускается. Записи должны быть идемпотентными: если сбой произошел между
+    подменой снимка и очисткой журнала, записи журнала применятся повторно.
+
+    Журнал могут вести несколько процессов (воркеры приложения, скрипты). Каждая запись
+    и каждый снимок выполняются под блокировкой <name>.lock (fcntl.flock): процесс сначала
+    дочитывает записи других процессов и применяет их к своему состоянию (apply), затем
+    дописывает свои. Снимок строится из уже догнанного состояния, поэтому записи других
+    процессов не теряются. Если другой процесс успел записать снимок, состояние
+    перечитывается целиком (reset, затем apply). refresh() догоняет журнал без записи.
+    """
+
+    def __init__(self, directory: Path, name: str, compact_threshold: int = 10000,
+                 apply: Optional[Callable[[Dict], None]] = None, reset: Optional[Callable[[], None]] = None):
+        """
+        Args:
+            directory: Директория файлов журнала и снимка
+            name: Имя журнала (файлы <name>.journal, <name>.snapshot и <name>.lock)
+            compact_threshold: Количество записей журнала, после которого нужен снимок
+            apply: Применяет к состоянию владельца запись, записанную другим процессом
+            reset: Очищает состояние владельца перед полным перечитыванием
+        """
+        self.directory = Path(directory)
+        self.journal_path = self.directory / f"{name}.journal"
+        self.snapshot_path = self.directory / f"{name}.snapshot"
+        self.lock_path = self.directory / f"{name}.lock"
+        self.compact_threshold = compact_threshold
+        self.apply = apply
+        self.reset = reset
+        # Количество записей в журнале после последнего снимка
+        self.entries = 0
+        # Прочитанная часть журнала и снимок, из которого восстановлено состояние
+        self._position = 0
+        self._token: Token = None
+        self._pending: List[Tuple[str, Dict, asyncio.Future]] = []
+        self._lock = asyncio.Lock()
+
+    @property
+    def needs_compaction(self) -> bool:
+        """Пора ли записать снимок и очистить журнал."""
+        return self.entries >= self.compact_threshold
+
+    def exists(self) -> bool:
+        """Есть ли сохраненные снимок или журнал."""
+        return self.snapshot_path.exists() or self.journal_path.exists()
+
+    def _open_lock(self, operation: int) -> int:
+        """Открывает файл блокировки и берет блокировку (ожидая другие процессы)."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, operation)
+        except BaseException:
+            os.close(fd)
+            raise
+        return fd
+
+    @staticmethod
+    def _close_lock(fd: int) -> None:
+        try:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+        finally:
+            os.close(fd)
+
+    def _snapshot_token(self) -> Token:
+        try:
+            stat = self.snapshot_path.stat()
+        except FileNotFoundError:
+            return None
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    def _parse(self, data: bytes, path: Path) -> List[Dict]:
+        """Разбирает строки JSON Lines, пропуская поврежденные."""
+        records = []
+        for number, line in enumerate(data.split(b'\n'), 1):
+            if not line.strip():
+                continue
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                # Обычно это недописанная при сбое строка
+                logger.warning(f"Пропуск поврежденной строки {number} в {path}")
+        return records
+
+    def _read_changes(self) -> Tuple[bool, List[Dict]]:
+        """
+        Читает записи, появившиеся после прочитанной части (вызывается под блокировкой).
+
+        Returns:
+            Tuple[bool, List[Dict]]: Нужно ли перечитать состояние целиком (снимок подменен)
+            и записи для применения (при перечитывании - все записи снимка и журнала)
+        """
+        token = self._snapshot_token()
+        try:
+            size = self.journal_path.stat().st_size
+        except FileNotFoundError:
+            size = 0
+        reload = token != self._token or size < self._position
+        start = 0 if reload else self._position
+
+        records = []
+        if reload:
+            self.entries = 0
+            if token is not None:
+                records.extend(self._parse(self.snapshot_path.read_bytes(), self.snapshot_path))
+        if size > start:
+            with open(self.journal_path, 'rb') as f:
+                f.seek(start)
+                data = f.read(size - start)
+            # Недописанная строка читается, когда ее допишут (или пропускается как поврежденная)
+            complete = data.rfind(b'\n') + 1
+            changes = self._parse(data[:complete], self.journal_path)
+            self.entries += len(changes)
+            records.extend(changes)
+            start += complete
+        self._token, self._position = token, start
+        return reload, records
+
+    def load(self) -> Iterator[Dict]:
+        """
+        Читает записи снимка, а затем журнала, в порядке записи.
+
+        Yields:
+            Dict: Записи состояния
+        """
+        fd = self._open_lock(fcntl.LOCK_SH)
+        try:
+            self._token, self._position = None, 0
+            _, records = self._read_changes()
+        finally:
+            self._close_lock(fd)
+        yield from records
+
+    def _catch_up(self, reload: bool, records: List[Dict], own: Iterable[Dict]) -> None:
+        """
+        Применяет к состоянию записи других процессов.
+
+        Свои записи, уже примененные к состоянию (own), применяются еще раз после чужих,
+        чтобы состояние совпадало с порядком записей в журнале.
+        """
+        if not reload and not records:
+            return
+        if reload and self.reset:
+            self.reset()
+        if self.apply:
+            for record in records:
+                self.apply(record)
+            for record in own:
+                self.apply(record)
+
+    async def refresh(self) -> None:
+        """Применяет к состоянию записи, сделанные другими процессами."""
+        async with self._lock:
+            fd = await asyncio.to_thread(self._open_lock, fcntl.LOCK_SH)
+            try:
+                reload, records = await asyncio.to_thread(self._read_changes)
+                self._catch_up(reload, records, [record for _, record, _ in self._pending])
+            finally:
+                self._close_lock(fd)
+        # Записи, поступившие во время чтения
+        if self._pending:
+            await self.flush()
+
+    async def append(self, record: Dict) -> None:
+        """
+        Дописывает запись в журнал и ожидает ее фиксации на диске.
+
+        Args:
+            record: Запись (сериализуемый в JSON словарь), уже примененная к состоянию
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((json.dumps(record, ensure_ascii=False) + '\n', record, future))
+        # Если запись на диск уже идет, эта запись попадет в следующую пачку того же цикла
+        if not self._lock.locked():
+            await self.flush()
+        await future
+
+    async def flush(self) -> None:
+        """Записывает и фиксирует (fsync) накопленные записи пачками, пока они есть."""
+        async with self._lock:
+            while self._pending:
+                batch, self._pending = self._pending, []
+                try:
+                    reload, records = await asyncio.to_thread(self._exchange, ''.join(line for line, _, _ in batch))
+                    self._catch_up(reload, records,
+                                   [record for _, record, _ in batch] + [record for _, record, _ in self._pending])
+                    for _, _, future in batch:
+                        if not future.done():
+                            future.set_result(None)
+                except Exception as e:
+                    logger.error(f"Ошибка записи журнала {self.journal_path}: {e}")
+                    for _, _, future in batch:
+                        if not future.done():
+                            future.set_exception(e)
+
+    def _exchange(self, data: str) -> Tuple[bool, List[Dict]]:
+        """Под блокировкой дочитывает записи других процессов и дописывает свои."""
+        fd = self._open_lock(fcntl.LOCK_EX)
+        try:
+            changes = self._read_changes()
+            self._write(data)
+            return changes
+        finally:
+            self._close_lock(fd)
+
+    def _write(self, data: str) -> None:
+        """Дописывает данные в журнал и сбрасывает их на диск (вызывается под блокировкой)."""
+        encoded = data.encode('utf-8')
+        with open(self.journal_path, 'ab') as f:
+            if f.tell() > self._position:
+                # Недописанная строка процесса, прерванного при записи: не склеиваем с ней свои записи
+                encoded = b'\n' + encoded
+            f.write(encoded)
+            f.flush()
+            os.fsync(f.fileno())
+            self._position = f.tell()
+        self.entries += data.count('\n')
+
+    async def compact(self, records: Callable[[], Iterable[Dict]], force: bool = True) -> None:
+        """
+        Записывает снимок состояния и очищает журнал.
+
+        Args:
+            records: Функция, возвращающая записи, из которых состояние восстанавливается
+                полностью. Вызывается под блокировкой после того, как состояние догнало
+                журнал, поэтому изменения этого и других процессов не теряются.
+            force: Записать снимок, даже если журнал еще короткий (иначе несколько
+                одновременных вызовов после достижения порога запишут снимок один раз)
+        """
+        await self.flush()
+        async with self._lock:
+            fd = await asyncio.to_thread(self._open_lock, fcntl.LOCK_EX)
+            try:
+                reload, changes = await asyncio.to_thread(self._read_changes)
+                self._catch_up(reload, changes, [record for _, record, _ in self._pending])
+                if not force and not self.needs_compaction:
+                    return
+                lines = [json.dumps(record, ensure_ascii=False) + '\n' for record in records()]
+                await asyncio.to_thread(self._write_snapshot, lines)
+                self.entries = 0
+            finally:
+                self._close_lock(fd)
+        logger.info(f"Снимок {self.snapshot_path} записан ({len(lines)} записей), журнал очищен")
+        # Записи, поступившие во время записи снимка
+        await self.flush()
+
+    def _write_snapshot(self, lines: List[str]) -> None:
+        """Атомарно подменяет снимок и очищает журнал (вызывается под блокировкой)."""
+        temporary = self.snapshot_path.with_name(self.snapshot_path.name + '.tmp')
+        with open(temporary, 'w', encoding='utf-8') as f:
+            f.writelines(lines)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, self.snapshot_path)
+        # Фиксируем подмену файла в директории, затем очищаем журнал
+        directory_fd = os.open(self.directory, os.O_RDONLY)
+        try:
+            os.fsync(directory_fd)
+        finally:
+            os.close(directory_fd)
+        with open(self.journal_path, 'w', encoding='utf-8') as f:
+            f.flush()
+            os.fsync(f.fileno())
+        self._token, self._position = self._snapshot_token(), 0
+
+    async def close(self) -> None:
+        """Фиксирует все накопленные записи."""
+        await self.flush()
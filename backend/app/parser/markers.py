@@ -0,0 +1,216 @@
+import re
+import logging
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+# Маркеры юридического лица для быстрой проверки страницы
+COMPANY_MARKERS = ('ИНН', 'ООО', 'ОАО', 'АО', 'ИП', 'реквизиты')
+
+# Маркеры поставщика, по которым классифицируются сайты
+SUPPLIER_MARKERS = (
+    'ИНН', 'ООО', 'ИП', 'ОАО', 'АО', 'ОГРН', 'ЗАО', 'НКО', 'ПК', 'ТОО',
+    'ЕООД', 'КФХ', 'СПК', 'ТСЖ', 'ТСН', 'МУП', 'ГУП', 'ФГУП', 'ФКП'
+)
+
+# Границы слова для UTF-8: буквой считаются ASCII-символы слова и кириллица (ведущие байты
+# \xd0-\xd3 с байтом продолжения). Кавычки «», неразрывный пробел и тире буквами не считаются,
+# поэтому «ООО» и ООО&nbsp;"Металл" находятся, а "ИП" внутри слова "типовой" - нет.
+# (варианты фиксированной длины, чтобы их можно было проверять просмотром назад)
+_BYTES_LETTERS = (rb'[0-9A-Za-z_]', rb'[\xd0-\xd3][\x80-\xbf]')
+_BYTES_WORD_AFTER = rb'(?!' + b'|'.join(_BYTES_LETTERS) + rb')'
+
+Document = Union[str, bytes]
+
+def _literal(text: str, kind: type) -> Union[str, bytes]:
+    """Возвращает фрагмент выражения в виде строки или байтов."""
+    return text.encode('ascii') if kind is bytes else text
+
+class _TrieNode:
+    """Узел префиксного дерева маркеров."""
+
+    def __init__(self):
+        self.children: Dict[str, '_TrieNode'] = {}
+        self.terminal = False
+
+class MarkerMatcher:
+    """
+    Ищет набор маркеров в документе за один проход без учета регистра.
+
+    Маркеры собираются в префиксное дерево (общие начала вроде "О" в "ООО", "ОАО", "ОГРН"
+    проверяются один раз), и дерево компилируется в одно регулярное выражение: движок re
+    проходит документ один раз, как автомат Ахо-Корасик, но на C. Регистр учитывается
+    самим выражением (каждая буква - класс из строчного и прописного вариантов), поэтому
+    копия документа в нижнем регистре не нужна. Для байтов выражение строится в UTF-8
+    и документ не декодируется.
+
+    При совпадении нескольких маркеров с одной позиции выбирается самый длинный.
+    """
+
+    def __init__(self, markers: Iterable[str], word_boundaries: bool = True):
+        """
+        Args:
+            markers: Маркеры (регистр не важен)
+            word_boundaries: Искать маркеры только как отдельные слова
+        """
+        self.markers = tuple(dict.fromkeys(marker for marker in markers if marker))
+        if not self.markers:
+            raise ValueError("Список маркеров пуст")
+        self.word_boundaries = word_boundaries
+        # Маркер по его записи в нижнем регистре (для определения, какой маркер совпал)
+        self._canonical = {marker.lower(): marker for marker in self.markers}
+
+        root = _TrieNode()
+        for marker in self._canonical:
+            node = root
+            for char in marker:
+                node = node.children.setdefault(char, _TrieNode())
+            node.terminal = True
+
+        self._text_regex = re.compile(self._compile(root, str), re.DOTALL)
+        self._bytes_regex = re.compile(self._compile(root, bytes), re.DOTALL)
+
+    @staticmethod
+    def _variants(char: str, kind: type) -> List[Union[str, bytes]]:
+        """Записи буквы в обоих регистрах (строки или байты UTF-8)."""
+        variants = {variant for variant in (char, char.lower(), char.upper()) if len(variant) == 1}
+        if kind is bytes:
+            return sorted(variant.encode('utf-8') for variant in variants)
+        return sorted(variants)
+
+    @classmethod
+    def _unit(cls, char: str, kind: type):
+        """Выражение для одной буквы маркера без учета регистра."""
+        raw = cls._variants(char, kind)
+        variants = [re.escape(variant) for variant in raw]
+        if kind is str and len(variants) > 1:
+            return '[' + ''.join(variants) + ']'
+        if len(variants) > 1 and len({variant[:-1] for variant in raw}) == 1:
+            # У кириллицы в UTF-8 варианты отличаются только последним байтом: префикс + класс
+            return re.escape(raw[0][:-1]) + b'[' + b''.join(re.escape(variant[-1:]) for variant in raw) + b']'
+        if len(variants) == 1:
+            return variants[0]
+        return _literal('(?:', kind) + _literal('|', kind).join(variants) + _literal(')', kind)
+
+    @classmethod
+    def _subtree(cls, node: _TrieNode, kind: type, end):
+        """Выражение для поддерева (окончание маркера проверяется последним, после более длинных)."""
+        branches = [cls._unit(char, kind) + cls._subtree(child, kind, end) for char, child in sorted(node.children.items())]
+        if node.terminal:
+            branches.append(end)
+        if len(branches) == 1:
+            return branches[0]
+        return _literal('(?:', kind) + _literal('|', kind).join(branches) + _literal(')', kind)
+
+    def _compile(self, root: _TrieNode, kind: type):
+        """
+        Компилирует дерево маркеров в выражение для строк или байтов.
+
+        Выражение начинается с одного класса символов: последних символов (байтов) всех
+        вариантов первой буквы маркеров. Движок re ищет кандидатов по такому классу
+        быстрым циклом на C, а уже затем просмотром назад проверяет, какая это буква
+        и есть ли перед ней граница слова. Без этого, с границей слова или альтернативой
+        в начале выражения, re проверяет каждую позицию документа.
+        """
+        if kind is bytes:
+            letters, after = _BYTES_LETTERS, (_BYTES_WORD_AFTER if self.word_boundaries else b'')
+        else:
+            letters, after = (r'\w',), (r'\b' if self.word_boundaries else '')
+
+        lit = lambda text: _literal(text, kind)
+        last_units = set()
+        # Ветви по длине первой буквы (в UTF-8 у кириллицы 2 байта, у латиницы 1)
+        branches: Dict[int, list] = {}
+        for char, child in sorted(root.children.items()):
+            by_width: Dict[int, list] = {}
+            for variant in self._variants(char, kind):
+                by_width.setdefault(len(variant), []).append(variant)
+            for width, variants in by_width.items():
+                last_units.update(variant[-1:] for variant in variants)
+                # Какая это буква: просмотр назад на ее длину (в начале совпадения только последний символ/байт)
+                prefixes = {variant[:-1] for variant in variants}
+                if len(prefixes) == 1:
+                    which = re.escape(prefixes.pop()) + lit('[') + lit('').join(re.escape(v[-1:]) for v in variants) + lit(']')
+                else:
+                    which = lit('|').join(re.escape(variant) for variant in variants)
+                branches.setdefault(width, []).append(lit('(?<=') + which + lit(')') + self._subtree(child, kind, after))
+
+        groups = []
+        for width, alternatives in sorted(branches.items()):
+            group = lit('')
+            if self.word_boundaries:
+                # Граница слова проверяется один раз для всех букв этой длины, до выбора ветви:
+                # большинство кандидатов - буквы внутри слов, и они отсекаются сразу
+                for letter in letters:
+                    group += lit('(?<!') + letter + lit('.') * width + lit(')')
+            if len(branches) > 1:
+                # При разной длине первых букв ветвь выбирается по длине
+                group += lit('(?<=') + lit('.') * width + lit(')')
+            groups.append(group + lit('(?:') + lit('|').join(alternatives) + lit(')'))
+
+        first = lit('[') + lit('').join(re.escape(unit) for unit in sorted(last_units)) + lit(']')
+        return first + (groups[0] if len(groups) == 1 else lit('(?:') + lit('|').join(groups) + lit(')'))
+
+    def _regex(self, document: Document) -> re.Pattern:
+        return self._bytes_regex if isinstance(document, (bytes, bytearray, memoryview)) else self._text_regex
+
+    def _found(self, document: Document, match: re.Match) -> Tuple[str, int, int]:
+        """Возвращает маркер и границы вхождения по совпадению выражения."""
+        start, end = match.span()
+        if isinstance(document, str):
+            return self._canonical[document[start:end].lower()], start, end
+        # Совпадение начинается с последнего байта первой буквы: возвращаемся к ее ведущему байту
+        while start > 0 and 0x80 <= document[start] <= 0xbf:
+            start -= 1
+        return self._canonical[bytes(document[start:end]).decode('utf-8').lower()], start, end
+
+    def finditer(self, document: Document, start: int = 0) -> Iterator[Tuple[str, int, int]]:
+        """
+        Находит все вхождения маркеров.
+
+        Args:
+            document: Текст или HTML (строка или байты в UTF-8)
+            start: Позиция, с которой начинается поиск
+
+        Yields:
+            Tuple[str, int, int]: Маркер (в записи из списка) и границы вхождения
+            (в символах для строк, в байтах для байтов)
+        """
+        for match in self._regex(document).finditer(document, start):
+            yield self._found(document, match)
+
+    def search(self, document: Document) -> Optional[str]:
+        """Возвращает первый найденный маркер или None."""
+        match = self._regex(document).search(document)
+        return self._found(document, match)[0] if match else None
+
+    def find_all(self, document: Document) -> Dict[str, List[int]]:
+        """
+        Находит позиции всех маркеров.
+
+        Returns:
+            Dict[str, List[int]]: Начальные позиции вхождений по маркерам (только найденные,
+            в порядке первого появления)
+        """
+        positions: Dict[str, List[int]] = {}
+        for marker, start, _ in self.finditer(document):
+            positions.setdefault(marker, []).append(start)
+        return positions
+
+    def matched(self, document: Document) -> List[str]:
+        """
+        Возвращает найденные маркеры в порядке первого появления.
+
+        Поиск прекращается, как только найдены все маркеры.
+        """
+        found = []
+        for marker, _, _ in self.finditer(document):
+            if marker not in found:
+                found.append(marker)
+                if len(found) == len(self.markers):
+                    break
+        return found
+
+# Общие экземпляры для модулей парсера
+company_matcher = MarkerMatcher(COMPANY_MARKERS)
+supplier_matcher = MarkerMatcher(SUPPLIER_MARKERS)
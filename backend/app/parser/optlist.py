@@ -1,15 +1,15 @@
 import httpx
-from selectolax.parser import HTMLParser
 from typing import List
 from app.models.result import ResultItem
 from app.parser.base import BaseParser
+from app.parser.html_parsing import parse_html
 
 class OptListParser(BaseParser):
     async def parse(self, keyword: str) -> List[ResultItem]:
         url = f"https://example.com/search?q={keyword}"
         async with httpx.AsyncClient(timeout=10) as client:
             r = await client.get(url)
-            html = HTMLParser(r.text)
+            html = parse_html(r.text)
 
         results = []
         for el in html.css("div.company-card"):
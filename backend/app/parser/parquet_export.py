@@ -0,0 +1,231 @@
+import os
+import json
+import shutil
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+import pyarrow as pa
+import pyarrow.dataset as ds
+from .contacts import empty_contacts
+from .export import iter_changed_results
+
+logger = logging.getLogger(__name__)
+
+# Строки с повторяющимися значениями хранятся словарем (в pandas - categorical)
+DICTIONARY_STRING = pa.dictionary(pa.int32(), pa.string())
+
+SCHEMA = pa.schema([
+    ("id", pa.int64()),
+    ("run_id", pa.int64()),
+    ("date", pa.string()),
+    ("query", pa.string()),
+    ("url", pa.string()),
+    ("domain", DICTIONARY_STRING),
+    ("title", pa.string()),
+    ("snippet", pa.string()),
+    ("company_name", pa.string()),
+    ("email", pa.string()),
+    ("phone", pa.string()),
+    ("region", DICTIONARY_STRING),
+    ("created_at", pa.timestamp("us")),
+    ("updated_at", pa.timestamp("us")),
+    # Классификация, ИНН и контакты сайта в запуске, в котором найден результат
+    ("category", DICTIONARY_STRING),
+    ("category_evidence", pa.string()),
+    ("result_inn", pa.string()),
+    ("emails", pa.list_(pa.string())),
+    ("phones", pa.list_(pa.string())),
+    ("whatsapp", pa.list_(pa.string())),
+    ("telegram", pa.list_(pa.string())),
+    # Текущая классификация и реквизиты домена из таблицы domains
+    ("classification", DICTIONARY_STRING),
+    ("evidence", pa.string()),
+    ("inn", pa.string()),
+    ("ogrn", pa.string()),
+    ("kpp", pa.string()),
+    ("classified_at", pa.timestamp("us")),
+])
+
+# Партиции date=YYYY-MM-DD/query=<запрос> (значения в пути экранируются)
+PARTITIONING = ds.partitioning(pa.schema([("date", pa.string()), ("query", pa.string())]), flavor="hive")
+
+STATE_FILE = "_export_state.json"
+
+# Версия схемы и отметки выгрузки: набор данных с другой версией пересобирается целиком
+STATE_VERSION = 2
+
+def _utc(value: Optional[datetime]) -> Optional[datetime]:
+    """Приводит время к UTC без часового пояса (в Parquet пишется timestamp без зоны)."""
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+def _row(result) -> Dict[str, Any]:
+    """Строка набора данных из строки выгрузки (результат поиска с классификацией домена)."""
+    updated_at = _utc(result.updated_at)
+    contacts = result.result_contacts or {}
+    row = {
+        "id": result.id,
+        "run_id": result.run_id,
+        "date": updated_at.strftime("%Y-%m-%d") if updated_at else "unknown",
+        "query": result.query,
+        "url": result.url,
+        "domain": result.domain,
+        "title": result.title,
+        "snippet": result.snippet,
+        "company_name": result.company_name,
+        "email": result.email,
+        "phone": result.phone,
+        "region": result.region,
+        "created_at": _utc(result.created_at),
+        "updated_at": updated_at,
+        "category": result.result_category,
+        "category_evidence": result.result_evidence,
+        "result_inn": result.result_inn,
+        "classification": result.category,
+        "evidence": result.evidence,
+        "inn": result.inn,
+        "ogrn": result.ogrn,
+        "kpp": result.kpp,
+        "classified_at": _utc(result.classified_at),
+    }
+    for key in empty_contacts():
+        row[key] = contacts.get(key) or []
+    return row
+
+class ParquetExporter:
+    """
+    Выгрузка результатов поиска с классификацией доменов в набор данных Parquet.
+
+    Строки query_results читаются пачками по возрастанию (updated_at, id) вместе
+    с классификацией и реквизитами домена (одним запросом с соединением таблиц) и пишутся
+    файлами date=<дата updated_at>/query=.../part-<updated_at>-<id>-<n>.parquet по первой
+    строке файла. Отметка последней выгруженной строки хранится в _export_state.json,
+    поэтому каждый запуск дописывает только новые и обновленные строки, а повтор
+    прерванного запуска перезаписывает те же файлы, а не дублирует строки.
+
+    Повторный поиск обновляет строку результата (run_id, позиция, классификация, updated_at),
+    и она выгружается снова: в наборе данных у одного id может быть несколько версий,
+    актуальная - с наибольшим updated_at. Строки моложе settle секунд откладываются
+    до следующего запуска: строки одного запуска поиска записываются несколькими
+    транзакциями с одинаковым updated_at.
+
+    Запрос хранится в пути партиции; при чтении его можно получить словарем:
+    ds.dataset(path, partitioning=ds.HivePartitioning.discover(infer_dictionary=True)).
+    """
+
+    def __init__(self, output_dir: str, batch_size: int = 5000, rows_per_file: int = 200000,
+                 compression: str = "zstd", settle: float = 300.0):
+        """
+        Args:
+            output_dir: Директория набора данных
+            batch_size: Сколько строк читать из базы за раз
+            rows_per_file: Сколько строк накапливать перед записью файлов
+            compression: Сжатие Parquet (zstd, snappy, gzip, none)
+            settle: Сколько секунд после обновления строка не выгружается
+        """
+        self.output_dir = output_dir
+        self.batch_size = batch_size
+        self.rows_per_file = rows_per_file
+        self.compression = compression
+        self.settle = settle
+        self.state_path = os.path.join(output_dir, STATE_FILE)
+        self._lock = asyncio.Lock()
+
+    def _load_state(self) -> Dict[str, Any]:
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {"version": STATE_VERSION, "last_updated_at": None, "last_id": 0, "rows": 0}
+
+    def _save_state(self, state: Dict[str, Any]) -> None:
+        """Атомарно записывает состояние выгрузки."""
+        temporary = self.state_path + ".tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            json.dump(state, f, ensure_ascii=False, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, self.state_path)
+
+    def _write(self, rows: List[Dict[str, Any]]) -> int:
+        """Пишет строки в набор данных и возвращает количество записанных файлов."""
+        table = pa.Table.from_pylist(rows, schema=SCHEMA)
+        first = rows[0]
+        written = []
+        ds.write_dataset(
+            table,
+            self.output_dir,
+            format="parquet",
+            partitioning=PARTITIONING,
+            basename_template=f"part-{first['updated_at']:%Y%m%dT%H%M%S%f}-{first['id']:012d}-{{i}}.parquet",
+            existing_data_behavior="overwrite_or_ignore",
+            file_options=ds.ParquetFileFormat().make_write_options(compression=self.compression),
+            max_partitions=100000,
+            max_rows_per_group=64 * 1024,
+            # Один поток: нумерация файлов не зависит от порядка потоков, и повтор пишет те же имена
+            use_threads=False,
+            file_visitor=lambda file: written.append(file.path),
+        )
+        return len(written)
+
+    async def export(self, full: bool = False) -> Dict[str, Any]:
+        """
+        Дописывает в набор данных строки, появившиеся или обновленные после прошлой выгрузки.
+
+        Args:
+            full: Удалить набор данных и выгрузить все строки заново
+
+        Returns:
+            Dict: rows (выгружено строк), files (записано файлов), last_updated_at, last_id и duration
+        """
+        async with self._lock:
+            started = datetime.now()
+            state = await asyncio.to_thread(self._load_state)
+            if not full and state.get("version") != STATE_VERSION:
+                logger.info(f"Набор данных {self.output_dir} выгружен в прежней схеме, выгружаем заново")
+                full = True
+            if full:
+                if await asyncio.to_thread(os.path.isdir, self.output_dir):
+                    await asyncio.to_thread(shutil.rmtree, self.output_dir)
+                state = {"version": STATE_VERSION, "last_updated_at": None, "last_id": 0, "rows": 0}
+            await asyncio.to_thread(os.makedirs, self.output_dir, exist_ok=True)
+            stats = {"rows": 0, "files": 0, "last_updated_at": state["last_updated_at"], "last_id": state["last_id"]}
+
+            after = (datetime.fromisoformat(state["last_updated_at"]) if state["last_updated_at"] else None,
+                     state["last_id"])
+            until = datetime.utcnow() - timedelta(seconds=self.settle)
+            pending: List[Dict[str, Any]] = []
+            async for batch in iter_changed_results(after, until, batch_size=self.batch_size, row=_row):
+                pending.extend(batch)
+                if len(pending) >= self.rows_per_file:
+                    await self._flush(pending, state, stats)
+                    pending = []
+            if pending:
+                await self._flush(pending, state, stats)
+
+            stats["duration"] = round((datetime.now() - started).total_seconds(), 3)
+            logger.info(f"Выгрузка в Parquet ({self.output_dir}): {stats['rows']} строк, "
+                        f"{stats['files']} файлов, отметка {stats['last_updated_at']}/{stats['last_id']}, "
+                        f"{stats['duration']} с")
+            return stats
+
+    async def _flush(self, rows: List[Dict[str, Any]], state: Dict[str, Any], stats: Dict[str, Any]) -> None:
+        """Записывает накопленные строки и сдвигает отметку выгрузки."""
+        stats["files"] += await asyncio.to_thread(self._write, rows)
+        stats["rows"] += len(rows)
+        last_updated_at = rows[-1]["updated_at"].isoformat()
+        stats.update(last_updated_at=last_updated_at, last_id=rows[-1]["id"])
+        state.update(last_updated_at=last_updated_at, last_id=rows[-1]["id"], rows=state.get("rows", 0) + len(rows),
+                     exported_at=datetime.now().isoformat())
+        await asyncio.to_thread(self._save_state, state)
+
+    async def run_periodically(self, interval: float) -> None:
+        """Дописывает новые строки каждые interval секунд (до отмены задачи)."""
+        while True:
+            try:
+                await self.export()
+            except Exception as e:
+                logger.error(f"Ошибка при выгрузке в Parquet: {str(e)}")
+            await asyncio.sleep(interval)
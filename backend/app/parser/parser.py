@@ -4,7 +4,7 @@ from typing import List, Dict, Any
 from playwright.async_api import async_playwright
 import asyncio
 import aiohttp
-from bs4 import BeautifulSoup
+from .cpu_pool import cpu_pool
 import re
 import time
 from urllib.parse import urljoin
@@ -78,19 +78,14 @@ class Parser:
                     logger.error(f"Не удалось получить контент для страницы {page + 1}")
                     continue
                     
-                soup = BeautifulSoup(content, 'html.parser')
-                search_results = soup.select("div.serp-item")
+                search_results = await cpu_pool.run("serp", content, item_selector="div.serp-item", link_selector="a.link")
                 
                 logger.debug(f"Найдено результатов на странице: {len(search_results)}")
                 
                 for item in search_results:
                     try:
-                        link = item.select_one("a.link")
-                        if not link:
-                            continue
-                            
-                        url = link.get("href", "")
-                        title = link.get_text(strip=True)
+                        url = item["url"]
+                        title = item["title"]
                         
                         if url and title:
                             result = {
@@ -148,21 +143,14 @@ class Parser:
                     logger.error(f"Не удалось получить контент для страницы {page + 1}")
                     continue
                     
-                soup = BeautifulSoup(content, 'html.parser')
-                search_results = soup.select("div.g")
+                search_results = await cpu_pool.run("serp", content, item_selector="div.g", link_selector="a", title_selector="h3")
                 
                 logger.debug(f"Найдено результатов на странице: {len(search_results)}")
                 
                 for item in search_results:
                     try:
-                        link = item.select_one("a")
-                        title = item.select_one("h3")
-                        
-                        if not (link and title):
-                            continue
-                            
-                        url = link.get("href", "")
-                        title_text = title.get_text(strip=True)
+                        url = item["url"]
+                        title_text = item["title"]
                         
                         if url and title_text:
                             result = {
@@ -1,6 +1,8 @@
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 from pydantic import BaseModel
 import os
+from .markers import SUPPLIER_MARKERS
+from .config.parser_config import config as browser_config
 
 class ParserConfig(BaseModel):
     """Конфигурация парсера."""
@@ -36,11 +38,68 @@ class ParserConfig(BaseModel):
     scroll_delay: tuple = (1, 3)  # Случайная задержка между скроллами
     mouse_movement_delay: tuple = (0.5, 1.5)  # Случайная задержка между движениями мыши
     
+    # Настройки классификатора сайтов
+    classifier_max_bytes: int = 512 * 1024  # Максимальный объем страницы, скачиваемый для классификации
+    classifier_chunk_size: int = 16 * 1024  # Размер блока при потоковом чтении страницы
+    classifier_concurrency: int = 10  # Количество сайтов, проверяемых одновременно
+    classifier_site_timeout: float = 15.0  # Таймаут классификации одного сайта (сек)
+    classifier_batch_deadline: float = 120.0  # Общий лимит времени на классификацию пакета (сек)
+    classifier_requisites_budget: int = 128 * 1024  # Сколько байт дочитывается после маркера в поисках ИНН
+    classification_ttl_days: int = 30  # Срок действия сохраненной классификации домена
+    classification_lru_size: int = 10000  # Количество доменов в кэше процесса
+    serp_supplier_threshold: float = 3.0  # Оценка выдачи, начиная с которой сайт - поставщик без скачивания
+    serp_other_threshold: float = -2.0  # Оценка выдачи, ниже которой сайт - другой без скачивания
+    scorer_calibration_path: str = "/app/results/scorer_calibration.json"  # Откалиброванные пороги и веса оценщика
+    classifier_markers: List[str] = list(SUPPLIER_MARKERS)  # Маркеры поставщика в заголовке и содержимом страницы
+    classifier_crawl_budget: float = 5.0  # Лимит времени на поиск ИНН по страницам контактов и реквизитов (0 - не искать)
+    
+    # Настройки обхода страниц контактов и реквизитов
+    crawler_max_pages: int = 5  # Максимальное количество страниц одного сайта
+    crawler_site_budget: float = 20.0  # Лимит времени на обход одного сайта (сек)
+    crawler_concurrency: int = 10  # Общее количество одновременно скачиваемых страниц
+    crawler_enrich_suppliers: bool = True  # Дополнять найденных поставщиков контактами и реквизитами
+    
+    # Настройки пула процессов для разбора HTML и регулярных выражений
+    cpu_pool_workers: int = 0  # Количество процессов на процесс приложения (0 - ядра минус одно, поделенные на WEB_CONCURRENCY)
+    cpu_pool_inline_threshold: int = 64 * 1024  # Документы меньше этого размера обрабатываются без пула
+    cpu_pool_batch_size: int = 16  # Максимальное количество документов в одном пакете заданий
+    
+    # Настройки выгрузки результатов в Parquet для аналитики
+    parquet_export_dir: str = "/app/results/parquet"  # Директория набора данных (партиции date=/query=)
+    parquet_export_interval: float = 0.0  # Период дозаписи новых строк в секундах (0 - только по запросу)
+    
+    # Настройки записи результатов в базу
+    db_write_chunk_size: int = 1000  # Строк в одном многострочном INSERT ... ON CONFLICT
+    db_copy_threshold: int = 5000  # Начиная с этого количества строк результаты загружаются через COPY (0 - никогда)
+    search_cache_ttl_days: int = 30  # Сколько дней результаты поиска отдаются из базы без нового поиска (0 - не отдавать)
+    
+    # Настройки хранения файлов: бюджеты директорий (относительные пути - внутри директории результатов)
+    retention_interval: float = 3600.0  # Период проверки директорий в секундах (0 - выключено)
+    retention_bundle_after_days: int = 30  # Через сколько дней JSON-файлы результатов объединяются в месячные архивы
+    retention_budgets: Dict[str, Dict[str, Any]] = {
+        # max_mb - общий размер, max_age_days - срок хранения (0 - без ограничения),
+        # bundle - JSON-файлы результатов не удаляются, а переносятся в архивы bundles/
+        "suppliers": {"max_mb": 1024, "max_age_days": 0, "bundle": True},
+        "others": {"max_mb": 1024, "max_age_days": 0, "bundle": True},
+        "sites": {"max_mb": 1024, "max_age_days": 0, "bundle": True},
+    }
+    screenshot_retention: Dict[str, Any] = {"max_mb": 500, "max_age_days": 14}  # Бюджет директории screenshot_path
+    captcha_retention: Dict[str, Any] = {"max_mb": 200, "max_age_days": 7}  # Бюджет директории скриншотов капчи
+    
     # Настройки логирования
     enable_debug_logging: bool = True
     save_screenshots: bool = True
     screenshot_path: str = "/app/debug_screenshots"
     
+    def directory_budgets(self) -> Dict[str, Dict[str, Any]]:
+        """Бюджеты директорий для очистки: retention_budgets и директории скриншотов (отладки и капчи)."""
+        budgets = {
+            self.screenshot_path: self.screenshot_retention,
+            browser_config.captcha_screenshot_path: self.captcha_retention,
+        }
+        budgets.update(self.retention_budgets)
+        return budgets
+    
     # Настройки прокси
     def get_random_proxy(self) -> Optional[str]:
         """Возвращает случайный прокси из списка."""
@@ -60,4 +119,10 @@ class ParserConfig(BaseModel):
             raise ValueError("Максимальное количество результатов должно быть больше 0")
             
         if self.timeout < 30000:
-            raise ValueError("Таймаут браузера должен быть не менее 30 секунд") 
\ No newline at end of file
+            raise ValueError("Таймаут браузера должен быть не менее 30 секунд")
+            
+        if self.serp_other_threshold >= self.serp_supplier_threshold:
+            raise ValueError("Порог 'другой' для оценки выдачи должен быть меньше порога 'поставщик'")
+            
+        if self.classifier_max_bytes < self.classifier_chunk_size:
+            raise ValueError("Лимит объема страницы должен быть не меньше размера блока чтения") 
\ No newline at end of file
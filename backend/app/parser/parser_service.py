@@ -1,17 +1,26 @@
-from typing import List, Dict, Optional, Union, Set
+from typing import List, Dict, Optional, Union
 from urllib.parse import urlparse
-from sqlalchemy import select
 from app.db.session import async_session
-from app.models.search_result import SearchResult
 from .playwright_runner import PlaywrightRunner
 from .parser_config import ParserConfig
 from .site_classifier import SiteClassifier
+from .classification_cache import ClassificationCache
+from .scoring import SiteScorer
+from .pipeline_context import PipelineContext
+from .contact_crawler import ContactCrawler
+from .results_manifest import ResultsManifest
+from .parquet_export import ParquetExporter
+from .async_io import file_io
+from .retention import RetentionService
+from .result_writer import SearchResultWriter, latest_results_statement
+from .utils import extract_domain, registrable_domain
 from playwright.async_api import async_playwright
 import logging
 import asyncio
 import os
 from collections import defaultdict
-import json
+import io
+import csv
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
@@ -21,7 +30,33 @@ class ParserService:
         self.config = ParserConfig()
         self.config.validate()  # Проверяем корректность настроек
         self.playwright_runner = PlaywrightRunner(config=self.config)
-        self.site_classifier = SiteClassifier()  # Добавляем классификатор сайтов
+        # Обход страниц контактов и реквизитов (один на сервис: общее ограничение параллелизма)
+        self.contact_crawler = ContactCrawler(
+            max_pages=self.config.crawler_max_pages,
+            site_budget=self.config.crawler_site_budget,
+            concurrency=self.config.crawler_concurrency
+        )
+        self.site_classifier = SiteClassifier(
+            max_content_bytes=self.config.classifier_max_bytes,
+            chunk_size=self.config.classifier_chunk_size,
+            concurrency=self.config.classifier_concurrency,
+            site_timeout=self.config.classifier_site_timeout,
+            batch_deadline=self.config.classifier_batch_deadline,
+            requisites_budget=self.config.classifier_requisites_budget,
+            crawler=self.contact_crawler if self.config.classifier_crawl_budget > 0 else None,
+            crawl_budget=self.config.classifier_crawl_budget,
+            markers=self.config.classifier_markers,
+            cache=ClassificationCache(
+                rules_version=SiteClassifier.RULES_VERSION,
+                ttl_days=self.config.classification_ttl_days,
+                lru_size=self.config.classification_lru_size
+            ),
+            scorer=SiteScorer.load(
+                self.config.scorer_calibration_path,
+                supplier_threshold=self.config.serp_supplier_threshold,
+                other_threshold=self.config.serp_other_threshold
+            )
+        )  # Добавляем классификатор сайтов
         self.results_dir = "/app/results"  # Путь к директории результатов внутри контейнера
         
         # Проверяем и создаем директорию для результатов, если она не существует
@@ -43,9 +78,23 @@ class ParserService:
         # Создаем директории для категорий, если они не существуют
         for directory in [self.suppliers_dir, self.others_dir, self.sites_dir]:
             os.makedirs(directory, exist_ok=True)
-            
-        # Множество уже обработанных доменов для избежания дублирования
-        self.processed_domains: Set[str] = set()
+        
+        # Индекс сохраненных файлов результатов для списков в API
+        self.results_manifest = ResultsManifest(self.results_dir)
+        # Выгрузка результатов в Parquet для аналитики
+        self.parquet_exporter = ParquetExporter(self.config.parquet_export_dir)
+        # Пакетная запись результатов поиска в базу
+        self.result_writer = SearchResultWriter(
+            chunk_size=self.config.db_write_chunk_size,
+            copy_threshold=self.config.db_copy_threshold
+        )
+        # Ограничение размера и срока хранения файлов результатов и скриншотов
+        self.retention = RetentionService(
+            self.results_dir,
+            self.config.directory_budgets(),
+            bundle_after_days=self.config.retention_bundle_after_days,
+            manifest=self.results_manifest
+        )
         
     def get_current_search_mode(self) -> str:
         """Получает текущий режим поиска из переменной окружения или конфига."""
@@ -67,44 +116,70 @@ class ParserService:
             max_results = max_results or self.config.max_results
             search_mode = self.get_current_search_mode()
 
-            logger.info(f"Начинаем поиск с настройками: mode={search_mode}, max_results={max_results}, pages={pages}")
+            # Контекст этого запуска: дубликаты, счетчики и время этапов не разделяются с другими запросами
+            context = PipelineContext(keyword)
+            logger.info(f"Начинаем поиск [{context.run_id}] с настройками: mode={search_mode}, "
+                        f"max_results={max_results}, pages={pages}")
 
             # Проверяем кэш
-            cached_results = await self.get_cached_results(keyword, max_results)
+            with context.timer("cache"):
+                cached_results = await self.get_cached_results(keyword, max_results, context)
             if cached_results:
-                logger.info(f"Найдены кэшированные результаты для запроса '{keyword}'")
+                cached_results["timings"] = context.get_timings()
+                logger.info(f"Найдены кэшированные результаты для запроса '{keyword}' (запуск {cached_results['cached_run']})")
                 return cached_results
 
             # Выполняем поиск в соответствии с настройками
-            if search_mode == "both":
-                results = await self.parallel_search(keyword, max_results, pages)
-            else:
-                if search_mode == "yandex":
-                    from .search_yandex import search_yandex
-                    results = await search_yandex(query=keyword, limit=max_results, pages=pages)
-                elif search_mode == "google":
-                    from .search_google import search_google
-                    results = await search_google(query=keyword, limit=max_results, pages=pages)
+            with context.timer("search"):
+                if search_mode == "both":
+                    results = await self.parallel_search(keyword, max_results, pages)
                 else:
-                    raise ValueError(f"Недопустимый режим поиска: {search_mode}")
+                    if search_mode == "yandex":
+                        from .search_yandex import search_yandex
+                        results = await search_yandex(query=keyword, limit=max_results, pages=pages)
+                    elif search_mode == "google":
+                        from .search_google import search_google
+                        results = await search_google(query=keyword, limit=max_results, pages=pages)
+                    else:
+                        raise ValueError(f"Недопустимый режим поиска: {search_mode}")
             
             # Удаляем дубликаты по домену
-            unique_results = await self.remove_domain_duplicates(results)
+            unique_results = await self.remove_domain_duplicates(results, context)
             logger.info(f"После удаления дубликатов: {len(unique_results)} из {len(results)} результатов")
             
             # Классифицируем сайты
-            await self.classify_sites(unique_results, keyword)
+            with context.timer("classify"):
+                classification = await self.classify_sites(unique_results, keyword, context)
             
-            # Сохраняем результаты в базу данных
+            # Сворачиваем сайты одной компании (по ИНН) в одну строку и ограничиваем количество результатов
+            entity_results = self.site_classifier.entities.collapse(unique_results)
+            final_results = entity_results[:max_results]
+            
+            # Сводка запуска: сохраняется вместе с результатами, чтобы ответ из кэша был таким же
+            classification_stats = context.get_stats()
+            summary = {
+                "suppliers": classification_stats['suppliers_found'],
+                "others": classification_stats['others_found'],
+                "errors": classification_stats['errors'],
+                "pending": classification_stats['pending'],
+                "fetches_avoided": classification["fetches_avoided"],
+                "fetches_avoided_ratio": classification["fetches_avoided_ratio"],
+                "duplicates_removed": len(results) - len(unique_results),
+                "entities_collapsed": len(unique_results) - len(entity_results),
+                "files": classification.get("files", {}),
+            }
+            
+            # Сохраняем результаты (с классификацией и контактами) в базу данных. Запуск с неполной
+            # классификацией (ошибка или сайты, не успевшие классифицироваться) сохраняется без сводки:
+            # из кэша он не отдается, и следующий поиск классифицирует сайты заново
+            cacheable = not (classification.get("failed") or classification.get("pending") or summary["pending"])
             if unique_results:
-                await self.save_results(keyword, unique_results)
+                with context.timer("save"):
+                    await self.save_results(keyword, unique_results, search_mode, summary if cacheable else None)
                 logger.info(f"Сохранено {len(unique_results)} результатов для запроса '{keyword}'")
             
-            # Ограничиваем количество результатов
-            final_results = unique_results[:max_results]
-            
-            # Получаем статистику классификации
-            classification_stats = self.site_classifier.get_stats()
+            timings = context.get_timings()
+            logger.info(f"Поиск [{context.run_id}] завершен за {timings['total']} сек: {timings}")
             
             return {
                 "results": final_results,
@@ -112,10 +187,9 @@ class ParserService:
                 "cached": 0,
                 "new": len(final_results),
                 "search_mode": search_mode,  # Используем текущий режим поиска
-                "suppliers": classification_stats['suppliers_found'],
-                "others": classification_stats['others_found'],
-                "errors": classification_stats['errors'],
-                "duplicates_removed": len(results) - len(unique_results)
+                **summary,
+                "run_id": context.run_id,
+                "timings": timings
             }
             
         except Exception as e:
@@ -182,89 +256,104 @@ class ParserService:
             logger.error(f"Ошибка при параллельном поиске: {str(e)}")
             raise
 
-    async def get_cached_results(self, keyword: str, max_results: int) -> Optional[Dict[str, Union[List[Dict[str, str]], int, str]]]:
+    async def get_cached_results(self, keyword: str, max_results: int,
+                                 context: Optional[PipelineContext] = None) -> Optional[Dict[str, Union[List[Dict[str, str]], int, str]]]:
         """Проверяет наличие кэшированных результатов поиска.
         
+        Результаты последнего запуска читаются одним запросом вместе с классификацией,
+        контактами и сводкой запуска, поэтому ответ из кэша совпадает с ответом поиска,
+        а сайты не скачиваются повторно. Запуски без сводки (перенесенные из старой
+        таблицы результатов или с неполной классификацией) из кэша не отдаются.
+        
         Args:
             keyword: Ключевое слово для поиска
             max_results: Максимальное количество результатов
+            context: Контекст запуска (run_id и время этапов ответа)
             
         Returns:
             Optional[Dict[str, Union[List[Dict[str, str]], int, str]]]: Словарь с кэшированными результатами или None
         """
+        if self.config.search_cache_ttl_days <= 0:
+            return None
         try:
             async with async_session() as session:
-                # Получаем кэшированные результаты
+                # Результаты последнего запуска по запросу, не старше срока хранения
+                # Все результаты запуска: ограничение применяется после сворачивания компаний, как в поиске
                 results = await session.execute(
-                    select(SearchResult)
-                    .where(SearchResult.query == keyword)
-                    .limit(max_results)
+                    latest_results_statement(keyword, None, self.config.search_cache_ttl_days)
                 )
-                cached_results = results.scalars().all()
+                cached_results = results.all()
                 
-                if cached_results:
-                    results_list = [{
-                        "url": result.url,
-                        "title": result.title or "",
-                        "domain": result.domain or ""
-                    } for result in cached_results]
-                    
-                    return {
-                        "results": results_list,
-                        "total": len(results_list),
-                        "cached": len(results_list),
-                        "new": 0,
-                        "search_mode": self.get_current_search_mode()
-                    }
+            if cached_results and cached_results[0].summary is not None:
+                run = cached_results[0]
+                sites = []
+                for result in cached_results:
+                    site = {"url": result.url, "title": result.title or "", "domain": extract_domain(result.url)}
+                    for key in ("snippet", "category", "evidence", "inn", "contacts"):
+                        if getattr(result, key) is not None:
+                            site[key] = getattr(result, key)
+                    sites.append(site)
+                
+                # Сайты одной компании сворачиваются так же, как в поиске (по сохраненному ИНН)
+                results_list = self.site_classifier.entities.collapse(sites)[:max_results]
+                context = context or PipelineContext(keyword)
+                
+                return {
+                    "results": results_list,
+                    "total": len(results_list),
+                    "cached": len(results_list),
+                    "new": 0,
+                    "search_mode": run.search_mode or self.get_current_search_mode(),
+                    **run.summary,
+                    "run_id": context.run_id,
+                    "timings": context.get_timings(),
+                    "cached_run": run.run_id,
+                    "cached_at": run.run_created_at.isoformat()
+                }
                     
         except Exception as e:
             logger.error(f"Ошибка при получении кэшированных результатов: {str(e)}")
             
         return None
         
-    async def save_results(self, keyword: str, results: List[Dict[str, str]]) -> None:
-        """Сохраняет результаты поиска в базу данных.
+    async def save_results(self, keyword: str, results: List[Dict[str, str]], search_mode: Optional[str] = None,
+                           summary: Optional[Dict] = None) -> Dict[str, Union[int, float, str]]:
+        """Сохраняет результаты поиска в базу данных (пакетно, новым запуском поиска по запросу).
         
         Args:
             keyword: Ключевое слово для поиска
-            results: Список результатов поиска
+            results: Список результатов поиска (с классификацией и контактами, если они уже есть)
+            search_mode: Режим поиска запуска
+            summary: Сводка запуска для ответа из кэша
+            
+        Returns:
+            Dict[str, Union[int, float, str]]: Статистика записи (строк, частей, строк в секунду)
         """
         try:
-            async with async_session() as session:
-                for result in results:
-                    # Извлекаем домен из URL
-                    parsed_url = urlparse(result["url"])
-                    domain = parsed_url.netloc
-                    if domain.startswith('www.'):
-                        domain = domain[4:]
-                    
-                    search_result = SearchResult(
-                        url=result["url"],
-                        result_url=result["url"],  # Используем тот же URL
-                        title=result.get("title", ""),
-                        domain=domain,
-                        query=keyword
-                    )
-                    session.add(search_result)
-                
-                await session.commit()
+            return await self.result_writer.write(keyword, results, search_mode, summary)
                 
         except Exception as e:
             logger.error(f"Ошибка при сохранении результатов: {str(e)}")
             raise 
 
-    async def remove_domain_duplicates(self, results: List[Dict[str, str]]) -> List[Dict[str, str]]:
+    async def remove_domain_duplicates(self, results: List[Dict[str, str]],
+                                       context: Optional[PipelineContext] = None) -> List[Dict[str, str]]:
         """
         Удаляет дубликаты по домену из списка результатов.
         
+        Дубликатами считаются сайты одного регистрируемого домена (www.a.ru и b.a.ru):
+        по нему же результаты классифицируются и пишутся в базу (один результат запроса
+        на домен), поэтому ответ поиска и ответ из кэша содержат одни и те же сайты.
+        
         Args:
             results: Список результатов поиска
+            context: Контекст запуска; домены, уже встреченные в этом запуске, тоже считаются дубликатами
             
         Returns:
             List[Dict[str, str]]: Список уникальных результатов
         """
         unique_results = []
-        seen_domains = set()
+        context = context or PipelineContext()
         
         for result in results:
             url = result.get("url", "")
@@ -279,14 +368,11 @@ class ParserService:
                 if domain.startswith('www.'):
                     domain = domain[4:]
                 
-                # Проверяем, был ли уже обработан этот домен
-                if domain in seen_domains or domain in self.processed_domains:
+                # Проверяем, встречался ли уже этот регистрируемый домен в текущем запуске
+                if context.seen(registrable_domain(domain)):
                     logger.info(f"Пропускаем дубликат домена: {domain}")
                     continue
                 
-                # Добавляем домен в множество обработанных
-                seen_domains.add(domain)
-                
                 # Добавляем результат в список уникальных
                 unique_results.append(result)
                 
@@ -300,21 +386,52 @@ class ParserService:
         
         return unique_results
         
-    async def classify_sites(self, results: List[Dict[str, str]], keyword: str) -> None:
+    async def classify_sites(self, results: List[Dict[str, str]], keyword: str,
+                             context: Optional[PipelineContext] = None) -> Dict[str, Union[int, float]]:
         """
         Классифицирует сайты и сохраняет их в соответствующие файлы.
         
         Args:
             results: Список результатов поиска
             keyword: Ключевое слово для поиска
+            context: Контекст запуска, в котором ведутся счетчики классификации
+            
+        Returns:
+            Dict[str, Union[int, float]]: Сводка классификации, включая долю сайтов,
+            которые удалось классифицировать без скачивания, и имена сохраненных файлов
+            по категориям (files); failed - классификация прервана ошибкой
         """
+        summary = {"suppliers": 0, "others": 0, "pending": 0, "fetches": 0,
+                   "fetches_avoided": 0, "fetches_avoided_ratio": 0.0, "files": {}}
+        context = context or PipelineContext(keyword)
         try:
             logger.info(f"Классифицируем {len(results)} сайтов")
             
             # Классифицируем сайты
-            suppliers, others = await self.site_classifier.classify_batch(results)
+            suppliers, others, pending = await self.site_classifier.classify_batch(results, context)
+            
+            classified = suppliers + others + pending
+            fetches = sum(1 for site in classified if self.site_classifier.is_fetched(site.get("evidence", "")))
+            summary.update({
+                "suppliers": len(suppliers),
+                "others": len(others),
+                "pending": len(pending),
+                "fetches": fetches,
+                "fetches_avoided": len(classified) - fetches,
+                "fetches_avoided_ratio": round((len(classified) - fetches) / len(classified), 3) if classified else 0.0
+            })
             
-            logger.info(f"Классификация завершена: {len(suppliers)} поставщиков, {len(others)} других сайтов")
+            logger.info(f"Классификация завершена: {len(suppliers)} поставщиков, {len(others)} других сайтов, "
+                        f"{len(pending)} не успели классифицироваться")
+            logger.info(f"Скачано сайтов: {fetches}, классифицировано без скачивания: "
+                        f"{summary['fetches_avoided']} ({summary['fetches_avoided_ratio']:.0%})")
+            if pending:
+                logger.warning(f"Не классифицированы до дедлайна: {[site.get('url') for site in pending]}")
+            
+            # Дополняем поставщиков контактами и реквизитами со страниц контактов
+            if suppliers and self.config.crawler_enrich_suppliers:
+                with context.timer("crawl"):
+                    await self.enrich_contacts(suppliers, context)
             
             # Сохраняем поставщиков
             if suppliers:
@@ -323,14 +440,15 @@ class ParserService:
                 
                 # Сохраняем в JSON
                 suppliers_file = os.path.join(self.suppliers_dir, f"{safe_keyword}_{timestamp}.json")
-                with open(suppliers_file, "w", encoding="utf-8") as f:
-                    json.dump({
-                        "query": keyword,
-                        "timestamp": timestamp,
-                        "count": len(suppliers),
-                        "results": suppliers
-                    }, f, ensure_ascii=False, indent=2)
+                await file_io.write_json(suppliers_file, {
+                    "query": keyword,
+                    "timestamp": timestamp,
+                    "count": len(suppliers),
+                    "results": suppliers
+                }, ensure_ascii=False, indent=2)
                 
+                await self.results_manifest.add(suppliers_file, query=keyword, count=len(suppliers), timestamp=timestamp)
+                summary["files"]["suppliers"] = os.path.basename(suppliers_file)
                 logger.info(f"Поставщики сохранены в файл: {suppliers_file}")
                 
             # Сохраняем другие сайты
@@ -340,18 +458,48 @@ class ParserService:
                 
                 # Сохраняем в JSON
                 others_file = os.path.join(self.others_dir, f"{safe_keyword}_{timestamp}.json")
-                with open(others_file, "w", encoding="utf-8") as f:
-                    json.dump({
-                        "query": keyword,
-                        "timestamp": timestamp,
-                        "count": len(others),
-                        "results": others
-                    }, f, ensure_ascii=False, indent=2)
+                await file_io.write_json(others_file, {
+                    "query": keyword,
+                    "timestamp": timestamp,
+                    "count": len(others),
+                    "results": others
+                }, ensure_ascii=False, indent=2)
                 
+                await self.results_manifest.add(others_file, query=keyword, count=len(others), timestamp=timestamp)
+                summary["files"]["others"] = os.path.basename(others_file)
                 logger.info(f"Другие сайты сохранены в файл: {others_file}")
                 
         except Exception as e:
             logger.error(f"Ошибка при классификации сайтов: {str(e)}")
+            summary["failed"] = True
+            
+        return summary
+
+    async def enrich_contacts(self, sites: List[Dict], context: Optional[PipelineContext] = None) -> None:
+        """
+        Дополняет записи сайтов контактами и реквизитами со страниц контактов и реквизитов.
+        
+        Все сайты обходятся с общей очередью страниц и общим ограничением параллелизма.
+        Сайты, которые уже обходились при классификации, обходятся с того места, где
+        остановился тот обход. В запись добавляются ключи contacts и (если найден,
+        а ранее не был известен) inn.
+        
+        Args:
+            sites: Записи сайтов (обязательный ключ url)
+            context: Контекст запуска с итогами предыдущих обходов
+        """
+        try:
+            crawled = await self.contact_crawler.crawl((site.get("url") for site in sites),
+                                                       resume=context.crawls if context else None)
+            for site in sites:
+                result = crawled.get(site.get("url"))
+                if not result:
+                    continue
+                site["contacts"] = result["contacts"]
+                if result["requisites"]["inn"] and not site.get("inn"):
+                    site["inn"] = result["requisites"]["inn"]
+        except Exception as e:
+            logger.error(f"Ошибка при обходе страниц контактов: {str(e)}")
 
     async def save_results_to_file(self, keyword: str, results: List[Dict[str, str]], format: str = "json", classify: bool = True) -> str:
         """Сохраняет результаты поиска в файл.
@@ -391,9 +539,9 @@ class ParserService:
                 }
                 
                 # Сохраняем в JSON
-                with open(filepath, "w", encoding="utf-8") as f:
-                    json.dump(data, f, ensure_ascii=False, indent=2)
+                await file_io.write_json(filepath, data, ensure_ascii=False, indent=2)
                 
+                await self.results_manifest.add(filepath, query=keyword, count=len(results), timestamp=timestamp)
                 logger.info(f"Результаты сохранены в файл: {filepath}")
                 return filepath
                 
@@ -401,18 +549,15 @@ class ParserService:
                 filename = f"{safe_keyword}_{timestamp}.csv"
                 filepath = os.path.join(target_dir, filename)
                 
-                # Сохраняем в CSV
-                with open(filepath, "w", encoding="utf-8") as f:
-                    # Записываем заголовки
-                    f.write("title,url,domain\n")
-                    
-                    # Записываем данные
-                    for result in results:
-                        title = result.get("title", "").replace('"', '""')  # Экранируем кавычки
-                        url = result.get("url", "")
-                        domain = result.get("domain", "")
-                        f.write(f'"{title}",{url},{domain}\n')
+                # Сохраняем в CSV (кавычки, запятые и переводы строк экранирует модуль csv)
+                buffer = io.StringIO(newline="")
+                writer = csv.writer(buffer)
+                writer.writerow(["title", "url", "domain"])
+                for result in results:
+                    writer.writerow([result.get("title", ""), result.get("url", ""), result.get("domain", "")])
+                await file_io.write(filepath, buffer.getvalue())
                 
+                await self.results_manifest.add(filepath, query=keyword, count=len(results), timestamp=timestamp)
                 logger.info(f"Результаты сохранены в файл: {filepath}")
                 return filepath
                 
@@ -421,16 +566,18 @@ class ParserService:
                 filepath = os.path.join(target_dir, filename)
                 
                 # Сохраняем в текстовый файл
-                with open(filepath, "w", encoding="utf-8") as f:
-                    f.write(f"Результаты поиска по запросу: {keyword}\n")
-                    f.write(f"Дата и время: {timestamp}\n")
-                    f.write(f"Количество результатов: {len(results)}\n\n")
-                    
-                    for i, result in enumerate(results, 1):
-                        f.write(f"{i}. {result.get('title', '')}\n")
-                        f.write(f"   URL: {result.get('url', '')}\n")
-                        f.write(f"   Домен: {result.get('domain', '')}\n\n")
+                lines = [
+                    f"Результаты поиска по запросу: {keyword}\n",
+                    f"Дата и время: {timestamp}\n",
+                    f"Количество результатов: {len(results)}\n\n",
+                ]
+                for i, result in enumerate(results, 1):
+                    lines.append(f"{i}. {result.get('title', '')}\n")
+                    lines.append(f"   URL: {result.get('url', '')}\n")
+                    lines.append(f"   Домен: {result.get('domain', '')}\n\n")
+                await file_io.write(filepath, "".join(lines))
                 
+                await self.results_manifest.add(filepath, query=keyword, count=len(results), timestamp=timestamp)
                 logger.info(f"Результаты сохранены в файл: {filepath}")
                 return filepath
             
@@ -0,0 +1,76 @@
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Dict, Iterator, Set
+
+class PipelineContext:
+    """
+    Состояние одного запуска поиска.
+
+    Контекст создается на каждый запрос и передается по всему конвейеру (поиск, удаление
+    дубликатов, классификация, сохранение). В нем хранятся множество уже встреченных
+    доменов, итоги обхода сайтов, счетчики и время этапов, поэтому параллельные поиски
+    в одном процессе не влияют на результаты и статистику друг друга. Общие для процесса данные (кэш
+    классификации, индекс компаний) в контексте не хранятся и читаются через их
+    собственные интерфейсы.
+    """
+
+    # Счетчики классификации
+    COUNTERS = (
+        'total_processed', 'suppliers_found', 'others_found', 'already_processed',
+        'pending', 'entity_duplicates', 'errors'
+    )
+
+    def __init__(self, keyword: str = ""):
+        """
+        Создает контекст запуска.
+
+        Args:
+            keyword: Поисковый запрос, для которого выполняется запуск
+        """
+        self.keyword = keyword
+        self.run_id = uuid.uuid4().hex[:12]
+        self.seen_domains: Set[str] = set()
+        # Итоги обхода сайтов (ContactCrawler) по URL: обход, начатый при классификации,
+        # продолжается при сборе контактов без повторного скачивания страниц
+        self.crawls: Dict[str, Dict] = {}
+        self.stats: Dict[str, int] = {name: 0 for name in self.COUNTERS}
+        self.timings: Dict[str, float] = {}
+        self._started_at = time.perf_counter()
+
+    def count(self, name: str, value: int = 1) -> None:
+        """Увеличивает счетчик запуска."""
+        self.stats[name] = self.stats.get(name, 0) + value
+
+    def seen(self, domain: str) -> bool:
+        """
+        Отмечает домен как встреченный в этом запуске.
+
+        Returns:
+            bool: True, если домен уже встречался раньше
+        """
+        if domain in self.seen_domains:
+            return True
+        self.seen_domains.add(domain)
+        return False
+
+    @contextmanager
+    def timer(self, stage: str) -> Iterator[None]:
+        """Замеряет время этапа конвейера (повторные замеры одного этапа суммируются)."""
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[stage] = round(self.timings.get(stage, 0.0) + time.perf_counter() - started_at, 3)
+
+    def elapsed(self) -> float:
+        """Возвращает время с начала запуска в секундах."""
+        return round(time.perf_counter() - self._started_at, 3)
+
+    def get_stats(self) -> Dict[str, int]:
+        """Возвращает счетчики запуска."""
+        return dict(self.stats)
+
+    def get_timings(self) -> Dict[str, float]:
+        """Возвращает время этапов запуска и общее время в секундах."""
+        return dict(self.timings, total=self.elapsed())
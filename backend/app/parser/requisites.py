@@ -0,0 +1,128 @@
+import re
+from typing import Dict, List, Optional
+
+# Номер реквизита ищется сразу после его названия. Между названием и номером допускаются
+# пробелы, двоеточие, знак номера, &nbsp; и короткие HTML-теги (<b>ИНН</b>: 7701234567).
+_SEPARATOR = r'(?:[\s:№#.\-]|&nbsp;|<[^<>]{0,40}>){0,10}'
+
+# Одно выражение для всех реквизитов: страница просматривается за один проход.
+# Пара "ИНН/КПП 7701234567/770101001" разбирается отдельной альтернативой.
+REQUISITES_REGEX = re.compile(
+    r'(?<![а-яёa-z])(?:'
+    rf'инн\s*/\s*кпп{_SEPARATOR}(?P<pair_inn>\d{{10}})\s*/\s*(?P<pair_kpp>\d{{4}}[\dA-Z]{{2}}\d{{3}})'
+    rf'|инн{_SEPARATOR}(?P<inn>\d{{12}}|\d{{10}})'
+    rf'|огрнип{_SEPARATOR}(?P<ogrnip>\d{{15}})'
+    rf'|огрн{_SEPARATOR}(?P<ogrn>\d{{13}})'
+    rf'|кпп{_SEPARATOR}(?P<kpp>\d{{4}}[\dA-Z]{{2}}\d{{3}})'
+    r')(?!\d)',
+    re.IGNORECASE
+)
+
+_INN10_WEIGHTS = (2, 4, 10, 3, 5, 9, 4, 6, 8)
+_INN11_WEIGHTS = (7, 2, 4, 10, 3, 5, 9, 4, 6, 8)
+_INN12_WEIGHTS = (3, 7, 2, 4, 10, 3, 5, 9, 4, 6, 8)
+
+def _check_digit(digits: str, weights: tuple) -> int:
+    """Вычисляет контрольную цифру ИНН по весовым коэффициентам."""
+    return sum(int(digit) * weight for digit, weight in zip(digits, weights)) % 11 % 10
+
+def is_valid_inn(inn: str) -> bool:
+    """
+    Проверяет ИНН по контрольным цифрам.
+
+    Args:
+        inn: ИНН юридического лица (10 цифр) или физического лица / ИП (12 цифр)
+
+    Returns:
+        bool: True, если контрольные цифры сходятся
+    """
+    if not inn.isdigit() or inn == '0' * len(inn):
+        return False
+    if len(inn) == 10:
+        return _check_digit(inn, _INN10_WEIGHTS) == int(inn[9])
+    if len(inn) == 12:
+        return (_check_digit(inn, _INN11_WEIGHTS) == int(inn[10])
+                and _check_digit(inn, _INN12_WEIGHTS) == int(inn[11]))
+    return False
+
+def is_valid_ogrn(ogrn: str) -> bool:
+    """
+    Проверяет ОГРН (13 цифр) или ОГРНИП (15 цифр) по контрольной цифре.
+
+    Args:
+        ogrn: Номер ОГРН или ОГРНИП
+
+    Returns:
+        bool: True, если контрольная цифра сходится
+    """
+    if not ogrn.isdigit() or ogrn[0] == '0':
+        return False
+    if len(ogrn) == 13:
+        return int(ogrn[:12]) % 11 % 10 == int(ogrn[12])
+    if len(ogrn) == 15:
+        return int(ogrn[:14]) % 13 % 10 == int(ogrn[14])
+    return False
+
+def is_valid_kpp(kpp: str) -> bool:
+    """
+    Проверяет формат КПП.
+
+    У КПП нет контрольной цифры, поэтому проверяется только структура:
+    код налогового органа, причина постановки на учет и порядковый номер.
+    """
+    return bool(re.fullmatch(r'\d{4}[\dA-Z]{2}\d{3}', kpp)) and not kpp.startswith('0000')
+
+def empty_requisites() -> Dict[str, List[str]]:
+    """Возвращает пустой набор реквизитов."""
+    return {"inn": [], "ogrn": [], "kpp": []}
+
+def extract_requisites(text: str, requisites: Dict[str, List[str]] = None, final: bool = True) -> Dict[str, List[str]]:
+    """
+    Извлекает ИНН, ОГРН/ОГРНИП и КПП из текста страницы за один проход.
+
+    В результат попадают только номера с верными контрольными цифрами, без повторов,
+    в порядке появления на странице.
+
+    Args:
+        text: Текст или HTML страницы
+        requisites: Набор, в который добавляются найденные реквизиты
+            (для постепенного разбора страницы по блокам)
+        final: Является ли текст последним блоком страницы. Номер, доходящий до конца
+            промежуточного блока, может быть обрезан, поэтому такие совпадения пропускаются
+
+    Returns:
+        Dict[str, List[str]]: Реквизиты по ключам inn, ogrn, kpp
+    """
+    if requisites is None:
+        requisites = empty_requisites()
+
+    for match in REQUISITES_REGEX.finditer(text):
+        if not final and match.end() == len(text):
+            continue
+        _add_match(match, requisites)
+    return requisites
+
+def _add_match(match: re.Match, requisites: Dict[str, List[str]]) -> None:
+    """Добавляет реквизиты из одного совпадения, если они проходят проверку."""
+    inn = match.group('inn') or match.group('pair_inn')
+    ogrn = match.group('ogrn') or match.group('ogrnip')
+    kpp = match.group('kpp') or match.group('pair_kpp')
+
+    if inn and is_valid_inn(inn) and inn not in requisites["inn"]:
+        requisites["inn"].append(inn)
+    if ogrn and is_valid_ogrn(ogrn) and ogrn not in requisites["ogrn"]:
+        requisites["ogrn"].append(ogrn)
+    if kpp and is_valid_kpp(kpp) and kpp not in requisites["kpp"]:
+        requisites["kpp"].append(kpp)
+
+def primary_requisites(requisites: Dict[str, List[str]]) -> Dict[str, Optional[str]]:
+    """
+    Возвращает основные реквизиты страницы - первые найденные ИНН, ОГРН и КПП.
+
+    Args:
+        requisites: Реквизиты, извлеченные extract_requisites
+
+    Returns:
+        Dict[str, Optional[str]]: Значения по ключам inn, ogrn, kpp (None, если не найдены)
+    """
+    return {key: (values[0] if values else None) for key, values in requisites.items()}
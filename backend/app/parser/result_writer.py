@@ -0,0 +1,271 @@
+import json
+import time
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+from sqlalchemy import and_, bindparam, func, or_, select, text, update
+from sqlalchemy.dialects import postgresql, sqlite
+from app.db.session import async_session
+from app.models.domain import Domain
+from app.models.query_result import QueryResult
+from app.models.search_query import SearchQuery
+from app.models.search_run import SearchRun
+from .utils import extract_domain, registrable_domain
+
+logger = logging.getLogger(__name__)
+
+# Колонки query_results, которые пишет bulk-запись (id заполняет база)
+COLUMNS = ("query_id", "domain_id", "run_id", "rank", "url", "title", "snippet",
+           "category", "evidence", "inn", "contacts", "created_at", "updated_at")
+
+# При повторном поиске строка переходит в новый запуск; created_at остается временем первого появления
+UPDATE_COLUMNS = ("run_id", "rank", "url", "title", "snippet", "category", "evidence", "inn", "contacts", "updated_at")
+
+STAGING_TABLE = "query_results_staging"
+
+def normalize_query(query: str) -> str:
+    """
+    Нормализует поисковый запрос для уникального ключа queries.query_norm:
+    нижний регистр и одиночные пробелы (так же, как UPDATE в миграции 004).
+    """
+    return " ".join(query.lower().split())
+
+def _insert(dialect: str):
+    return sqlite.insert if dialect == "sqlite" else postgresql.insert
+
+def latest_results_statement(keyword: str, limit: Optional[int], ttl_days: int):
+    """
+    Запрос результатов последнего запуска поиска по запросу, не старше ttl_days,
+    вместе с их классификацией и контактами и сводкой запуска.
+
+    Повторный поиск переносит найденные домены в новый запуск, поэтому результаты
+    последнего запуска - строки query_results с его run_id. Каждый шаг читает индекс:
+    queries.query_norm, search_runs (query_id, created_at), query_results
+    (query_id, run_id, rank) и первичный ключ search_runs.
+    Запуски, запись которых еще не завершена (results = 0), пропускаются.
+
+    Args:
+        keyword: Поисковый запрос
+        limit: Максимальное количество строк (None - все результаты запуска)
+        ttl_days: Срок хранения результатов в днях
+
+    Returns:
+        Select: Запрос SQLAlchemy (поля результата, run_id, search_mode, summary и run_created_at)
+    """
+    query_id = select(SearchQuery.id).where(SearchQuery.query_norm == normalize_query(keyword)).scalar_subquery()
+    cutoff = datetime.utcnow() - timedelta(days=ttl_days)
+    latest = (
+        select(func.max(SearchRun.id))
+        .where(SearchRun.query_id == query_id, SearchRun.created_at >= cutoff, SearchRun.results > 0)
+        .scalar_subquery()
+    )
+    statement = (
+        select(QueryResult.url, QueryResult.title, QueryResult.snippet, QueryResult.rank, QueryResult.category,
+               QueryResult.evidence, QueryResult.inn, QueryResult.contacts, QueryResult.run_id,
+               SearchRun.search_mode, SearchRun.summary, SearchRun.created_at.label("run_created_at"))
+        .join(SearchRun, SearchRun.id == QueryResult.run_id)
+        .where(QueryResult.query_id == query_id, QueryResult.run_id == latest)
+        .order_by(QueryResult.rank)
+    )
+    return statement.limit(limit) if limit is not None else statement
+
+class SearchResultWriter:
+    """
+    Пакетная запись результатов поиска в нормализованные таблицы.
+
+    Запрос пишется в queries (одна строка на нормализованный запрос), запуск со сводкой -
+    в search_runs, домены - в domains (строка создается, если домена еще нет, пустые
+    контакты домена дополняются найденными), а позиции выдачи с классификацией и
+    контактами - многострочными INSERT ... ON CONFLICT (query_id, domain_id)
+    DO UPDATE по chunk_size строк в query_results, поэтому повторный поиск переносит
+    строки в новый запуск, а не дублирует их. Большие пакеты (от copy_threshold строк)
+    в PostgreSQL через asyncpg загружаются командой COPY во временную таблицу
+    и переносятся одним INSERT ... SELECT ... ON CONFLICT. Каждая часть фиксируется
+    отдельной транзакцией, чтобы очень большой пакет не держал одну длинную транзакцию.
+    """
+
+    def __init__(self, chunk_size: int = 1000, copy_threshold: int = 5000, copy_chunk_size: int = 50000):
+        """
+        Args:
+            chunk_size: Строк в одном INSERT (13 параметров на строку, лимит PostgreSQL - 32767)
+            copy_threshold: Начиная с этого количества строк используется COPY (0 - никогда)
+            copy_chunk_size: Строк в одной загрузке COPY
+        """
+        self.chunk_size = chunk_size
+        self.copy_threshold = copy_threshold
+        self.copy_chunk_size = copy_chunk_size
+
+    @staticmethod
+    def prepare(results: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """
+        Готовит позиции выдачи по регистрируемому домену (тот же ключ, по которому
+        ParserService.remove_domain_duplicates удаляет дубликаты из ответа поиска).
+
+        На домен остается первая (самая высокая) позиция: одна команда
+        ON CONFLICT DO UPDATE не может изменить одну строку дважды.
+        """
+        rows: Dict[str, Dict[str, Any]] = {}
+        for result in results:
+            url = result.get("url")
+            if not url:
+                continue
+            domain = registrable_domain(result.get("domain") or extract_domain(url))
+            if not domain or domain in rows:
+                continue
+            rows[domain] = {
+                "rank": len(rows) + 1,
+                "url": url[:2048],
+                "title": (result.get("title") or "")[:512],
+                "snippet": result.get("snippet"),
+                "category": result.get("category"),
+                "evidence": (result.get("evidence") or "")[:255] or None,
+                "inn": result.get("inn"),
+                "contacts": result.get("contacts"),
+            }
+        return rows
+
+    @staticmethod
+    async def _query_id(session, dialect: str, keyword: str) -> int:
+        """Возвращает id запроса, создавая строку queries при первом поиске."""
+        query_norm = normalize_query(keyword)
+        await session.execute(
+            _insert(dialect)(SearchQuery)
+            .values(query=keyword[:255], query_norm=query_norm, created_at=datetime.utcnow())
+            .on_conflict_do_nothing(index_elements=[SearchQuery.query_norm])
+        )
+        result = await session.execute(select(SearchQuery.id).where(SearchQuery.query_norm == query_norm))
+        return result.scalar_one()
+
+    async def _domain_ids(self, session, dialect: str, domains: List[str]) -> Dict[str, int]:
+        """Создает недостающие строки domains (без классификации) и возвращает id доменов."""
+        ids: Dict[str, int] = {}
+        for offset in range(0, len(domains), self.chunk_size):
+            chunk = domains[offset:offset + self.chunk_size]
+            await session.execute(
+                _insert(dialect)(Domain)
+                .values([{"domain": domain, "rules_version": 0} for domain in chunk])
+                .on_conflict_do_nothing(index_elements=[Domain.domain])
+            )
+            result = await session.execute(select(Domain.domain, Domain.id).where(Domain.domain.in_(chunk)))
+            ids.update(dict(result.all()))
+        return ids
+
+    @staticmethod
+    async def _domain_contacts(session, rows: List[Dict[str, Any]]) -> None:
+        """Дополняет пустые email, телефон и ИНН доменов данными, найденными в запуске."""
+        found = []
+        for row in rows:
+            contacts = row["contacts"] or {}
+            email = (contacts.get("emails") or [None])[0]
+            phone = (contacts.get("phones") or [None])[0]
+            if email or phone or row["inn"]:
+                found.append({"_id": row["domain_id"], "_email": email and email[:255],
+                              "_phone": phone and phone[:64], "_inn": row["inn"], "_now": row["updated_at"]})
+        if not found:
+            return
+        # Обновление по таблице, а не по модели: executemany с параметрами строк.
+        # Строки, где заполнять нечего, не трогаем, чтобы не менять их updated_at (входит в ETag выгрузки)
+        table = Domain.__table__
+        statement = (
+            update(table)
+            .where(table.c.id == bindparam("_id"))
+            .where(or_(and_(table.c.email.is_(None), bindparam("_email").is_not(None)),
+                       and_(table.c.phone.is_(None), bindparam("_phone").is_not(None)),
+                       and_(table.c.inn.is_(None), bindparam("_inn").is_not(None))))
+            .values(email=func.coalesce(table.c.email, bindparam("_email")),
+                    phone=func.coalesce(table.c.phone, bindparam("_phone")),
+                    inn=func.coalesce(table.c.inn, bindparam("_inn")),
+                    updated_at=bindparam("_now"))
+        )
+        await session.execute(statement, found)
+
+    @staticmethod
+    def _upsert(dialect: str, rows: List[Dict[str, Any]]):
+        statement = _insert(dialect)(QueryResult).values(rows)
+        return statement.on_conflict_do_update(
+            index_elements=[QueryResult.query_id, QueryResult.domain_id],
+            set_={column: getattr(statement.excluded, column) for column in UPDATE_COLUMNS},
+        )
+
+    async def _copy(self, session, rows: List[Dict[str, Any]]) -> None:
+        """Загружает строки через COPY во временную таблицу и переносит их одним INSERT ... ON CONFLICT."""
+        columns = ", ".join(COLUMNS)
+        updates = ", ".join(f"{column} = EXCLUDED.{column}" for column in UPDATE_COLUMNS)
+        await session.execute(text(
+            f"CREATE TEMP TABLE {STAGING_TABLE} ON COMMIT DROP AS "
+            f"SELECT {columns} FROM query_results WITH NO DATA"
+        ))
+        connection = await session.connection()
+        raw = await connection.get_raw_connection()
+        await raw.driver_connection.copy_records_to_table(
+            STAGING_TABLE,
+            records=[tuple(json.dumps(row[column], ensure_ascii=False) if column == "contacts" and row[column] is not None
+                           else row[column] for column in COLUMNS) for row in rows],
+            columns=list(COLUMNS),
+        )
+        await session.execute(text(
+            f"INSERT INTO query_results ({columns}) SELECT {columns} FROM {STAGING_TABLE} "
+            f"ON CONFLICT (query_id, domain_id) DO UPDATE SET {updates}"
+        ))
+
+    async def write(self, keyword: str, results: List[Dict[str, Any]], search_mode: Optional[str] = None,
+                    summary: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Записывает результаты запуска поиска по запросу.
+
+        Запуск создается с results = 0 и получает количество результатов в транзакции
+        последней части, а поиск в кэше (latest_results_statement) пропускает запуски
+        с results = 0, поэтому недописанный запуск из кэша не отдается.
+
+        Args:
+            keyword: Поисковый запрос
+            results: Результаты поиска в порядке выдачи (url, title, domain, snippet,
+                а после классификации - category, evidence, inn и contacts)
+            search_mode: Режим поиска (yandex, google, both)
+            summary: Сводка запуска для ответа из кэша
+
+        Returns:
+            Dict: run_id, rows (записано строк), chunks, method (insert или copy), duration и rows_per_second
+        """
+        started = time.perf_counter()
+        prepared = self.prepare(results)
+        stats = {"run_id": None, "rows": len(prepared), "chunks": 0, "method": "insert"}
+        async with async_session() as session:
+            dialect = session.bind.dialect.name
+            now = datetime.utcnow()
+            query_id = await self._query_id(session, dialect, keyword)
+            run = SearchRun(query_id=query_id, search_mode=search_mode, results=0, summary=summary, created_at=now)
+            session.add(run)
+            await session.flush()
+            domain_ids = await self._domain_ids(session, dialect, list(prepared))
+            await session.commit()
+            stats["run_id"] = run.id
+
+            rows = [
+                dict(row, query_id=query_id, domain_id=domain_ids[domain], run_id=run.id,
+                     created_at=now, updated_at=now)
+                for domain, row in prepared.items()
+            ]
+            await self._domain_contacts(session, rows)
+            use_copy = (self.copy_threshold and len(rows) >= self.copy_threshold and dialect == "postgresql"
+                        and session.bind.dialect.driver == "asyncpg")
+            step = self.copy_chunk_size if use_copy else self.chunk_size
+            stats["method"] = "copy" if use_copy else "insert"
+            for offset in range(0, len(rows), step):
+                chunk = rows[offset:offset + step]
+                if use_copy:
+                    await self._copy(session, chunk)
+                else:
+                    await session.execute(self._upsert(dialect, chunk))
+                if offset + step >= len(rows):
+                    await session.execute(update(SearchRun).where(SearchRun.id == run.id).values(results=len(rows)))
+                await session.commit()
+                stats["chunks"] += 1
+
+        duration = time.perf_counter() - started
+        stats["duration"] = round(duration, 3)
+        stats["rows_per_second"] = round(len(rows) / duration) if duration > 0 else len(rows)
+        logger.info(f"Результаты по запросу '{keyword}' записаны (запуск {stats['run_id']}): {stats['rows']} строк, "
+                    f"{stats['chunks']} частей ({stats['method']}), {stats['duration']} с, "
+                    f"{stats['rows_per_second']} строк/с")
+        return stats
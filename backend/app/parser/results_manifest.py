@@ -0,0 +1,315 @@
+import os
+import re
+import json
+import base64
+import asyncio
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+from .journal import Journal
+from .async_io import file_io
+
+logger = logging.getLogger(__name__)
+
+# Поля заголовка файла результатов ({"query": ..., "timestamp": ..., "count": ..., "results": [...]})
+HEADER_REGEX = {
+    "query": re.compile(r'"query"\s*:\s*("(?:[^"\\]|\\.)*")'),
+    "timestamp": re.compile(r'"timestamp"\s*:\s*("(?:[^"\\]|\\.)*")'),
+    "count": re.compile(r'"count"\s*:\s*(\d+)'),
+}
+
+# Поля, по которым можно сортировать список
+SORT_FIELDS = ("created", "size", "count", "query", "filename")
+
+class ResultsManifest:
+    """
+    Индекс сохраненных файлов результатов (results/, suppliers/, others/, sites/).
+
+    Запись индекса: filename, path (относительно директории результатов), category,
+    format, size, created, mtime, а для JSON также query, count и timestamp. Код, который
+    пишет файл результатов, сразу добавляет его в индекс (add) с уже известными полями,
+    а сверка с диском (reconcile) находит файлы, записанные или удаленные в обход него:
+    она только читает метаданные директорий и разбирает заново лишь файлы с изменившимися
+    mtime или размером (и только их начало, где лежат query, count и timestamp).
+
+    Индекс хранится в журнале (Journal), поэтому после перезапуска файлы не разбираются заново.
+    Списки строятся из памяти: фильтрация, сортировка и постраничная выдача с курсором.
+
+    Файл, перенесенный в архив (RetentionService), остается в индексе: его запись получает
+    поле bundle с местом в архиве (path, offset, length) и сверкой с диском не удаляется.
+    """
+
+    def __init__(self, results_dir: str, directories: Sequence[str] = ("", "suppliers", "others", "sites"),
+                 extensions: Sequence[str] = (".json", ".csv", ".txt"), reconcile_interval: float = 30.0,
+                 header_bytes: int = 4096):
+        """
+        Args:
+            results_dir: Директория результатов
+            directories: Поддиректории с файлами результатов ("" - сама директория)
+            extensions: Расширения файлов результатов
+            reconcile_interval: Как часто (в секундах) список сверяется с диском перед ответом
+            header_bytes: Сколько байт начала JSON-файла читать для поиска query, count и timestamp
+        """
+        self.results_dir = results_dir
+        self.directories = tuple(directories)
+        self.extensions = tuple(extensions)
+        self.reconcile_interval = reconcile_interval
+        self.header_bytes = header_bytes
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        # Индекс ведут все процессы приложения: записи других процессов применяются через _apply
+        self.journal = Journal(results_dir, "manifest", compact_threshold=5000,
+                               apply=self._apply, reset=self.entries.clear)
+        self._loaded = False
+        self._reconciled_at: Optional[float] = None
+        self._reconcile_lock = asyncio.Lock()
+
+    def _load(self) -> None:
+        """Загружает индекс из журнала при первом обращении."""
+        if self._loaded:
+            return
+        for record in self.journal.load():
+            self._apply(record)
+        self._loaded = True
+        logger.info(f"Индекс файлов результатов загружен: {len(self.entries)} файлов")
+
+    def _apply(self, record: Dict) -> None:
+        """Применяет запись журнала к индексу в памяти."""
+        if record.get("op") == "put":
+            self.entries[record["entry"]["path"]] = record["entry"]
+        elif record.get("op") == "remove":
+            self.entries.pop(record["path"], None)
+
+    def _records(self) -> List[Dict]:
+        return [{"op": "put", "entry": entry} for entry in self.entries.values()]
+
+    def _category(self, relative_path: str) -> Optional[str]:
+        directory = os.path.dirname(relative_path)
+        return directory or None
+
+    def _stat_entry(self, relative_path: str, stat: os.stat_result) -> Dict[str, Any]:
+        filename = os.path.basename(relative_path)
+        return {
+            "filename": filename,
+            "path": relative_path,
+            "category": self._category(relative_path),
+            "format": filename.rsplit(".", 1)[-1],
+            "size": stat.st_size,
+            "created": stat.st_ctime,
+            "mtime": stat.st_mtime,
+        }
+
+    def _read_header(self, path: str) -> Dict[str, Any]:
+        """Читает query, count и timestamp из начала JSON-файла (или из всего файла, если их там нет)."""
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            head = f.read(self.header_bytes)
+        header = {}
+        for field, regex in HEADER_REGEX.items():
+            match = regex.search(head)
+            if match:
+                header[field] = json.loads(match.group(1))
+        if len(header) < len(HEADER_REGEX):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                header = {field: data.get(field, default) for field, default in
+                          (("query", ""), ("count", 0), ("timestamp", ""))}
+            except Exception:
+                pass
+        return header
+
+    async def add(self, path: str, **fields) -> None:
+        """
+        Добавляет (или обновляет) в индексе только что записанный файл.
+
+        Args:
+            path: Путь к файлу внутри директории результатов
+            **fields: Уже известные поля файла (query, count, timestamp)
+        """
+        self._load()
+        relative_path = os.path.relpath(path, self.results_dir)
+        try:
+            stat = await file_io.run(os.stat, path)
+        except FileNotFoundError:
+            logger.warning(f"Файл {path} не найден, в индекс не добавлен")
+            return
+        entry = self._stat_entry(relative_path, stat)
+        entry.update({field: value for field, value in fields.items() if value is not None})
+        await self._put(entry)
+
+    async def remove(self, path: str) -> None:
+        """
+        Удаляет из индекса файл, удаленный или перенесенный с диска.
+
+        Args:
+            path: Путь к файлу (абсолютный или относительно директории результатов)
+        """
+        self._load()
+        relative_path = os.path.relpath(path, self.results_dir) if os.path.isabs(path) else path
+        if relative_path in self.entries:
+            await self._remove(relative_path)
+
+    async def mark_bundled(self, path: str, bundle: Dict[str, Any]) -> None:
+        """
+        Отмечает файл как перенесенный в архив (вызывается до удаления файла с диска).
+
+        Args:
+            path: Путь к файлу (абсолютный или относительно директории результатов)
+            bundle: Место файла в архиве: path (относительно директории результатов), offset и length
+        """
+        self._load()
+        relative_path = os.path.relpath(path, self.results_dir) if os.path.isabs(path) else path
+        entry = self.entries.get(relative_path)
+        if entry is None:
+            absolute = os.path.join(self.results_dir, relative_path)
+            entry = self._stat_entry(relative_path, await file_io.run(os.stat, absolute))
+            if entry["format"] == "json":
+                entry.update(await file_io.run(self._read_header, absolute))
+        await self._put(dict(entry, bundle=bundle))
+
+    def bundle_of(self, path: str) -> Optional[Dict[str, Any]]:
+        """Возвращает место файла в архиве (path, offset, length) или None, если файл не в архиве."""
+        self._load()
+        entry = self.entries.get(path)
+        return entry.get("bundle") if entry else None
+
+    async def _put(self, entry: Dict[str, Any]) -> None:
+        self.entries[entry["path"]] = entry
+        await self.journal.append({"op": "put", "entry": entry})
+
+    async def _remove(self, relative_path: str) -> None:
+        self.entries.pop(relative_path, None)
+        await self.journal.append({"op": "remove", "path": relative_path})
+
+    def _scan(self) -> Dict[str, os.stat_result]:
+        """Читает метаданные всех файлов результатов (без их содержимого)."""
+        found = {}
+        for directory in self.directories:
+            absolute = os.path.join(self.results_dir, directory)
+            try:
+                with os.scandir(absolute) as iterator:
+                    for item in iterator:
+                        if item.name.endswith(self.extensions) and item.is_file():
+                            found[os.path.join(directory, item.name) if directory else item.name] = item.stat()
+            except FileNotFoundError:
+                continue
+        return found
+
+    async def reconcile(self) -> Dict[str, int]:
+        """
+        Сверяет индекс с диском.
+
+        Returns:
+            Dict[str, int]: Количество добавленных, обновленных и удаленных записей
+        """
+        self._load()
+        async with self._reconcile_lock:
+            found = await file_io.run(self._scan)
+            stats = {"added": 0, "updated": 0, "removed": 0}
+            for relative_path, stat in found.items():
+                known = self.entries.get(relative_path)
+                if known and known.get("mtime") == stat.st_mtime and known.get("size") == stat.st_size:
+                    continue
+                entry = self._stat_entry(relative_path, stat)
+                if entry["format"] == "json":
+                    try:
+                        entry.update(await file_io.run(self._read_header, os.path.join(self.results_dir, relative_path)))
+                    except Exception as e:
+                        logger.warning(f"Не удалось прочитать заголовок {relative_path}: {e}")
+                await self._put(entry)
+                stats["updated" if known else "added"] += 1
+            # Файлы, перенесенные в архив, остаются в индексе
+            for relative_path in [path for path, entry in self.entries.items()
+                                  if path not in found and "bundle" not in entry]:
+                await self._remove(relative_path)
+                stats["removed"] += 1
+
+            if self.journal.needs_compaction:
+                await self.journal.compact(self._records, force=False)
+            self._reconciled_at = asyncio.get_running_loop().time()
+            if any(stats.values()):
+                logger.info(f"Индекс файлов результатов сверен с диском: {stats}")
+            return stats
+
+    async def _ensure_fresh(self) -> None:
+        """Сверяет индекс с диском, если с прошлой сверки прошло больше reconcile_interval."""
+        self._load()
+        # Файлы, добавленные другими процессами приложения
+        await self.journal.refresh()
+        now = asyncio.get_running_loop().time()
+        if self._reconciled_at is None or now - self._reconciled_at >= self.reconcile_interval:
+            await self.reconcile()
+
+    @staticmethod
+    def _sort_key(entry: Dict[str, Any], sort: str) -> Tuple:
+        value = entry.get(sort)
+        if sort in ("query", "filename"):
+            return (value or "", entry["path"])
+        return (value if value is not None else 0, entry["path"])
+
+    @staticmethod
+    def encode_cursor(key: Tuple) -> str:
+        return base64.urlsafe_b64encode(json.dumps(list(key), ensure_ascii=False).encode("utf-8")).decode("ascii")
+
+    @staticmethod
+    def decode_cursor(cursor: str) -> Tuple:
+        try:
+            return tuple(json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8")))
+        except Exception:
+            raise ValueError(f"Некорректный курсор: {cursor}")
+
+    async def list(self, categories: Optional[Iterable[Optional[str]]] = None, query: Optional[str] = None,
+                   file_format: Optional[str] = None, sort: str = "created", descending: bool = True,
+                   cursor: Optional[str] = None, limit: int = 100) -> Dict[str, Any]:
+        """
+        Возвращает страницу списка файлов.
+
+        Args:
+            categories: Категории (поддиректории; None - файлы в самой директории результатов),
+                по умолчанию все
+            query: Подстрока поискового запроса (без учета регистра)
+            file_format: Формат файла (json, csv, txt)
+            sort: Поле сортировки (created, size, count, query, filename)
+            descending: Сортировать по убыванию
+            cursor: Курсор следующей страницы из предыдущего ответа
+            limit: Размер страницы
+
+        Returns:
+            Dict: files, total (всего подходящих файлов) и next_cursor (None на последней странице)
+
+        Raises:
+            ValueError: При неизвестном поле сортировки или некорректном курсоре
+        """
+        if sort not in SORT_FIELDS:
+            raise ValueError(f"Недопустимое поле сортировки: {sort}")
+        after = self.decode_cursor(cursor) if cursor else None
+        await self._ensure_fresh()
+
+        wanted = set(categories) if categories is not None else None
+        needle = query.lower() if query else None
+        matched = [
+            entry for entry in self.entries.values()
+            if (wanted is None or entry.get("category") in wanted)
+            and (file_format is None or entry["format"] == file_format)
+            and (needle is None or needle in (entry.get("query") or "").lower())
+        ]
+        matched.sort(key=lambda entry: self._sort_key(entry, sort), reverse=descending)
+
+        if after is not None:
+            # Ключ курсора - ключ сортировки последнего отданного файла
+            start = 0
+            for start, entry in enumerate(matched):
+                key = self._sort_key(entry, sort)
+                if (key < after) if descending else (key > after):
+                    break
+            else:
+                start = len(matched)
+            page = matched[start:start + limit]
+            remaining = len(matched) - start - len(page)
+        else:
+            page = matched[:limit]
+            remaining = len(matched) - len(page)
+
+        next_cursor = self.encode_cursor(self._sort_key(page[-1], sort)) if page and remaining > 0 else None
+        return {"files": [dict(entry) for entry in page], "total": len(matched), "next_cursor": next_cursor}
+
+    async def close(self) -> None:
+        await self.journal.close()
@@ -0,0 +1,349 @@
+import os
+import re
+import gzip
+import json
+import time
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from .async_io import file_io
+from .results_manifest import ResultsManifest
+from .storage import get_storage
+
+logger = logging.getLogger(__name__)
+
+# Поддиректория директории результатов с архивами: каждая проверка дописывает в месяц новый
+# сегмент bundles/<категория>/<ГГГГ-ММ>/<сегмент>.jsonl.gz
+BUNDLE_DIR = "bundles"
+
+# Имя файла результатов: <запрос>_<ГГГГ-ММ-ДД_ЧЧ-ММ-СС>.json
+TIMESTAMP_REGEX = re.compile(r"_(\d{4})-(\d{2})-\d{2}_\d{2}-\d{2}-\d{2}\.json$")
+
+# Служебные файлы, которые никогда не удаляются (журналы, снимки, блокировки, незавершенные записи)
+PROTECTED_SUFFIXES = (".journal", ".snapshot", ".lock", ".tmp")
+
+MB = 1024 * 1024
+
+FileInfo = Tuple[str, int, float]  # путь, размер, mtime
+
+def _scan(directory: str) -> List[FileInfo]:
+    """Читает размер и mtime файлов директории (без поддиректорий)."""
+    found = []
+    try:
+        with os.scandir(directory) as iterator:
+            for item in iterator:
+                if item.name.endswith(PROTECTED_SUFFIXES) or not item.is_file():
+                    continue
+                stat = item.stat()
+                found.append((item.path, stat.st_size, stat.st_mtime))
+    except FileNotFoundError:
+        pass
+    return found
+
+def _bundle_month(path: str, mtime: float) -> str:
+    """Месяц архива: из метки времени в имени файла, иначе по времени изменения."""
+    match = TIMESTAMP_REGEX.search(os.path.basename(path))
+    if match:
+        return f"{match.group(1)}-{match.group(2)}"
+    return datetime.fromtimestamp(mtime).strftime("%Y-%m")
+
+def _write_segment(segment_path: str, files: List[Tuple[str, str, float]]) -> List[Tuple[str, str, int, int]]:
+    """
+    Записывает JSON-файлы в новый сегмент архива (JSON Lines, сжатый gzip).
+
+    Каждая строка сжимается отдельным членом gzip, поэтому сегмент читается как обычный
+    .jsonl.gz, а одну строку можно распаковать по ее смещению, не читая остальные.
+    Сегмент пишется во временный файл и атомарно переименовывается, поэтому исходные
+    файлы удаляются только после того, как сегмент целиком на диске.
+
+    Args:
+        segment_path: Путь к сегменту
+        files: Абсолютный путь, путь относительно директории результатов и mtime файлов
+
+    Returns:
+        List[Tuple[str, str, int, int]]: Абсолютный и относительный пути, смещение и длина
+        строки в сегменте для файлов, содержимое которых теперь есть в архиве
+    """
+    os.makedirs(os.path.dirname(segment_path), exist_ok=True)
+    temporary = f"{segment_path}.{os.getpid()}.tmp"
+    written = []
+    with open(temporary, "wb") as raw:
+        for path, relative_path, mtime in files:
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+            except Exception as e:
+                # Поврежденный файл оставляем на месте: его удалит только ограничение по сроку
+                logger.warning(f"Файл {path} не добавлен в архив: {e}")
+                continue
+            record = {"file": relative_path, "mtime": mtime, "data": data}
+            member = gzip.compress((json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8"), mtime=0)
+            written.append((path, relative_path, raw.tell(), len(member)))
+            raw.write(member)
+        raw.flush()
+        os.fsync(raw.fileno())
+    if not written:
+        os.remove(temporary)
+        return written
+    os.replace(temporary, segment_path)
+    return written
+
+def _read_segment(segment_path: str, offset: int, length: int) -> Any:
+    """Читает содержимое файла из сегмента архива по смещению строки."""
+    with open(segment_path, "rb") as f:
+        f.seek(offset)
+        return json.loads(gzip.decompress(f.read(length)))["data"]
+
+def _find_in_bundle(bundle_path: str, relative_path: str) -> Optional[Any]:
+    """Ищет файл в архиве последовательным чтением (архивы и сегменты без места в индексе)."""
+    try:
+        with gzip.open(bundle_path, "rb") as f:
+            for line in f:
+                record = json.loads(line)
+                if record["file"] == relative_path:
+                    return record["data"]
+    except FileNotFoundError:
+        pass
+    return None
+
+class RetentionService:
+    """
+    Ограничение роста директорий с результатами и отладочными файлами.
+
+    Для каждой директории задается бюджет: max_mb (общий размер) и max_age_days
+    (срок хранения), 0 - без ограничения. Проверка (run_once) работает так:
+
+    1. В директориях с bundle=True JSON-файлы результатов старше bundle_after_days
+       переносятся в архив: каждая проверка пишет в месяц новый сегмент
+       bundles/<категория>/<ГГГГ-ММ>/<сегмент>.jsonl.gz (одна строка - один исходный файл),
+       а прежние сегменты не переписываются. Исходные файлы удаляются.
+    2. Файлы старше max_age_days удаляются, затем, пока директория больше max_mb,
+       удаляются самые старые. JSON-файлы результатов при этом не теряются, а тоже
+       переносятся в архив. HTML сайтов хранилища, сохраненный до перехода на архив
+       HTML, переносится в архив хранилища (запись сайта обновляется), а не удаляется.
+
+    Удаленные файлы сразу удаляются из индекса файлов результатов, а перенесенные
+    в архив остаются в нем с местом в архиве (ResultsManifest.mark_bundled), поэтому
+    списки в API показывают все доступные файлы, а read_bundled читает файл из сегмента
+    по смещению. Вся работа с диском выполняется через file_io, а не в цикле событий.
+    """
+
+    def __init__(self, results_dir: str, budgets: Dict[str, Dict[str, Any]], bundle_after_days: int = 30,
+                 manifest: Optional[ResultsManifest] = None):
+        """
+        Args:
+            results_dir: Директория результатов
+            budgets: Директория (относительный путь - внутри директории результатов) ->
+                {"max_mb": ..., "max_age_days": ..., "bundle": ...}
+            bundle_after_days: Через сколько дней JSON-файлы результатов объединяются в архивы (0 - не объединять)
+            manifest: Индекс файлов результатов, из которого удаляются удаленные файлы
+                и в котором отмечаются перенесенные в архив
+        """
+        self.results_dir = results_dir
+        self.budgets = budgets
+        self.bundle_after_days = bundle_after_days
+        self.manifest = manifest
+        self.bundle_dir = os.path.join(results_dir, BUNDLE_DIR)
+        self._lock = asyncio.Lock()
+
+    def _directory(self, name: str) -> str:
+        return name if os.path.isabs(name) else os.path.join(self.results_dir, name)
+
+    def _relative(self, path: str) -> Optional[str]:
+        """Путь относительно директории результатов или None для файлов вне нее."""
+        relative_path = os.path.relpath(path, self.results_dir)
+        return None if relative_path.startswith("..") else relative_path
+
+    async def _forget(self, path: str) -> None:
+        """Удаляет файл из индекса файлов результатов."""
+        relative_path = self._relative(path)
+        if self.manifest is not None and relative_path is not None:
+            await self.manifest.remove(relative_path)
+
+    async def _bundle(self, files: List[FileInfo], stats: Dict[str, int]) -> List[str]:
+        """Переносит JSON-файлы результатов в новые сегменты месячных архивов и удаляет исходные файлы."""
+        # Имя сегмента уникально для каждой проверки: записанные сегменты не перезаписываются
+        segment = f"{time.time_ns()}.jsonl.gz"
+        groups: Dict[str, List[Tuple[str, str, float]]] = {}
+        done: List[str] = []
+        for path, size, mtime in files:
+            relative_path = self._relative(path)
+            if relative_path is None:
+                continue
+            if self.manifest is not None and self.manifest.bundle_of(relative_path):
+                # Уже в архиве (сбой между записью сегмента и удалением файла)
+                done.append(path)
+                continue
+            category = os.path.dirname(relative_path) or "results"
+            segment_path = os.path.join(self.bundle_dir, category, _bundle_month(path, mtime), segment)
+            groups.setdefault(segment_path, []).append((path, relative_path, mtime))
+
+        for segment_path, group in groups.items():
+            try:
+                written = await file_io.run(_write_segment, segment_path, group)
+            except Exception as e:
+                logger.error(f"Ошибка при записи архива {segment_path}: {str(e)}")
+                stats["errors"] += 1
+                continue
+            if written:
+                stats["bundles"] += 1
+            for path, relative_path, offset, length in written:
+                if self.manifest is not None:
+                    await self.manifest.mark_bundled(relative_path, {
+                        "path": self._relative(segment_path), "offset": offset, "length": length,
+                    })
+                done.append(path)
+
+        sizes = {path: size for path, size, _ in files}
+        processed = []
+        for path in done:
+            if await self._delete(path, stats, forget=False):
+                stats["bundled"] += 1
+                stats["freed_bytes"] += sizes[path]
+                processed.append(path)
+        return processed
+
+    async def _delete(self, path: str, stats: Dict[str, int], forget: bool = True) -> bool:
+        try:
+            await file_io.remove(path)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.error(f"Не удалось удалить {path}: {str(e)}")
+            stats["errors"] += 1
+            return False
+        if forget:
+            await self._forget(path)
+        return True
+
+    async def _evict(self, files: List[FileInfo], bundle: bool, legacy_html: Dict[str, str],
+                     stats: Dict[str, int]) -> None:
+        """Освобождает место: архивирует JSON-файлы результатов и HTML хранилища, остальное удаляет."""
+        bundled = [file for file in files if bundle and file[0].endswith(".json")]
+        if bundled:
+            await self._bundle(bundled, stats)
+        for path, size, _ in files:
+            if bundle and path.endswith(".json"):
+                continue
+            domain = legacy_html.get(os.path.abspath(path))
+            if domain is not None:
+                try:
+                    await get_storage().archive_legacy_html(domain)
+                    stats["archived"] += 1
+                except Exception as e:
+                    logger.error(f"Не удалось перенести HTML {domain} в архив: {str(e)}")
+                    stats["errors"] += 1
+                    continue
+            if await self._delete(path, stats):
+                stats["removed"] += 1
+                stats["freed_bytes"] += size
+
+    async def _apply_budget(self, name: str, budget: Dict[str, Any], legacy_html: Dict[str, str],
+                            stats: Dict[str, int]) -> None:
+        directory = self._directory(name)
+        files = sorted(await file_io.run(_scan, directory), key=lambda file: file[2])
+        bundle = bool(budget.get("bundle"))
+        now = time.time()
+
+        if bundle and self.bundle_after_days > 0:
+            cutoff = now - self.bundle_after_days * 86400
+            old = [file for file in files if file[2] < cutoff and file[0].endswith(".json")]
+            if old:
+                done = set(await self._bundle(old, stats))
+                files = [file for file in files if file[0] not in done]
+
+        evicted: List[FileInfo] = []
+        max_age_days = budget.get("max_age_days") or 0
+        if max_age_days > 0:
+            cutoff = now - max_age_days * 86400
+            evicted = [file for file in files if file[2] < cutoff]
+            files = files[len(evicted):]
+        max_bytes = (budget.get("max_mb") or 0) * MB
+        if max_bytes > 0:
+            total = sum(size for _, size, _ in files)
+            while files and total > max_bytes:
+                evicted.append(files[0])
+                total -= files[0][1]
+                files = files[1:]
+        if evicted:
+            await self._evict(evicted, bundle, legacy_html, stats)
+
+    async def run_once(self) -> Dict[str, Any]:
+        """
+        Проверяет все директории по их бюджетам.
+
+        Returns:
+            Dict: bundled (файлов перенесено в архивы), bundles (сегментов записано), removed,
+                archived (HTML перенесено в архив хранилища), freed_bytes, errors и duration
+        """
+        async with self._lock:
+            started = time.perf_counter()
+            stats = {"bundled": 0, "bundles": 0, "removed": 0, "archived": 0, "freed_bytes": 0, "errors": 0}
+            legacy_html = get_storage().legacy_html_files()
+            for name, budget in self.budgets.items():
+                try:
+                    await self._apply_budget(name, budget, legacy_html, stats)
+                except Exception as e:
+                    logger.error(f"Ошибка при очистке директории {name}: {str(e)}")
+                    stats["errors"] += 1
+            stats["duration"] = round(time.perf_counter() - started, 3)
+            if stats["bundled"] or stats["removed"] or stats["errors"]:
+                logger.info(f"Очистка директорий: {stats}")
+            return stats
+
+    async def run_periodically(self, interval: float) -> None:
+        """Проверяет директории каждые interval секунд (до отмены задачи)."""
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.error(f"Ошибка при очистке директорий: {str(e)}")
+            await asyncio.sleep(interval)
+
+    async def read_bundled(self, relative_path: str) -> Optional[Any]:
+        """
+        Ищет содержимое файла результатов, перенесенного в архив.
+
+        Место файла в архиве берется из индекса файлов результатов, и читается только
+        его строка сегмента. Файлы, которых нет в индексе, ищутся последовательным
+        чтением сегментов их месяца.
+
+        Args:
+            relative_path: Путь файла относительно директории результатов (например, sites/<файл>.json)
+
+        Returns:
+            Optional[Any]: Содержимое файла или None
+        """
+        bundle = self.manifest.bundle_of(relative_path) if self.manifest is not None else None
+        if bundle:
+            try:
+                return await file_io.run(_read_segment, os.path.join(self.results_dir, bundle["path"]),
+                                         bundle["offset"], bundle["length"])
+            except Exception as e:
+                logger.error(f"Не удалось прочитать {relative_path} из архива {bundle['path']}: {str(e)}")
+
+        # Запасной путь, если индекс потерял запись: чтение сегментов месяца файла
+        # (или всех месяцев, если в имени нет метки времени)
+        category_dir = os.path.join(self.bundle_dir, os.path.dirname(relative_path) or "results")
+        match = TIMESTAMP_REGEX.search(os.path.basename(relative_path))
+        if match:
+            months = [f"{match.group(1)}-{match.group(2)}"]
+        else:
+            try:
+                months = sorted(await file_io.listdir(category_dir), reverse=True)
+            except FileNotFoundError:
+                return None
+        candidates = []
+        for month in months:
+            try:
+                segments = await file_io.listdir(os.path.join(category_dir, month))
+            except (FileNotFoundError, NotADirectoryError):
+                continue
+            candidates += [os.path.join(category_dir, month, segment) for segment in sorted(segments, reverse=True)
+                           if segment.endswith(".jsonl.gz")]
+        for bundle_path in candidates:
+            data = await file_io.run(_find_in_bundle, bundle_path, relative_path)
+            if data is not None:
+                return data
+        return None
@@ -0,0 +1,356 @@
+import os
+import re
+import json
+import glob
+import logging
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from .utils import registrable_domain
+
+logger = logging.getLogger(__name__)
+
+class SiteScorer:
+    """
+    Оценивает, похож ли сайт на поставщика, по признакам из поисковой выдачи и текста страницы.
+
+    Пакет сайтов превращается в матрицу признаков без цикла по сайтам: тексты всех сайтов
+    склеиваются через разделитель и просматриваются выражением каждого признака один раз,
+    а совпадения раскладываются по строкам матрицы через np.searchsorted. Оценки всего
+    пакета получаются одним матричным умножением на вектор весов. Уверенные случаи
+    классифицируются сразу, а сайты из неопределенной середины отправляются на скачивание.
+    """
+
+    # Разделитель записей в склеенном тексте пакета
+    SEPARATOR = '\x00'
+
+    # Признаки ищутся отдельными выражениями, каждая альтернатива которых начинается с литерала:
+    # так движок регулярных выражений быстро пропускает позиции без совпадений. Границы слов
+    # поэтому проверяются ретроспективой после литерала, а не через \b перед ним.
+
+    # Текстовые признаки: имя признака -> регулярное выражение (по тексту в нижнем регистре)
+    TEXT_FEATURES = {
+        'legal_form': '|'.join(rf'{word}(?<!\w{word})(?!\w)' for word in ('инн', 'ооо', 'оао', 'зао', 'ао', 'ип', 'огрн', 'пао')),
+        'price_word': r'цен[аыуе]|прайс|стоимост|руб(?<!\wруб)|₽',
+        'catalog_word': r'купить|каталог|в наличии|со склада|заказать|оптом|опт(?<!\wопт)(?!\w)|производител|производств|'
+                        r'поставщик|поставк|доставк|продаж|завод',
+        'info_word': r'википеди|что такое|статья|форум|отзыв|блог|новости|своими руками|как выбрать|'
+                     r'инструкция|реферат|вопрос|ответы',
+        'contact': r'контакт|телефон|тел(?<!\wтел)(?!\w)|e-mail|email|почт[аы]|\+7[\s(\-]?\d|@[a-z0-9\-]+\.[a-z]{2,}'
+    }
+
+    # Признаки пути URL: сегмент пути (разделители / - _ .) совпадает с одним из слов
+    PATH_FEATURES = {
+        'commerce_path': ('catalog', 'katalog', 'product', 'products', 'price', 'shop', 'tovar', 'goods', 'prodazha', 'kupit'),
+        'info_path': ('blog', 'news', 'article', 'articles', 'stati', 'wiki', 'forum', 'question', 'questions', 'otzyvy', 'reviews'),
+        'contact_path': ('contact', 'contacts', 'kontakt', 'kontakty', 'rekvizity', 'about', 'o-kompanii')
+    }
+
+    # Глубина пути: количество непустых сегментов
+    PATH_DEPTH_PATTERN = r'/[^/\x00]'
+
+    # Хост и путь каждого URL в склеенной через SEPARATOR строке (ровно одно совпадение на URL,
+    # в том числе пустой): схема, //хост, путь, затем запрос и фрагмент до разделителя
+    URL_PARTS = re.compile(r'(?:^|(?<=\x00))(?:[A-Za-z][A-Za-z0-9+.\-]*:)?(?://([^/?#\x00]*))?([^?#\x00]*)[^\x00]*')
+
+    # Признаки домена (по имени регистрируемого домена и зоне)
+    DOMAIN_FEATURES = {
+        'supplier_domain': r'metall|metal|stal|zavod|opt|snab|torg|prom|trade|steel|postav|sklad',
+        'info_domain': r'wiki|forum|blog|news|otzyv|journal|media',
+        'tld_ru': r'\.(?:ru|su|рф|xn--p1ai)(?=\x00|$)'
+    }
+
+    # Порядок столбцов матрицы признаков
+    FEATURES = [
+        'legal_form', 'price_word', 'catalog_word', 'info_word', 'contact',
+        'commerce_path', 'info_path', 'contact_path', 'path_depth', 'root_page',
+        'supplier_domain', 'info_domain', 'tld_ru'
+    ]
+
+    # Веса признаков
+    WEIGHTS = {
+        'legal_form': 2.5,
+        'price_word': 0.6,
+        'catalog_word': 0.6,
+        'info_word': -1.2,
+        'contact': 0.4,
+        'commerce_path': 0.8,
+        'info_path': -2.0,
+        'contact_path': 0.5,
+        'path_depth': -0.1,
+        'root_page': 0.3,
+        'supplier_domain': 0.6,
+        'info_domain': -1.5,
+        'tld_ru': 0.0
+    }
+
+    # Максимальное количество учитываемых совпадений для признаков-счетчиков
+    MAX_HITS = {
+        'legal_form': 1,
+        'price_word': 2,
+        'catalog_word': 3,
+        'info_word': 3,
+        'contact': 2,
+        'commerce_path': 1,
+        'info_path': 1,
+        'contact_path': 1,
+        'path_depth': 5,
+        'supplier_domain': 1,
+        'info_domain': 1,
+        'tld_ru': 1
+    }
+
+    def __init__(self, supplier_threshold: float = 3.0, other_threshold: float = -2.0,
+                 weights: Optional[Dict[str, float]] = None):
+        """
+        Инициализирует оценщик.
+
+        Args:
+            supplier_threshold: Оценка, начиная с которой сайт считается поставщиком без скачивания
+            other_threshold: Оценка, ниже которой сайт считается другим без скачивания
+            weights: Веса признаков (по умолчанию WEIGHTS)
+        """
+        self.supplier_threshold = supplier_threshold
+        self.other_threshold = other_threshold
+        self.weights = dict(self.WEIGHTS, **(weights or {}))
+        self.weight_vector = np.array([self.weights[name] for name in self.FEATURES], dtype=np.float32)
+        self.caps = np.array([self.MAX_HITS.get(name, 1) for name in self.FEATURES], dtype=np.float32)
+
+        self._columns = {name: index for index, name in enumerate(self.FEATURES)}
+        path_patterns = {
+            name: '|'.join(rf'{word}(?<![^/\-_.]{word})(?![^/\-_.\x00])' for word in words)
+            for name, words in self.PATH_FEATURES.items()
+        }
+        path_patterns['path_depth'] = self.PATH_DEPTH_PATTERN
+        # Источник текста -> [(столбец, регулярное выражение)]
+        self._matchers = {
+            'text': self._compile(self.TEXT_FEATURES),
+            'path': self._compile(path_patterns),
+            'domain': self._compile(self.DOMAIN_FEATURES)
+        }
+
+    def _compile(self, features: Dict[str, str]) -> List[Tuple[int, re.Pattern]]:
+        """Компилирует выражения группы признаков вместе с номерами их столбцов."""
+        return [(self._columns[name], re.compile(pattern)) for name, pattern in features.items()]
+
+    def features(self, sites: List[Dict]) -> np.ndarray:
+        """
+        Строит матрицу признаков для пакета сайтов.
+
+        Учитываются заголовок, сниппет и, если есть, текст страницы (ключ text).
+
+        Args:
+            sites: Записи сайтов (ключи url, title, snippet, text)
+
+        Returns:
+            np.ndarray: Матрица размера (количество сайтов, количество признаков)
+        """
+        matrix = np.zeros((len(sites), len(self.FEATURES)), dtype=np.float32)
+        if not sites:
+            return matrix
+
+        texts = [f"{site.get('title') or ''} {site.get('snippet') or ''} {site.get('text') or ''}"
+                 .replace(self.SEPARATOR, ' ') for site in sites]
+        paths, domains = self._url_columns([(site.get('url') or '').replace(self.SEPARATOR, '') for site in sites])
+
+        self._count(matrix, self._matchers['text'], texts, lower=True)
+        self._count(matrix, self._matchers['path'], paths, lower=True)
+        self._count(matrix, self._matchers['domain'], domains, lower=False)
+
+        np.minimum(matrix, self.caps, out=matrix)
+        matrix[:, self._columns['root_page']] = matrix[:, self._columns['path_depth']] == 0
+        return matrix
+
+    def _url_columns(self, urls: List[str]) -> Tuple[List[str], List[str]]:
+        """
+        Выделяет пути и регистрируемые домены URL пакета.
+
+        URL разбираются одним проходом выражения URL_PARTS по склеенной строке, а домен
+        вычисляется только для различных хостов пакета (np.unique) и раскладывается
+        по строкам обратным индексом.
+
+        Args:
+            urls: URL сайтов пакета
+
+        Returns:
+            Tuple[List[str], List[str]]: Пути и регистрируемые домены в порядке URL
+        """
+        parts = self.URL_PARTS.findall(self.SEPARATOR.join(urls))
+        hosts, paths = zip(*parts)
+        unique, inverse = np.unique(np.array(hosts, dtype=str), return_inverse=True)
+        registrable = np.array([registrable_domain(host) for host in unique.tolist()], dtype=str)
+        return list(paths), registrable[inverse].tolist()
+
+    def _count(self, matrix: np.ndarray, matchers: List[Tuple[int, re.Pattern]], values: List[str], lower: bool) -> None:
+        """
+        Считает совпадения группы признаков сразу по всем записям пакета.
+
+        Args:
+            matrix: Матрица признаков, в которую добавляются счетчики
+            matchers: Номера столбцов и выражения признаков группы
+            values: Строки записей в порядке строк матрицы
+            lower: Приводить ли склеенный текст к нижнему регистру
+        """
+        joined = self.SEPARATOR.join(values)
+        if lower:
+            joined = joined.lower()
+
+        # Начало каждой записи в склеенной строке
+        lengths = np.fromiter((len(value) + 1 for value in values), dtype=np.int64, count=len(values))
+        offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+
+        for column, regex in matchers:
+            positions = np.fromiter((match.start() for match in regex.finditer(joined)), dtype=np.int64)
+            if len(positions):
+                rows = np.searchsorted(offsets, positions, side='right') - 1
+                matrix[:, column] += np.bincount(rows, minlength=len(values))
+
+    def score_batch(self, sites: List[Dict]) -> np.ndarray:
+        """
+        Вычисляет оценки для пакета сайтов.
+
+        Args:
+            sites: Записи сайтов
+
+        Returns:
+            np.ndarray: Оценки в порядке входных записей
+        """
+        return self.features(sites) @ self.weight_vector
+
+    def score(self, site: Dict) -> float:
+        """
+        Вычисляет оценку одного сайта.
+
+        Args:
+            site: Запись сайта (ключи url, title, snippet, text)
+
+        Returns:
+            float: Оценка; чем больше, тем вероятнее, что сайт - поставщик
+        """
+        return float(self.score_batch([site])[0])
+
+    def decide(self, score: float) -> Optional[str]:
+        """
+        Принимает решение по оценке.
+
+        Args:
+            score: Оценка сайта
+
+        Returns:
+            Optional[str]: 'supplier', 'other' или None, если нужен анализ содержимого сайта
+        """
+        if score >= self.supplier_threshold:
+            return 'supplier'
+        if score <= self.other_threshold:
+            return 'other'
+        return None
+
+    def calibrate(self, suppliers: List[Dict], others: List[Dict], precision: float = 0.95) -> Dict[str, float]:
+        """
+        Подбирает пороги по размеченным сайтам.
+
+        Порог поставщика - наименьшая оценка, при которой среди сайтов с оценкой не ниже
+        порога доля поставщиков не меньше precision. Порог другого сайта подбирается
+        симметрично. Сайты между порогами будут скачиваться. Если классы не разделяются
+        с нужной точностью, решения по выдаче отключаются (скачиваются все сайты).
+
+        Args:
+            suppliers: Сайты, размеченные как поставщики
+            others: Сайты, размеченные как другие
+            precision: Требуемая точность решений без скачивания
+
+        Returns:
+            Dict[str, float]: Новые пороги и доли сайтов, решаемых без скачивания
+        """
+        scores = self.score_batch(suppliers + others)
+        labels = np.concatenate((np.ones(len(suppliers)), np.zeros(len(others))))
+        if not len(scores):
+            raise ValueError("Нет размеченных сайтов для калибровки")
+
+        order = np.argsort(-scores, kind='stable')
+        ranked_scores, ranked_labels = scores[order], labels[order]
+
+        # Точность "поставщик" для порога, равного каждой оценке (сверху вниз)
+        supplier_precision = np.cumsum(ranked_labels) / np.arange(1, len(ranked_labels) + 1)
+        # Точность "другой" для порога, равного каждой оценке (снизу вверх)
+        other_precision = (np.cumsum(1 - ranked_labels[::-1]) / np.arange(1, len(ranked_labels) + 1))[::-1]
+
+        # Порог отсекает сайты только по границе оценок: сайты с равной оценкой проходят
+        # его вместе, поэтому точность считается по последнему (для "другого" - первому)
+        # сайту каждой группы равных оценок
+        tie_end = np.append(ranked_scores[1:] != ranked_scores[:-1], True)
+        tie_start = np.insert(ranked_scores[1:] != ranked_scores[:-1], 0, True)
+        supplier_ok = np.nonzero((supplier_precision >= precision) & tie_end)[0]
+        other_ok = np.nonzero((other_precision >= precision) & tie_start)[0]
+        supplier_threshold = float(ranked_scores[supplier_ok.max()]) if len(supplier_ok) else float(scores.max()) + 1
+        other_threshold = float(ranked_scores[other_ok.min()]) if len(other_ok) else float(scores.min()) - 1
+
+        if other_threshold >= supplier_threshold:
+            # Классы не разделяются с нужной точностью - решения по выдаче отключаются
+            supplier_threshold, other_threshold = float(scores.max()) + 1, float(scores.min()) - 1
+
+        self.supplier_threshold = supplier_threshold
+        self.other_threshold = other_threshold
+        decided = np.mean((scores >= supplier_threshold) | (scores <= other_threshold))
+
+        logger.info(f"Калибровка порогов: поставщик >= {supplier_threshold:.2f}, другой <= {other_threshold:.2f}, "
+                    f"без скачивания решается {decided:.0%} сайтов")
+        return {
+            "supplier_threshold": supplier_threshold,
+            "other_threshold": other_threshold,
+            "decided_share": float(decided),
+            "samples": int(len(scores))
+        }
+
+    def save(self, path: str) -> None:
+        """Сохраняет пороги и веса в JSON-файл."""
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({
+                "supplier_threshold": self.supplier_threshold,
+                "other_threshold": self.other_threshold,
+                "weights": self.weights
+            }, f, ensure_ascii=False, indent=2)
+
+    @classmethod
+    def load(cls, path: str, **defaults) -> "SiteScorer":
+        """
+        Создает оценщик с порогами и весами из JSON-файла калибровки.
+
+        Если файла нет или он поврежден, используются переданные значения по умолчанию.
+        """
+        if path and os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                return cls(
+                    supplier_threshold=data["supplier_threshold"],
+                    other_threshold=data["other_threshold"],
+                    weights=data.get("weights")
+                )
+            except Exception as e:
+                logger.error(f"Ошибка при загрузке калибровки оценщика {path}: {str(e)}")
+        return cls(**defaults)
+
+    @staticmethod
+    def load_labelled(results_dir: str) -> Tuple[List[Dict], List[Dict]]:
+        """
+        Загружает размеченные сайты из файлов results/suppliers и results/others.
+
+        Args:
+            results_dir: Директория результатов
+
+        Returns:
+            Tuple[List[Dict], List[Dict]]: Поставщики и другие сайты (без повторов по URL)
+        """
+        labelled = []
+        for category in ("suppliers", "others"):
+            sites: Dict[str, Dict] = {}
+            for path in glob.glob(os.path.join(results_dir, category, "*.json")):
+                try:
+                    with open(path, "r", encoding="utf-8") as f:
+                        for site in json.load(f).get("results", []):
+                            if site.get("url"):
+                                sites[site["url"]] = site
+                except Exception as e:
+                    logger.error(f"Ошибка при чтении {path}: {str(e)}")
+            labelled.append(list(sites.values()))
+        return labelled[0], labelled[1]
@@ -1,13 +1,9 @@
-import httpx
-import re
-
-EMAIL_REGEX = re.compile(r"[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+")
+from .contact_crawler import ContactCrawler
 
 async def scrape_emails_from_url(url: str) -> list[str]:
     try:
-        async with httpx.AsyncClient(timeout=10) as client:
-            resp = await client.get(url)
-            emails = list(set(EMAIL_REGEX.findall(resp.text)))
-            return emails
+        # Адреса ищутся и на главной, и на страницах контактов сайта
+        result = await ContactCrawler(max_pages=3, site_budget=10.0, required=("emails",)).crawl_site(url)
+        return result["contacts"]["emails"]
     except Exception:
         return []
@@ -1,11 +1,11 @@
 import httpx
-from bs4 import BeautifulSoup
 from fake_useragent import UserAgent
 import random
 import asyncio
 import logging
 from typing import Optional
 from urllib.parse import quote, unquote
+from .html_parsing import parse_html
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -54,19 +54,19 @@ async def search_duckduckgo(query: str, max_results: int = 10) -> list[str]:
             )
             
             if response.status_code == 200:
-                soup = BeautifulSoup(response.text, "html.parser")
+                tree = parse_html(response.text)
                 
                 # Сохраняем HTML для отладки
                 logger.debug(f"Response HTML: {response.text}")
                 
                 # Ищем все результаты поиска
-                for result in soup.select(".links_main"):
-                    link_element = result.select_one("a.result__url")
+                for result in tree.css(".links_main"):
+                    link_element = result.css_first("a.result__url")
                     if not link_element:
-                        link_element = result.select_one("a.result__a")
+                        link_element = result.css_first("a.result__a")
                     
                     if link_element:
-                        href = link_element.get("href")
+                        href = link_element.attributes.get("href")
                         if not href:
                             continue
                             
@@ -83,8 +83,8 @@ async def search_duckduckgo(query: str, max_results: int = 10) -> list[str]:
                 if not links:
                     logger.warning("No links found in the search results")
                     logger.debug("Available elements:")
-                    for element in soup.select("a"):
-                        logger.debug(f"Element: {element}")
+                    for element in tree.css("a"):
+                        logger.debug(f"Element: {element.html}")
                     
             else:
                 logger.error(f"DuckDuckGo search failed with status code: {response.status_code}")
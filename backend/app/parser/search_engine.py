@@ -1,10 +1,10 @@
 from typing import List, Set, Dict, Optional
 import logging
 from urllib.parse import urlencode
-from bs4 import BeautifulSoup
 from .playwright_runner import PlaywrightRunner
 from .config.parser_config import config
 from .utils import extract_domain, is_valid_url, clean_url
+from .html_parsing import parse_html, select_links
 import asyncio
 import random
 
@@ -199,7 +199,7 @@ class SearchEngine:
         """Extract URLs from Google search results page."""
         urls = []
         try:
-            soup = BeautifulSoup(content, 'html.parser')
+            tree = parse_html(content)
             
             # Создаем список различных селекторов для различных структур Google Search
             selectors = [
@@ -214,32 +214,23 @@ class SearchEngine:
                 '.LC20lb'                # Заголовки результатов
             ]
             
-            # Пробуем все селекторы
-            for selector in selectors:
-                results = soup.select(selector)
+            # Пробуем все селекторы на одном разобранном документе
+            for href in select_links(tree, selectors):
+                # В Google ссылки могут начинаться с /url?q=
+                if href.startswith('/url?') and 'q=' in href:
+                    # Извлекаем URL из редиректа Google
+                    start_idx = href.find('q=') + 2
+                    end_idx = href.find('&', start_idx) if '&' in href[start_idx:] else len(href)
+                    href = href[start_idx:end_idx]
                 
-                if results:
-                    for result in results:
-                        href = result.get('href')
-                        # Проверяем URL и очищаем его от трекинговых параметров
-                        if href:
-                            # В Google ссылки могут начинаться с /url?q=
-                            if href.startswith('/url?') and 'q=' in href:
-                                # Извлекаем URL из редиректа Google
-                                start_idx = href.find('q=') + 2
-                                end_idx = href.find('&', start_idx) if '&' in href[start_idx:] else len(href)
-                                href = href[start_idx:end_idx]
-                            
-                            # Проверяем, начинается ли URL с http или https
-                            if href.startswith('http'):
-                                urls.append(href)
+                # Проверяем, начинается ли URL с http или https
+                if href.startswith('http'):
+                    urls.append(href)
                 
             # Если все еще нет результатов, пробуем найти любые внешние ссылки
             if not urls:
-                all_links = soup.find_all('a')
-                for link in all_links:
-                    href = link.get('href')
-                    if href and href.startswith('http') and 'google' not in href:
+                for href in select_links(tree, ['a']):
+                    if href.startswith('http') and 'google' not in href:
                         urls.append(href)
                         
             # Удаляем дубликаты, сохраняя порядок
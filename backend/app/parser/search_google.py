@@ -147,10 +147,15 @@ async def search_google(query: str, limit: int = 10, pages: int = 1) -> List[Dic
                                 href = await link_element.get_attribute("href")
                                 
                                 if href and not href.startswith(("javascript:", "data:")):
+                                    # Сниппет нужен для классификации без скачивания сайта
+                                    snippet_element = await result.query_selector("div.VwiC3b, [data-sncf]")
+                                    snippet = await snippet_element.inner_text() if snippet_element else ""
+                                    
                                     results.append({
                                         "title": title,
                                         "url": href,
-                                        "domain": href.split('/')[2] if '/' in href else ""
+                                        "domain": href.split('/')[2] if '/' in href else "",
+                                        "snippet": snippet.strip()
                                     })
                                     logger.info(f"Найден результат: {title} -> {href}")
                         except Exception as e:
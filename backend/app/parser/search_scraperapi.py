@@ -2,7 +2,6 @@ import asyncio
 import logging
 import random
 from typing import List, Dict, Any, Optional, Set
-from bs4 import BeautifulSoup
 from datetime import datetime
 import httpx
 import json
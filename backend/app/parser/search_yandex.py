@@ -145,11 +145,16 @@ async def search_yandex(query: str, limit: int = 10, pages: int = 1) -> List[Dic
                                 href = await link_elem.get_attribute("href")
                                 
                                 if title and href:
+                                    # Сниппет нужен для классификации без скачивания сайта
+                                    snippet_elem = await item.query_selector(".organic__content-wrapper, .text-container")
+                                    snippet = await snippet_elem.text_content() if snippet_elem else ""
+                                    
                                     logger.info(f"Найден результат: {title} -> {href}")
                                     results.append({
                                         "title": title.strip(),
                                         "url": href,
-                                        "result_url": href
+                                        "result_url": href,
+                                        "snippet": (snippet or "").strip()
                                     })
                                     
                                     # Если достигли лимита, прекращаем сбор
@@ -1,18 +1,55 @@
 import os
-import re
+import codecs
 import logging
 import aiohttp
 import asyncio
 from urllib.parse import urlparse
-from typing import Dict, Set, List, Tuple, Optional
+from typing import Dict, List, Tuple, Optional, AsyncIterator, Sequence
+from .classification_cache import ClassificationCache
+from .entity_index import EntityIndex
+from .pipeline_context import PipelineContext
+from .requisites import empty_requisites, extract_requisites, primary_requisites
+from .utils import registrable_domain
+from .scoring import SiteScorer
+from .contact_crawler import ContactCrawler
+from .markers import MarkerMatcher, SUPPLIER_MARKERS
 
 logger = logging.getLogger(__name__)
 
 class SiteClassifier:
     """Класс для классификации сайтов и их распределения по категориям."""
     
-    def __init__(self):
-        """Инициализирует объект классификатора."""
+    # Версия правил классификации. При изменении правил ее нужно увеличить,
+    # чтобы ранее сохраненные в кэше классификации перестали использоваться.
+    RULES_VERSION = 3
+    
+    # Минимальная длина хвоста блока: хватает на "ИНН/КПП" с разделителями и номером,
+    # чтобы реквизиты на стыке блоков не терялись
+    REQUISITES_OVERLAP = 96
+    
+    def __init__(self, max_content_bytes: int = 512 * 1024, chunk_size: int = 16 * 1024,
+                 concurrency: int = 10, site_timeout: float = 15.0, batch_deadline: float = 120.0,
+                 cache: Optional[ClassificationCache] = None, scorer: Optional[SiteScorer] = None,
+                 entities: Optional[EntityIndex] = None, requisites_budget: int = 128 * 1024,
+                 crawler: Optional[ContactCrawler] = None, crawl_budget: float = 5.0,
+                 markers: Optional[Sequence[str]] = None):
+        """
+        Инициализирует объект классификатора.
+        
+        Args:
+            max_content_bytes: Максимальный объем страницы, который скачивается для анализа
+            chunk_size: Размер блока, которыми читается тело ответа
+            concurrency: Максимальное количество одновременно классифицируемых сайтов
+            site_timeout: Таймаут классификации одного сайта в секундах
+            batch_deadline: Общий лимит времени на классификацию пакета в секундах
+            cache: Кэш классификации доменов (по умолчанию - только в памяти процесса)
+            scorer: Оценщик сайтов по данным поисковой выдачи
+            entities: Индекс компаний по ИНН (по умолчанию строится поверх кэша)
+            requisites_budget: Сколько байт дочитывается после маркера поставщика в поисках ИНН
+            crawler: Обходчик страниц контактов для поиска ИНН, если на главной его нет (None - не искать)
+            crawl_budget: Лимит времени на поиск ИНН по страницам сайта в секундах
+            markers: Маркеры поставщика (по умолчанию SUPPLIER_MARKERS)
+        """
         # Списки известных агрегаторов, маркетплейсов и других подобных платформ
         self.aggregators = {
             'avito.ru', 'youla.ru', 'ozon.ru', 'ozon.by', 'wildberries.ru', 'wildberries.by', 
@@ -27,29 +64,41 @@ class SiteClassifier:
             'forum.', 'forumhouse.ru'
         }
         
-        # Паттерны для определения компаний-поставщиков
-        self.supplier_patterns = r'\b(ИНН|ООО|ИП|ОАО|АО|ОГРН|ЗАО|НКО|ПК|ТОО|ЕООД|КФХ|СПК|ТСЖ|ТСН|МУП|ГУП|ФГУП|ФКП)\b'
+        # Маркеры компаний-поставщиков: один автомат на все маркеры, документ просматривается один раз
+        self.supplier_markers = list(markers or SUPPLIER_MARKERS)
+        self.marker_matcher = MarkerMatcher(self.supplier_markers)
         
-        # Кэш уже проверенных доменов и их классификации
-        self.domain_cache: Dict[str, str] = {}
+        # Ограничения на скачивание страниц: читаем блоками и не больше max_content_bytes.
+        # Хвост предыдущего блока (не короче самого длинного маркера с символом границы слова
+        # и реквизита с номером) добавляется к следующему, чтобы не пропустить их на стыке блоков.
+        self.max_content_bytes = max_content_bytes
+        self.chunk_size = chunk_size
+        self.requisites_budget = requisites_budget
+        self._overlap = max(max(len(marker) for marker in self.supplier_markers) + 1, self.REQUISITES_OVERLAP)
         
-        # Множество уже проверенных доменов для избежания дублирования
-        self.processed_domains: Set[str] = set()
+        # Оценка по данным выдачи, позволяющая не скачивать сайты в уверенных случаях
+        self.scorer = scorer or SiteScorer()
         
-        # Результаты классификации
-        self.suppliers: List[Dict] = []
-        self.others: List[Dict] = []
+        # Ограничения на пакетную классификацию
+        self.concurrency = concurrency
+        self.site_timeout = site_timeout
+        self.batch_deadline = batch_deadline
         
-        # Статистика
-        self.stats = {
-            'total_processed': 0,
-            'suppliers_found': 0,
-            'others_found': 0,
-            'already_processed': 0,
-            'errors': 0
-        }
+        # Кэш классификации доменов (общий для воркеров, если передан постоянный кэш)
+        self.cache = cache or ClassificationCache(rules_version=self.RULES_VERSION, persistent=False)
+        
+        # Компании по ИНН: сайты известной компании повторно не скачиваются
+        self.entities = entities or EntityIndex(self.cache)
+        
+        # Поиск ИНН на страницах контактов и реквизитов
+        self.crawler = crawler
+        self.crawl_budget = crawl_budget
+        
+        # Счетчики классификации ведутся в контексте запуска (PipelineContext),
+        # а не в классификаторе, который общий для всех запросов процесса
     
-    async def classify_site(self, url: str, title: str = "", timeout: int = 10) -> Optional[str]:
+    async def classify_site(self, url: str, title: str = "", timeout: int = 10, snippet: str = "",
+                            context: Optional[PipelineContext] = None) -> Optional[str]:
         """
         Классифицирует сайт как поставщик или другой тип сайта.
         
@@ -57,41 +106,64 @@ class SiteClassifier:
             url: URL сайта для классификации
             title: Заголовок страницы (если известен)
             timeout: Таймаут запроса в секундах
+            snippet: Сниппет из поисковой выдачи (если известен)
+            context: Контекст запуска, в котором ведутся счетчики
             
         Returns:
             str: 'supplier' или 'other' или None в случае ошибки
         """
+        category, _ = await self._classify(url, title, snippet, timeout, context or PipelineContext())
+        return category
+    
+    async def _classify(self, url: str, title: str, snippet: str, timeout: float,
+                        context: PipelineContext, prechecked: bool = False) -> Tuple[Optional[str], str]:
+        """
+        Классифицирует сайт и возвращает категорию вместе с признаком, по которому она определена.
+        
+        Сначала проверяются кэш, правила и данные поисковой выдачи; сайт скачивается
+        только если по ним нельзя уверенно принять решение.
+        
+        Args:
+            url: URL сайта для классификации
+            title: Заголовок страницы
+            snippet: Сниппет из поисковой выдачи
+            timeout: Таймаут запроса в секундах
+            context: Контекст запуска
+            prechecked: Кэш, правила и выдача уже проверены вызывающим кодом
+            
+        Returns:
+            Tuple[Optional[str], str]: Категория ('supplier', 'other' или None при ошибке) и признак
+        """
         try:
             # Получаем домен из URL
-            parsed_url = urlparse(url)
-            domain = parsed_url.netloc
-            
-            # Удаляем www. из домена, если есть
-            if domain.startswith('www.'):
-                domain = domain[4:]
-            
-            # Проверяем, обрабатывался ли уже этот домен
-            if domain in self.processed_domains:
-                logger.info(f"Домен {domain} уже был обработан ранее")
-                self.stats['already_processed'] += 1
-                return self.domain_cache.get(domain)
-            
-            # Проверяем, является ли домен агрегатором
-            for aggregator in self.aggregators:
-                if aggregator in domain or domain in aggregator:
-                    logger.info(f"Домен {domain} классифицирован как агрегатор")
-                    self.domain_cache[domain] = 'other'
-                    self.processed_domains.add(domain)
-                    self.stats['others_found'] += 1
-                    return 'other'
-            
-            # Если в заголовке есть признаки поставщика, классифицируем как поставщика
-            if re.search(self.supplier_patterns, title, re.IGNORECASE):
-                logger.info(f"Домен {domain} классифицирован как поставщик по заголовку")
-                self.domain_cache[domain] = 'supplier'
-                self.processed_domains.add(domain)
-                self.stats['suppliers_found'] += 1
-                return 'supplier'
+            domain = self._get_domain(url)
+            
+            if not prechecked:
+                # Проверяем, классифицировался ли уже этот домен
+                cached = await self.cache.get(domain)
+                if cached:
+                    logger.info(f"Домен {domain} уже был обработан ранее")
+                    context.count('already_processed')
+                    self.entities.add(domain, cached, cached['category'])
+                    return cached['category'], f"cache:{cached['evidence']}"
+                
+                # Проверяем агрегаторы и признаки поставщика в заголовке
+                rule = self._match_rules(domain, title)
+                if rule:
+                    return await self._remember(domain, *rule, context=context)
+                
+                # Если в выдаче указан ИНН уже известной компании, используем ее классификацию
+                serp_requisites = self._serp_requisites({'title': title, 'snippet': snippet})
+                entity = (await self.entities.lookup([serp_requisites['inn']])).get(serp_requisites['inn'])
+                if entity and entity['category']:
+                    return await self._remember_entity(domain, entity, context)
+                
+                # Пробуем принять решение по данным выдачи, не скачивая сайт
+                score = self.scorer.score({'url': url, 'title': title, 'snippet': snippet})
+                category = self.scorer.decide(score)
+                if category:
+                    logger.info(f"Домен {domain} классифицирован как {category} по данным выдачи (оценка {score:.2f})")
+                    return await self._remember(domain, category, f"serp:{score:.2f}", context, persist=False)
             
             # Скачиваем и анализируем контент сайта
             try:
@@ -99,116 +171,454 @@ class SiteClassifier:
                     async with session.get(url, timeout=timeout, 
                                           headers={'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36'}) as response:
                         if response.status == 200:
-                            html = await response.text()
-                            
-                            # Проверяем наличие признаков поставщика в HTML
-                            if re.search(self.supplier_patterns, html, re.IGNORECASE):
-                                logger.info(f"Домен {domain} классифицирован как поставщик по содержимому")
-                                self.domain_cache[domain] = 'supplier'
-                                self.processed_domains.add(domain)
-                                self.stats['suppliers_found'] += 1
-                                return 'supplier'
-                            else:
-                                logger.info(f"Домен {domain} классифицирован как другой тип сайта")
-                                self.domain_cache[domain] = 'other'
-                                self.processed_domains.add(domain)
-                                self.stats['others_found'] += 1
-                                return 'other'
+                            # Читаем страницу блоками до первого маркера или лимита по объему,
+                            # попутно извлекая реквизиты компании
+                            marker, bytes_read, requisites = await self._scan_content(response)
+                            requisites = primary_requisites(requisites)
                         else:
                             logger.warning(f"Не удалось получить содержимое {url}, статус: {response.status}")
                             # Если не удалось проанализировать, считаем "другим"
-                            self.domain_cache[domain] = 'other'
-                            self.processed_domains.add(domain)
-                            self.stats['others_found'] += 1
-                            return 'other'
+                            return await self._remember(domain, 'other', f"http:{response.status}", context, persist=False)
             except Exception as e:
                 logger.error(f"Ошибка при скачивании {url}: {str(e)}")
                 # Если не удалось проанализировать, считаем "другим"
-                self.domain_cache[domain] = 'other'
-                self.processed_domains.add(domain)
-                self.stats['others_found'] += 1
-                return 'other'
+                return await self._remember(domain, 'other', "fetch_error", context, persist=False)
+            
+            # ИНН обычно указан на страницах контактов или реквизитов, а не на главной
+            crawled_inn = None
+            if not requisites['inn'] and self.crawler:
+                crawled = await self._crawl_requisites(url, context)
+                if crawled and crawled['inn']:
+                    requisites = crawled
+                    crawled_inn = crawled['inn']
+            
+            if marker:
+                logger.info(f"Домен {domain} классифицирован как поставщик по содержимому "
+                            f"(маркер {marker}, ИНН {requisites['inn']}, прочитано {bytes_read} байт)")
+                return await self._remember(domain, 'supplier', f"content:{marker}", context,
+                                            requisites=requisites)
+            elif crawled_inn:
+                # ИНН с верной контрольной суммой на странице реквизитов - признак юридического лица
+                logger.info(f"Домен {domain} классифицирован как поставщик по странице реквизитов (ИНН {crawled_inn})")
+                return await self._remember(domain, 'supplier', f"crawl:{crawled_inn}", context,
+                                            requisites=requisites)
+            else:
+                logger.info(f"Домен {domain} классифицирован как другой тип сайта "
+                            f"(прочитано {bytes_read} байт)")
+                return await self._remember(domain, 'other', f"content:none:{bytes_read}", context,
+                                            requisites=requisites)
                 
         except Exception as e:
             logger.error(f"Ошибка при классификации {url}: {str(e)}")
-            self.stats['errors'] += 1
-            return None
+            context.count('errors')
+            return None, "error"
     
-    async def classify_batch(self, sites: List[Dict]) -> Tuple[List[Dict], List[Dict]]:
+    async def _crawl_requisites(self, url: str, context: PipelineContext) -> Optional[Dict[str, Optional[str]]]:
         """
-        Классифицирует пакет сайтов и возвращает списки поставщиков и других сайтов.
+        Ищет реквизиты компании на страницах контактов и реквизитов сайта.
+        
+        Итог обхода сохраняется в контексте запуска, чтобы сбор контактов продолжил его.
         
         Args:
-            sites: Список словарей с информацией о сайтах (обязательные ключи: url, title)
+            url: URL сайта
+            context: Контекст запуска
             
         Returns:
-            Tuple[List[Dict], List[Dict]]: Списки поставщиков и других сайтов
+            Optional[Dict[str, Optional[str]]]: Реквизиты (ключи inn, ogrn, kpp) или None,
+            если обход не уложился в crawl_budget или завершился ошибкой
         """
-        suppliers = []
-        others = []
+        try:
+            result = await asyncio.wait_for(self.crawler.crawl_site(url, required=('inn',)), timeout=self.crawl_budget)
+            context.crawls[url] = result
+            return result['requisites']
+        except asyncio.TimeoutError:
+            logger.warning(f"Поиск реквизитов на сайте {url} не уложился в {self.crawl_budget} сек")
+        except Exception as e:
+            logger.error(f"Ошибка при поиске реквизитов на сайте {url}: {str(e)}")
+        return None
+    
+    def _match_rules(self, domain: str, title: str) -> Optional[Tuple[str, str]]:
+        """
+        Проверяет правила, не требующие сетевых запросов: агрегаторы и признаки поставщика в заголовке.
+        
+        Args:
+            domain: Домен сайта
+            title: Заголовок страницы
+            
+        Returns:
+            Optional[Tuple[str, str]]: Категория и признак или None, если правила не сработали
+        """
+        # Проверяем, является ли домен агрегатором
+        for aggregator in self.aggregators:
+            if aggregator in domain or domain in aggregator:
+                logger.info(f"Домен {domain} классифицирован как агрегатор")
+                return 'other', f"aggregator:{aggregator}"
+        
+        # Если в заголовке есть признаки поставщика, классифицируем как поставщика
+        marker = self.marker_matcher.search(title or "")
+        if marker:
+            logger.info(f"Домен {domain} классифицирован как поставщик по заголовку")
+            return 'supplier', f"title:{marker}"
+        return None
+    
+    async def _remember(self, domain: str, category: str, evidence: str, context: PipelineContext,
+                        persist: bool = True, requisites: Optional[Dict[str, Optional[str]]] = None) -> Tuple[str, str]:
+        """
+        Запоминает классификацию домена в кэше и обновляет счетчики запуска.
+        
+        Args:
+            domain: Домен сайта
+            category: 'supplier' или 'other'
+            evidence: Признак, по которому принято решение
+            context: Контекст запуска
+            persist: Сохранять ли результат в общий кэш (False для временных ошибок
+                и дешевых решений по выдаче)
+            requisites: Реквизиты компании (ключи inn, ogrn, kpp), если они известны
+            
+        Returns:
+            Tuple[str, str]: Переданные категория и признак
+        """
+        if requisites:
+            self.entities.add(domain, requisites, category)
+        await self.cache.set(domain, category, evidence, persist=persist, requisites=requisites)
+        if category == 'supplier':
+            context.count('suppliers_found')
+        else:
+            context.count('others_found')
+        return category, evidence
+    
+    async def _remember_entity(self, domain: str, entity: Dict, context: PipelineContext,
+                               persist: bool = False) -> Tuple[str, str]:
+        """
+        Классифицирует домен так же, как уже известную компанию, которой он принадлежит.
         
-        # Создаем задачи для асинхронного выполнения
-        tasks = []
-        for site in sites:
-            url = site.get('url', '')
-            title = site.get('title', '')
+        Args:
+            domain: Домен сайта
+            entity: Компания из индекса
+            context: Контекст запуска
+            persist: Сохранять ли результат в общий кэш
+            
+        Returns:
+            Tuple[str, str]: Категория компании и признак entity:<ИНН>
+        """
+        logger.info(f"Домен {domain} принадлежит компании с ИНН {entity['inn']}, повторная классификация не нужна")
+        context.count('entity_duplicates')
+        return await self._remember(domain, entity['category'], f"entity:{entity['inn']}", context, persist=persist,
+                                    requisites={key: entity[key] for key in ('inn', 'ogrn', 'kpp')})
+    
+    @staticmethod
+    def _serp_requisites(site: Dict) -> Dict[str, Optional[str]]:
+        """Извлекает реквизиты компании из заголовка и сниппета выдачи."""
+        return primary_requisites(extract_requisites(f"{site.get('title') or ''} {site.get('snippet') or ''}"))
+    
+    @staticmethod
+    def is_fetched(evidence: str) -> bool:
+        """Проверяет, потребовалось ли для классификации обращение к сайту."""
+        return evidence.startswith(('content:', 'crawl:', 'http:', 'fetch_error', 'timeout', 'error', 'pending'))
+    
+    async def _scan_content(self, response: aiohttp.ClientResponse) -> Tuple[Optional[str], int, Dict[str, List[str]]]:
+        """
+        Читает тело ответа блоками и ищет в нем признаки поставщика и реквизиты компании.
+        
+        Реквизиты извлекаются из тех же блоков, что и маркеры. Чтение прекращается, когда
+        найдены маркер юридического лица и ИНН, когда после маркера прочитано
+        requisites_budget байт или всего прочитано max_content_bytes байт, поэтому большие
+        страницы не скачиваются целиком.
+        
+        Args:
+            response: Ответ aiohttp, тело которого еще не прочитано
             
-            # Пропускаем пустые URL
-            if not url:
+        Returns:
+            Tuple[Optional[str], int, Dict[str, List[str]]]: Найденный маркер (или None),
+            количество прочитанных байт и найденные реквизиты
+        """
+        try:
+            decoder = codecs.getincrementaldecoder(response.charset or 'utf-8')(errors='replace')
+        except LookupError:
+            decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        
+        tail = ''
+        bytes_read = 0
+        marker = None
+        requisites = empty_requisites()
+        stop_at = self.max_content_bytes
+        
+        async for chunk in response.content.iter_chunked(self.chunk_size):
+            chunk = chunk[:stop_at - bytes_read]
+            bytes_read += len(chunk)
+            text = tail + decoder.decode(chunk)
+            limit_reached = bytes_read >= stop_at
+            
+            extract_requisites(text, requisites, final=limit_reached)
+            if not marker:
+                marker = self._find_marker(text, has_tail=bool(tail), final=limit_reached)
+                if marker:
+                    # Реквизиты обычно в подвале страницы: дочитываем еще немного в поисках ИНН
+                    stop_at = min(stop_at, bytes_read + self.requisites_budget)
+            
+            if bytes_read >= stop_at or (marker and requisites['inn']):
+                return marker, bytes_read, requisites
+            tail = text[-self._overlap:]
+        
+        text = tail + decoder.decode(b'', final=True)
+        extract_requisites(text, requisites)
+        if not marker:
+            marker = self._find_marker(text, has_tail=bool(tail), final=True)
+        return marker, bytes_read, requisites
+    
+    def _find_marker(self, text: str, has_tail: bool, final: bool) -> Optional[str]:
+        """
+        Ищет маркер поставщика в очередном блоке текста с учетом перекрытия блоков.
+        
+        Args:
+            text: Хвост предыдущего блока вместе с текущим блоком
+            has_tail: Начинается ли текст с хвоста предыдущего блока
+            final: Является ли блок последним
+            
+        Returns:
+            Optional[str]: Найденный маркер или None
+        """
+        for marker, start, end in self.marker_matcher.finditer(text):
+            # Совпадение в начале хвоста уже проверялось в предыдущем блоке
+            if has_tail and start == 0:
                 continue
+            # Граница слова в конце блока ненадежна: маркер может оказаться
+            # началом более длинного слова, поэтому ждем следующий блок
+            if end == len(text) and not final:
+                return None
+            return marker
+        return None
+    
+    async def classify_stream(self, sites: List[Dict], concurrency: Optional[int] = None,
+                              site_timeout: Optional[float] = None, deadline: Optional[float] = None,
+                              context: Optional[PipelineContext] = None) -> AsyncIterator[Tuple[Dict, str]]:
+        """
+        Классифицирует сайты с ограничением параллелизма и отдает результаты по мере готовности.
+        
+        Каждый результат возвращается вместе с исходной записью сайта, в которую также
+        записываются ключи category и evidence (и inn, если компания сайта известна).
+        Сайты, решение по которым можно принять по кэшу, правилам, ИНН известной компании
+        или данным выдачи, не скачиваются. Из нескольких сайтов пакета с одним ИНН в выдаче
+        скачивается только первый, остальные получают его категорию. Сайты, которые не успели
+        классифицироваться до истечения общего лимита времени, отдаются с меткой 'pending'.
+        
+        Args:
+            sites: Список словарей с информацией о сайтах (обязательные ключи: url, title; необязательный: snippet)
+            concurrency: Максимальное количество одновременных проверок
+            site_timeout: Таймаут классификации одного сайта в секундах
+            deadline: Общий лимит времени на весь пакет в секундах
+            context: Контекст запуска, в котором ведутся счетчики
+            
+        Yields:
+            Tuple[Dict, str]: Запись сайта и метка 'supplier', 'other' или 'pending'
+        """
+        concurrency = concurrency or self.concurrency
+        site_timeout = site_timeout or self.site_timeout
+        deadline = deadline or self.batch_deadline
+        context = context or PipelineContext()
+        
+        loop = asyncio.get_running_loop()
+        deadline_at = loop.time() + deadline
+        semaphore = asyncio.Semaphore(concurrency)
+        tasks: Dict[asyncio.Task, Dict] = {}
+        
+        # Одним запросом получаем уже известные классификации всех доменов пакета
+        cached = await self.cache.get_many(site.get('url', '') for site in sites)
+        
+        try:
+            undecided = []
+            for site in sites:
+                url = site.get('url', '')
                 
-            # Получаем домен
-            try:
-                parsed_url = urlparse(url)
-                domain = parsed_url.netloc
+                # Пропускаем пустые URL
+                if not url:
+                    logger.warning(f"Пропускаем запись без URL: {site}")
+                    continue
+                
+                # Если домен уже классифицирован, сразу отдаем кэшированный результат
+                cached_entry = cached.get(registrable_domain(url))
+                if cached_entry:
+                    context.count('already_processed')
+                    self.entities.add(url, cached_entry, cached_entry['category'])
+                    yield self._annotate(site, cached_entry['category'], f"cache:{cached_entry['evidence']}")
+                    continue
+                
+                rule = self._match_rules(self._get_domain(url), site.get('title', ''))
+                if rule:
+                    yield self._annotate(site, *(await self._remember(self._get_domain(url), *rule, context=context)))
+                    continue
                 
-                # Удаляем www. из домена, если есть
-                if domain.startswith('www.'):
-                    domain = domain[4:]
-                    
-                # Если домен уже обрабатывался, используем кэшированный результат
-                if domain in self.processed_domains:
-                    self.stats['already_processed'] += 1
-                    if self.domain_cache.get(domain) == 'supplier':
-                        suppliers.append(site)
-                    else:
-                        others.append(site)
+                undecided.append(site)
+            
+            # Сайты с ИНН в выдаче: известные компании не классифицируем повторно,
+            # а из сайтов одной новой компании классифицируем только первый
+            serp_inns = [self._serp_requisites(site)['inn'] for site in undecided]
+            known = await self.entities.lookup(serp_inns)
+            leaders: Dict[str, Dict] = {}
+            followers: Dict[int, List[Dict]] = {}
+            remaining_sites = []
+            for site, inn in zip(undecided, serp_inns):
+                if inn in known and known[inn]['category']:
+                    yield self._annotate(site, *(await self._remember_entity(self._get_domain(site['url']), known[inn], context)))
+                elif inn in leaders:
+                    followers.setdefault(id(leaders[inn]), []).append(site)
                 else:
-                    # Добавляем задачу на классификацию
-                    tasks.append(self.classify_site(url, title))
+                    if inn:
+                        leaders[inn] = site
+                        site['inn'] = inn
+                    remaining_sites.append(site)
+            
+            # Оцениваем оставшиеся сайты по данным выдачи; скачиваются только неопределенные
+            for site, score in zip(remaining_sites, self.scorer.score_batch(remaining_sites)):
+                category = self.scorer.decide(score)
+                if category:
+                    evidence = f"serp:{score:.2f}"
+                    await self._remember(self._get_domain(site['url']), category, evidence, context, persist=False,
+                                         requisites={'inn': site.get('inn')})
+                    for result in await self._resolve(site, category, evidence, followers, context):
+                        yield result
+                    continue
+                
+                task = asyncio.create_task(self._classify_limited(site, semaphore, site_timeout, context))
+                tasks[task] = site
+            
+            pending = set(tasks)
+            while pending:
+                remaining = deadline_at - loop.time()
+                if remaining <= 0:
+                    break
+                
+                done, pending = await asyncio.wait(
+                    pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    for result in await self._resolve(tasks[task], *task.result(), followers, context):
+                        yield result
+            
+            # Всё, что не успело завершиться до дедлайна, отмечаем как ожидающее
+            for task in pending:
+                task.cancel()
+                logger.warning(f"Классификация {tasks[task].get('url')} не завершилась до дедлайна пакета")
+                for result in await self._resolve(tasks[task], 'pending', 'pending', followers, context):
+                    context.count('pending')
+                    yield result
+                
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+    
+    async def _classify_limited(self, site: Dict, semaphore: asyncio.Semaphore, site_timeout: float,
+                                context: PipelineContext) -> Tuple[str, str]:
+        """
+        Скачивает и классифицирует один сайт с учетом общего ограничения параллелизма и таймаута.
+        
+        Args:
+            site: Запись сайта
+            semaphore: Семафор, ограничивающий количество одновременных проверок
+            site_timeout: Таймаут классификации сайта в секундах
+            context: Контекст запуска
+            
+        Returns:
+            Tuple[str, str]: Категория ('supplier' или 'other') и признак
+        """
+        url = site.get('url', '')
+        async with semaphore:
+            try:
+                category, evidence = await asyncio.wait_for(
+                    self._classify(url, site.get('title', ''), site.get('snippet', ''), site_timeout, context,
+                                  prechecked=True),
+                    timeout=site_timeout
+                )
+            except asyncio.TimeoutError:
+                logger.warning(f"Превышен таймаут классификации {url} ({site_timeout} сек)")
+                context.count('errors')
+                return 'other', 'timeout'
             except Exception as e:
-                logger.error(f"Ошибка при обработке URL {url}: {str(e)}")
-                others.append(site)
+                logger.error(f"Ошибка при классификации {url}: {str(e)}")
+                context.count('errors')
+                return 'other', 'error'
         
-        # Выполняем все задачи параллельно
-        if tasks:
-            results = await asyncio.gather(*tasks, return_exceptions=True)
-            
-            # Обрабатываем результаты
-            for i, result in enumerate(results):
-                if isinstance(result, Exception):
-                    logger.error(f"Ошибка при классификации: {str(result)}")
-                    others.append(sites[i])
-                elif result == 'supplier':
-                    suppliers.append(sites[i])
-                else:
-                    others.append(sites[i])
+        return ('supplier' if category == 'supplier' else 'other'), evidence
+    
+    async def _resolve(self, site: Dict, category: str, evidence: str, followers: Dict[int, List[Dict]],
+                       context: PipelineContext) -> List[Tuple[Dict, str]]:
+        """
+        Отдает результат сайта вместе с другими сайтами той же компании из пакета.
+        
+        Args:
+            site: Классифицированный сайт
+            category: Категория сайта
+            evidence: Признак, по которому принято решение
+            followers: Сайты пакета, ожидающие результата сайта своей компании
+            context: Контекст запуска
+            
+        Returns:
+            List[Tuple[Dict, str]]: Пары (запись, категория) для сайта и сайтов его компании
+        """
+        # ИНН из выдачи, по которому сайты сгруппированы (до записи ИНН, найденного на сайте)
+        inn = site.get('inn')
+        results = [self._annotate(site, category, evidence)]
+        for follower in followers.pop(id(site), []):
+            if category == 'pending' or not inn:
+                results.append(self._annotate(follower, category, evidence))
+                continue
+            
+            entity = self.entities.get(inn) or {'inn': inn, 'ogrn': None, 'kpp': None, 'category': category}
+            follower_category, follower_evidence = await self._remember_entity(
+                self._get_domain(follower['url']), dict(entity, category=category), context
+            )
+            results.append(self._annotate(follower, follower_category, follower_evidence))
+        return results
+    
+    def _annotate(self, site: Dict, category: str, evidence: str) -> Tuple[Dict, str]:
+        """Записывает результат классификации в запись сайта и возвращает пару (запись, категория)."""
+        site['category'] = category
+        site['evidence'] = evidence
+        inn = self.entities.inn_of(site.get('url', ''))
+        if inn:
+            site['inn'] = inn
+        return site, category
+    
+    async def classify_batch(self, sites: List[Dict],
+                             context: Optional[PipelineContext] = None) -> Tuple[List[Dict], List[Dict], List[Dict]]:
+        """
+        Классифицирует пакет сайтов и возвращает списки поставщиков, других и неклассифицированных сайтов.
+        
+        Args:
+            sites: Список словарей с информацией о сайтах (обязательные ключи: url, title)
+            context: Контекст запуска, в котором ведутся счетчики
+            
+        Returns:
+            Tuple[List[Dict], List[Dict], List[Dict]]: Списки поставщиков, других сайтов
+            и сайтов, не успевших классифицироваться до дедлайна пакета
+        """
+        suppliers = []
+        others = []
+        pending = []
+        context = context or PipelineContext()
+        
+        async for site, label in self.classify_stream(sites, context=context):
+            if label == 'supplier':
+                suppliers.append(site)
+            elif label == 'pending':
+                pending.append(site)
+            else:
+                others.append(site)
         
-        self.stats['total_processed'] += len(sites)
-        return suppliers, others
+        context.count('total_processed', len(sites))
+        return suppliers, others, pending
     
-    def get_stats(self) -> Dict:
-        """Возвращает статистику классификации."""
-        return self.stats
+    def _get_domain(self, url: str) -> str:
+        """Возвращает домен URL без префикса www."""
+        domain = urlparse(url).netloc
+        
+        # Удаляем www. из домена, если есть
+        if domain.startswith('www.'):
+            domain = domain[4:]
+        return domain
     
     def clear_cache(self):
-        """Очищает кэш доменов."""
-        self.domain_cache.clear()
-        self.processed_domains.clear()
-        self.stats = {
-            'total_processed': 0,
-            'suppliers_found': 0,
-            'others_found': 0,
-            'already_processed': 0,
-            'errors': 0
-        } 
\ No newline at end of file
+        """Очищает кэш доменов и индекс компаний в памяти процесса."""
+        self.cache.clear()
+        self.entities.clear() 
\ No newline at end of file
@@ -2,11 +2,14 @@ import json
 import os
 import logging
 import traceback
-from typing import Dict, List, Set, Optional
+from typing import Dict, Iterator, List, Set, Optional, Tuple
 from pathlib import Path
 from datetime import datetime
 import aiofiles
 import asyncio
+from .journal import Journal
+from .archive import HtmlArchive
+from .async_io import file_io
 
 # Настройка логирования
 logging.basicConfig(
@@ -26,6 +29,8 @@ class Storage:
         self.others_dir = self.base_dir / 'others'
         self.sites_dir = self.base_dir / 'sites'
         self.metadata_file = self.base_dir / 'metadata.json'
+        # HTML сайтов хранится сжатым в архиве с адресацией по содержимому
+        self.archive = HtmlArchive(self.base_dir / 'archive')
         
         logger.debug(f"Текущая рабочая директория: {os.getcwd()}")
         logger.debug(f"Базовая директория: {self.base_dir}")
@@ -33,15 +38,125 @@ class Storage:
         logger.debug(f"Директория других: {self.others_dir}")
         logger.debug(f"Директория сайтов: {self.sites_dir}")
         logger.debug(f"Файл метаданных: {self.metadata_file}")
+        logger.debug(f"Архив HTML: {self.archive.root} ({self.archive.codec})")
         
         # Создаем все необходимые директории и проверяем права доступа
         asyncio.create_task(self._ensure_directory_access())
         
-        # Загружаем или создаем метаданные
-        self.metadata = self._load_metadata()
-        self.processed_domains = self._load_processed_domains()
+        # Состояние хранится в журнале изменений со снимками: сохранение сайта дописывает
+        # одну запись, а не переписывает processed_domains.json и metadata.json целиком
+        # Журнал могут вести несколько процессов: записи других процессов применяются через _apply
+        self.journal = Journal(self.base_dir, 'storage', apply=self._apply, reset=self._reset)
+        self.processed_domains: Dict[str, Dict] = {}
+        # Инвертированные индексы (множества), обновляются при каждом применении записи,
+        # поэтому выборка по ключевому слову, категории или домену стоит O(размер результата)
+        self.keyword_index: Dict[str, Set[str]] = {}     # keyword -> домены
+        self.category_index: Dict[str, Set[str]] = {}    # category -> домены
+        self.domain_keywords: Dict[str, Set[str]] = {}   # domain -> ключевые слова
+        self.domain_categories: Dict[str, str] = {}      # domain -> category
+        # Отсортированные копии множеств для постраничной выдачи по (индекс, ключ),
+        # (индекс, None) - список ключей индекса; сбрасываются при изменении
+        self._sorted_cache: Dict[Tuple[str, Optional[str]], List[str]] = {}
+        self._needs_snapshot = False
+        self._restore()
         
         logger.info("Инициализация Storage завершена успешно")
+    
+    def _restore(self) -> None:
+        """Восстанавливает состояние из журнала или, при первом запуске, из прежних JSON-файлов."""
+        if self.journal.exists():
+            for record in self.journal.load():
+                self._apply(record)
+            logger.info(f"Состояние восстановлено из журнала: {len(self.processed_domains)} доменов, "
+                        f"{len(self.keyword_index)} ключевых слов")
+            return
+        
+        # Прежний формат: переносим данные в индексы, а в снимок - при первой записи
+        metadata = self._load_metadata()
+        for domain, domain_meta in metadata.get("domains", {}).items():
+            for keyword in domain_meta.get("keywords", []):
+                self._apply({"op": "keyword", "domain": domain, "category": domain_meta.get("category"), "keyword": keyword})
+        for domain, info in self._load_processed_domains().items():
+            self._apply({"op": "site", "domain": domain, "info": info})
+        self._needs_snapshot = bool(self.processed_domains or self.domain_keywords)
+    
+    def _apply(self, record: Dict) -> None:
+        """
+        Применяет запись журнала к состоянию и индексам в памяти (повторное применение ничего не меняет).
+        
+        Записи:
+            {"op": "site", "domain", "info"} - сохраненный сайт (info - запись processed_domains)
+            {"op": "keyword", "domain", "category", "keyword"} - связь домена с ключевым словом
+        """
+        domain = record["domain"]
+        if record["op"] == "site":
+            self.processed_domains[domain] = record["info"]
+            category, keyword = record["info"]["category"], record["info"]["keyword"]
+        else:
+            category, keyword = record["category"], record["keyword"]
+        
+        if domain not in self.domain_categories:
+            self.domain_categories[domain] = category
+            self._index_add(self.category_index, 'category', category, domain)
+        self._index_add(self.domain_keywords, 'domain', domain, keyword)
+        self._index_add(self.keyword_index, 'keyword', keyword, domain)
+    
+    def _reset(self) -> None:
+        """Очищает состояние перед повторным чтением журнала (другой процесс записал снимок)."""
+        self.processed_domains.clear()
+        self.keyword_index.clear()
+        self.category_index.clear()
+        self.domain_keywords.clear()
+        self.domain_categories.clear()
+        self._sorted_cache.clear()
+    
+    async def refresh(self) -> None:
+        """Применяет изменения, сохраненные другими процессами приложения."""
+        await self.journal.refresh()
+    
+    def _index_add(self, index: Dict[str, Set[str]], name: str, key: str, value: str) -> None:
+        """Добавляет значение в индекс и сбрасывает отсортированную копию ключа."""
+        values = index.get(key)
+        if values is None:
+            values = index[key] = set()
+            # Список ключей индекса тоже изменился
+            self._sorted_cache.pop((name, None), None)
+        if value not in values:
+            values.add(value)
+            self._sorted_cache.pop((name, key), None)
+    
+    def _index_discard(self, index: Dict[str, Set[str]], name: str, key: str, value: str) -> None:
+        """Удаляет значение из индекса (и ключ, если значений не осталось)."""
+        values = index.get(key)
+        if values is not None and value in values:
+            values.discard(value)
+            if not values:
+                del index[key]
+                self._sorted_cache.pop((name, None), None)
+            self._sorted_cache.pop((name, key), None)
+    
+    def _revert(self, domain: str, keyword: str) -> None:
+        """Отменяет в памяти сохранение сайта, запись о котором не удалось зафиксировать."""
+        self.processed_domains.pop(domain, None)
+        self._index_discard(self.keyword_index, 'keyword', keyword, domain)
+        self._index_discard(self.domain_keywords, 'domain', domain, keyword)
+        if domain not in self.domain_keywords:
+            category = self.domain_categories.pop(domain, None)
+            if category is not None:
+                self._index_discard(self.category_index, 'category', category, domain)
+    
+    def _snapshot_records(self) -> List[Dict]:
+        """Возвращает записи, из которых состояние восстанавливается полностью."""
+        records = [{"op": "site", "domain": domain, "info": info} for domain, info in self.processed_domains.items()]
+        for domain, keywords in self.domain_keywords.items():
+            category = self.domain_categories.get(domain)
+            for keyword in sorted(keywords):
+                records.append({"op": "keyword", "domain": domain, "category": category, "keyword": keyword})
+        return records
+    
+    async def close(self) -> None:
+        """Фиксирует все незаписанные изменения журнала."""
+        await self.journal.close()
         
     def _ensure_directories(self) -> None:
         """Ensure all necessary directories exist"""
@@ -82,25 +197,6 @@ class Storage:
                 logger.error(traceback.format_exc())
         return {}
     
-    async def _save_processed_domains(self) -> None:
-        """Save record of processed domains"""
-        logger.debug("=== Сохранение обработанных доменов ===")
-        
-        try:
-            record_file = self.base_dir / 'processed_domains.json'
-            logger.debug(f"Сохранение в файл: {record_file}")
-            logger.debug(f"Количество доменов: {len(self.processed_domains)}")
-            
-            async with aiofiles.open(record_file, 'w', encoding='utf-8') as f:
-                await f.write(json.dumps(self.processed_domains, ensure_ascii=False, indent=2))
-            
-            logger.info(f"Сохранено {len(self.processed_domains)} обработанных доменов")
-            logger.debug(f"Размер файла: {os.path.getsize(record_file)} байт")
-            
-        except Exception as e:
-            logger.error(f"Ошибка сохранения processed_domains.json: {e}")
-            logger.error(traceback.format_exc())
-    
     def _load_metadata(self) -> Dict:
         """Загружает метаданные из файла или создает новые."""
         logger.debug("=== Загрузка метаданных ===")
@@ -154,112 +250,74 @@ class Storage:
             return
 
         try:
-            # Проверка на повторную обработку домена
+            # Проверка на повторную обработку домена (в том числе другими процессами)
+            await self.refresh()
             if domain in self.processed_domains:
                 logger.info(f"Домен {domain} уже был обработан ранее")
                 logger.debug(f"Предыдущая обработка: {self.processed_domains[domain]}")
                 return
 
-            # Создание имени файла с меткой времени
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"{domain.replace('.', '_')}_{timestamp}.html"
-            
-            # Определение целевой директории
-            target_dir = self.suppliers_dir if category == 'suppliers' else self.others_dir
-            file_path = target_dir / filename
 
-            logger.debug(f"Подготовка к сохранению:")
-            logger.debug(f"- Метка времени: {timestamp}")
-            logger.debug(f"- Имя файла: {filename}")
-            logger.debug(f"- Целевая директория: {target_dir}")
-            logger.debug(f"- Полный путь к файлу: {file_path}")
-            
-            # Проверка прав доступа к директории
-            if not await self._check_directory_permissions(target_dir):
-                logger.error(f"Недостаточно прав для сохранения в директорию {target_dir}")
+            # Проверка прав доступа к директории архива
+            if not await self._check_directory_permissions(self.archive.root):
+                logger.error(f"Недостаточно прав для сохранения в директорию {self.archive.root}")
                 return
 
-            # Сохранение HTML контента
+            # Сохранение HTML в сжатый архив: одинаковые страницы хранятся один раз
             try:
-                logger.debug(f"Начало записи HTML в файл {file_path}...")
-                
-                # Проверяем существование директории
-                if not target_dir.exists():
-                    logger.warning(f"Директория {target_dir} не существует, создаём...")
-                    target_dir.mkdir(parents=True, exist_ok=True)
-                
-                # Проверяем права на запись
-                if not os.access(target_dir, os.W_OK):
-                    logger.error(f"Нет прав на запись в директорию {target_dir}")
-                    return
-                
-                async with aiofiles.open(file_path, 'w', encoding='utf-8') as f:
-                    await f.write(html)
-                
-                # Проверка сохранённого файла
-                if not os.path.exists(file_path):
-                    raise FileNotFoundError(f"Файл {file_path} не был создан")
-                
-                file_size = os.path.getsize(file_path)
-                logger.info(f"HTML успешно сохранён, размер файла: {file_size} байт")
+                logger.debug(f"Сохранение HTML домена {domain} в архив {self.archive.root}...")
+                entry = await self.archive.put_async(html)
+                logger.info(f"HTML сохранён в архив: {entry['size']} байт, в архиве {entry['stored_size']} байт "
+                            f"({entry['codec']}{', новый объект' if entry['created'] else ', уже был в архиве'})")
                 
             except Exception as e:
-                logger.error(f"Ошибка при сохранении HTML в файл {file_path}: {e}")
+                logger.error(f"Ошибка при сохранении HTML домена {domain} в архив: {e}")
                 logger.error(traceback.format_exc())
                 raise
 
-            # Обновление processed_domains
-            try:
-                logger.debug("Обновление записи обработанных доменов...")
-                self.processed_domains[domain] = {
+            # Обновление состояния: одна запись в журнале вместо перезаписи всех метаданных
+            record = {
+                "op": "site",
+                "domain": domain,
+                "info": {
                     'category': category,
                     'keyword': keyword,
                     'timestamp': timestamp,
-                    'filename': filename,
-                    'file_size': file_size,
-                    'file_path': str(file_path)
+                    'filename': os.path.basename(entry['path']),
+                    'file_size': entry['size'],
+                    'file_path': entry['path'],
+                    'digest': entry['digest'],
+                    'codec': entry['codec'],
+                    'stored_size': entry['stored_size']
                 }
-                await self._save_processed_domains()
-                logger.debug("Запись обработанных доменов обновлена")
-                
-            except Exception as e:
-                logger.error(f"Ошибка при обновлении записи обработанных доменов: {e}")
-                logger.error(traceback.format_exc())
-                # Удаляем файл, если не удалось обновить метаданные
-                if os.path.exists(file_path):
-                    os.remove(file_path)
-                    logger.debug(f"Файл {file_path} удален из-за ошибки")
-                raise
-
-            # Обновление метаданных
+            }
             try:
-                logger.debug("Обновление метаданных...")
-                if domain not in self.metadata["domains"]:
-                    self.metadata["domains"][domain] = {"category": category, "keywords": []}
-                if keyword not in self.metadata["domains"][domain]["keywords"]:
-                    self.metadata["domains"][domain]["keywords"].append(keyword)
-                
-                if keyword not in self.metadata["keywords"]:
-                    self.metadata["keywords"][keyword] = []
-                if domain not in self.metadata["keywords"][keyword]:
-                    self.metadata["keywords"][keyword].append(domain)
-                
-                # Сохранение метаданных
-                async with aiofiles.open(self.metadata_file, 'w', encoding='utf-8') as f:
-                    await f.write(json.dumps(self.metadata, ensure_ascii=False, indent=2))
-                logger.debug("Метаданные успешно обновлены")
+                logger.debug("Запись в журнал хранилища...")
+                if self._needs_snapshot:
+                    # Первая запись после перехода с processed_domains.json и metadata.json
+                    await self.journal.compact(self._snapshot_records)
+                    self._needs_snapshot = False
+                # Состояние обновляется до записи, чтобы снимок, записываемый параллельно,
+                # не потерял уже зафиксированную в журнале запись
+                self._apply(record)
+                await self.journal.append(record)
+                logger.debug("Запись в журнал хранилища зафиксирована")
                 
             except Exception as e:
-                logger.error(f"Ошибка при обновлении метаданных: {e}")
+                logger.error(f"Ошибка при записи в журнал хранилища: {e}")
                 logger.error(traceback.format_exc())
-                # Удаляем файл и запись из processed_domains при ошибке
-                if os.path.exists(file_path):
-                    os.remove(file_path)
-                    logger.debug(f"Файл {file_path} удален из-за ошибки")
-                if domain in self.processed_domains:
-                    del self.processed_domains[domain]
-                    logger.debug(f"Домен {domain} удален из processed_domains из-за ошибки")
+                # Объект архива не удаляем: он может принадлежать и другим доменам
+                self._revert(domain, keyword)
                 raise
+            
+            if self.journal.needs_compaction:
+                try:
+                    await self.journal.compact(self._snapshot_records, force=False)
+                except Exception as e:
+                    # Журнал остается полным, снимок будет записан при следующем сохранении
+                    logger.error(f"Ошибка при записи снимка хранилища: {e}")
+                    logger.error(traceback.format_exc())
 
             logger.info(f"=== Сайт {domain} успешно сохранён в категорию {category} ===")
 
@@ -268,10 +326,96 @@ class Storage:
             logger.error(traceback.format_exc())
             raise
     
-    def get_sites_by_keyword(self, keyword: str) -> List[str]:
-        """Возвращает список доменов для заданного ключевого слова."""
-        return [domain for domain, info in self.processed_domains.items() 
-                if info['keyword'] == keyword]
+    async def update_site_info(self, domain: str, info: Dict) -> None:
+        """
+        Заменяет запись о сохраненном сайте (например, после переноса HTML в архив).
+        
+        Args:
+            domain: Домен сайта, уже сохраненного в хранилище
+            info: Новая запись processed_domains (category и keyword не меняются)
+        """
+        await self.refresh()
+        previous = self.processed_domains.get(domain)
+        if previous is None:
+            raise KeyError(f"Сайт {domain} не найден в хранилище")
+        record = {"op": "site", "domain": domain,
+                  "info": dict(info, category=previous['category'], keyword=previous['keyword'])}
+        if self._needs_snapshot:
+            # Первая запись после перехода с processed_domains.json и metadata.json
+            await self.journal.compact(self._snapshot_records)
+            self._needs_snapshot = False
+        self._apply(record)
+        try:
+            await self.journal.append(record)
+        except Exception:
+            self.processed_domains[domain] = previous
+            raise
+        if self.journal.needs_compaction:
+            await self.journal.compact(self._snapshot_records, force=False)
+    
+    def legacy_html_files(self) -> Dict[str, str]:
+        """Возвращает файлы HTML, сохраненные до перехода на архив: абсолютный путь -> домен."""
+        return {
+            os.path.abspath(os.path.join(self.base_dir, info['category'], info['filename'])): domain
+            for domain, info in self.processed_domains.items() if not info.get('digest')
+        }
+    
+    async def archive_legacy_html(self, domain: str) -> Dict:
+        """
+        Переносит HTML сайта, сохраненный до перехода на архив, в архив и обновляет запись сайта.
+        
+        Исходный файл не удаляется: это делает вызывающий код после успешного переноса.
+        
+        Args:
+            domain: Домен сайта
+            
+        Returns:
+            Dict: Запись объекта архива (см. HtmlArchive.put)
+        """
+        info = self.processed_domains.get(domain)
+        if info is None:
+            raise KeyError(f"Сайт {domain} не найден в хранилище")
+        file_path = os.path.join(self.base_dir, info['category'], info['filename'])
+        entry = await self.archive.put_async(await file_io.run(Path(file_path).read_bytes))
+        await self.update_site_info(domain, dict(
+            info,
+            filename=os.path.basename(entry['path']),
+            file_path=entry['path'],
+            file_size=entry['size'],
+            digest=entry['digest'],
+            codec=entry['codec'],
+            stored_size=entry['stored_size']
+        ))
+        return entry
+    
+    def _page(self, index: Dict[str, Set[str]], name: str, key: str, offset: int = 0,
+              limit: Optional[int] = None) -> List[str]:
+        """
+        Возвращает страницу отсортированных значений индекса по ключу.
+        
+        Отсортированная копия множества строится при первом запросе после изменения ключа,
+        поэтому листание страниц не сортирует множество заново.
+        """
+        values = index.get(key)
+        if not values:
+            return []
+        ordered = self._sorted_cache.get((name, key))
+        if ordered is None:
+            ordered = self._sorted_cache[(name, key)] = sorted(values)
+        end = None if limit is None else offset + limit
+        return ordered[offset:end]
+    
+    def get_sites_by_keyword(self, keyword: str, offset: int = 0, limit: Optional[int] = None) -> List[str]:
+        """Возвращает домены для заданного ключевого слова (по алфавиту, постранично)."""
+        return self._page(self.keyword_index, 'keyword', keyword, offset, limit)
+    
+    def count_sites_by_keyword(self, keyword: str) -> int:
+        """Возвращает количество доменов для заданного ключевого слова."""
+        return len(self.keyword_index.get(keyword, ()))
+    
+    def get_site_keywords(self, domain: str) -> List[str]:
+        """Возвращает ключевые слова, по которым был найден домен."""
+        return self._page(self.domain_keywords, 'domain', domain)
     
     def get_site_info(self, domain: str) -> Optional[Dict]:
         """Возвращает информацию о сайте по домену."""
@@ -283,8 +427,15 @@ class Storage:
             return None
             
         info = self.processed_domains[domain]
-        file_path = os.path.join(self.base_dir, info['category'], info['filename'])
+        if info.get('digest'):
+            try:
+                return await self.archive.get_text_async(info['digest'])
+            except Exception as e:
+                logger.error(f"Error reading HTML for {domain} from archive: {e}")
+                return None
         
+        # Сайты, сохраненные до перехода на архив (или еще не перенесенные scripts/migrate_html_archive.py)
+        file_path = os.path.join(self.base_dir, info['category'], info['filename'])
         if os.path.exists(file_path):
             try:
                 async with aiofiles.open(file_path, 'r', encoding='utf-8') as f:
@@ -293,14 +444,50 @@ class Storage:
                 logger.error(f"Error reading HTML for {domain}: {e}")
         return None
     
-    def get_all_keywords(self) -> List[str]:
-        """Возвращает список всех ключевых слов."""
-        return list(set(info['keyword'] for info in self.processed_domains.values()))
+    def iter_site_html(self, domain: str, chunk_size: int = 64 * 1024) -> Optional[Iterator[bytes]]:
+        """
+        Возвращает итератор по HTML сайта частями (распаковка из архива потоком) или None.
+        
+        Итератор блокирующий: в асинхронном коде его читают в пуле потоков
+        (например, через StreamingResponse).
+        """
+        info = self.processed_domains.get(domain)
+        if info is None:
+            return None
+        if info.get('digest'):
+            return self.archive.stream(info['digest'], chunk_size)
+        file_path = os.path.join(self.base_dir, info['category'], info['filename'])
+        if not os.path.exists(file_path):
+            return None
+        
+        def read_file() -> Iterator[bytes]:
+            with open(file_path, 'rb') as f:
+                while True:
+                    chunk = f.read(chunk_size)
+                    if not chunk:
+                        break
+                    yield chunk
+        return read_file()
+    
+    def get_all_keywords(self, offset: int = 0, limit: Optional[int] = None) -> List[str]:
+        """Возвращает ключевые слова (по алфавиту, постранично)."""
+        ordered = self._sorted_cache.get(('keyword', None))
+        if ordered is None:
+            ordered = self._sorted_cache[('keyword', None)] = sorted(self.keyword_index)
+        end = None if limit is None else offset + limit
+        return ordered[offset:end]
+    
+    def count_keywords(self) -> int:
+        """Возвращает количество ключевых слов."""
+        return len(self.keyword_index)
+    
+    def get_sites_by_category(self, category: str, offset: int = 0, limit: Optional[int] = None) -> List[str]:
+        """Возвращает домены в заданной категории (по алфавиту, постранично)."""
+        return self._page(self.category_index, 'category', category, offset, limit)
     
-    def get_sites_by_category(self, category: str) -> List[str]:
-        """Возвращает список доменов в заданной категории."""
-        return [domain for domain, info in self.processed_domains.items()
-                if info['category'] == category]
+    def count_sites_by_category(self, category: str) -> int:
+        """Возвращает количество доменов в заданной категории."""
+        return len(self.category_index.get(category, ()))
 
     async def _check_directory_permissions(self, directory: Path) -> bool:
         """
@@ -362,7 +549,8 @@ class Storage:
             self.base_dir,
             self.suppliers_dir,
             self.others_dir,
-            self.sites_dir
+            self.sites_dir,
+            self.archive.root
         ]
         
         logger.info("=== Проверка прав доступа к директориям ===")
@@ -374,3 +562,20 @@ class Storage:
                 
         logger.info("Все директории доступны для чтения и записи")
         return True
+
+
+# Общее хранилище процесса: создается при первом обращении из работающего цикла событий
+# (конструктор запускает проверку директорий как задачу и восстанавливает состояние из журнала)
+_storage: Optional[Storage] = None
+
+def get_storage() -> Storage:
+    """Возвращает общее хранилище процесса, создавая его при первом вызове."""
+    global _storage
+    if _storage is None:
+        _storage = Storage()
+    return _storage
+
+async def close_storage() -> None:
+    """Фиксирует журнал общего хранилища, если оно было создано."""
+    if _storage is not None:
+        await _storage.close()
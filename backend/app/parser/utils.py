@@ -1,10 +1,12 @@
 import re
+from functools import lru_cache
 from urllib.parse import urlparse
 from typing import Optional, List, Set
 import logging
 import random
 import asyncio
 from datetime import datetime
+from .contacts import extract_contacts
 
 # Setup logging
 logging.basicConfig(
@@ -29,35 +31,55 @@ def extract_domain(url: str) -> str:
         logger.error(f"Error extracting domain from {url}: {e}")
         return ""
 
+# Second-level public suffixes (and site builders) under which companies get their own domains
+MULTI_LEVEL_SUFFIXES = {
+    'com.ru', 'net.ru', 'org.ru', 'pp.ru', 'msk.ru', 'spb.ru', 'msk.su', 'spb.su',
+    'com.ua', 'org.ua', 'kiev.ua', 'com.by', 'com.kz', 'org.kz', 'co.uk', 'org.uk',
+    'com.tr', 'com.cn', 'narod.ru', 'ucoz.ru', 'ucoz.net', 'tilda.ws', 'nethouse.ru',
+    'pulscen.ru', 'satom.ru', 'wixsite.com', 'blogspot.com'
+}
+
+@lru_cache(maxsize=65536)
+def registrable_domain(host: str) -> str:
+    """Reduce a host name (or URL) to its registrable domain, e.g. shop.msk.example.ru -> example.ru.
+
+    Results are cached: search results and crawls keep hitting the same hosts.
+    """
+    if '://' in host:
+        host = urlparse(host).netloc
+    host = host.split('@')[-1].split(':')[0].strip('.').lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    
+    labels = host.split('.')
+    if len(labels) <= 2 or host.replace('.', '').isdigit():
+        return host
+    if '.'.join(labels[-2:]) in MULTI_LEVEL_SUFFIXES:
+        return '.'.join(labels[-3:])
+    return '.'.join(labels[-2:])
+
 def clean_url(url: str) -> str:
     """Clean and normalize URL."""
     if not url.startswith(('http://', 'https://')):
         url = 'https://' + url
     return url.rstrip('/')
 
-def extract_emails(text: str, patterns: List[str]) -> Set[str]:
-    """Extract email addresses from text using multiple patterns."""
-    emails = set()
-    for pattern in patterns:
-        found = re.findall(pattern, text, re.IGNORECASE)
-        for email in found:
-            if email.startswith('mailto:'):
-                email = email[7:]
-            emails.add(email.lower())
-    return emails
+def extract_emails(text: str, patterns: Optional[List[str]] = None) -> Set[str]:
+    """Extract normalized email addresses from text.
+
+    Delegates to the shared single-pass ContactExtractor, which also decodes mailto:
+    links and "[at]"/"[dot]" obfuscation. `patterns` is accepted for backwards
+    compatibility and is no longer used.
+    """
+    return set(extract_contacts(text)["emails"])
+
+def extract_phones(text: str, patterns: Optional[List[str]] = None) -> Set[str]:
+    """Extract phone numbers from text in E.164 format (+79991234567).
 
-def extract_phones(text: str, patterns: List[str]) -> Set[str]:
-    """Extract phone numbers from text using multiple patterns."""
-    phones = set()
-    for pattern in patterns:
-        found = re.findall(pattern, text)
-        for phone in found:
-            # Normalize phone number format
-            clean_phone = re.sub(r'[\s\-\(\)]', '', phone)
-            if clean_phone.startswith('8'):
-                clean_phone = '+7' + clean_phone[1:]
-            phones.add(clean_phone)
-    return phones
+    Delegates to the shared single-pass ContactExtractor, including tel: links.
+    `patterns` is accepted for backwards compatibility and is no longer used.
+    """
+    return set(extract_contacts(text)["phones"])
 
 def clean_text(text: str) -> str:
     """Clean and normalize text."""
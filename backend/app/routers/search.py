@@ -1,7 +1,7 @@
 from fastapi import APIRouter, Query, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlmodel import select
-from app.db import async_session
+from app.db.session import get_session
 from app.models.company import Company
 from app.services.parser import search_suppliers
 from app.schemas.query import SearchRequest, SearchResponse
@@ -11,11 +11,6 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-# Получаем сессию БД
-async def get_session() -> AsyncSession:
-    async with async_session() as session:
-        yield session
-
 # Поиск компаний по названию
 @router.get("/")
 async def search(query: str, session: AsyncSession = Depends(get_session)):
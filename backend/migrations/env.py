@@ -8,18 +8,20 @@ from sqlalchemy.ext.asyncio import AsyncEngine
 
 from alembic import context
 
-from app.models.search_result import SearchResult
-from app.models.base import Base
+from sqlmodel import SQLModel
+
+import app.models  # регистрирует модели в SQLModel.metadata
+from app.db.session import DATABASE_URL
 
 config = context.config
 
 if config.config_file_name is not None:
     fileConfig(config.config_file_name)
 
-target_metadata = Base.metadata
+target_metadata = SQLModel.metadata
 
 def run_migrations_offline() -> None:
-    url = config.get_main_option("sqlalchemy.url")
+    url = DATABASE_URL
     context.configure(
         url=url,
         target_metadata=target_metadata,
@@ -38,7 +40,7 @@ def do_run_migrations(connection: Connection) -> None:
 
 async def run_migrations_online() -> None:
     configuration = config.get_section(config.config_ini_section)
-    configuration["sqlalchemy.url"] = "postgresql+asyncpg://b2b_user:b2b_pass@db:5432/b2b_db"
+    configuration["sqlalchemy.url"] = DATABASE_URL
     connectable = AsyncEngine(
         engine_from_config(
             configuration,
@@ -0,0 +1,35 @@
+"""Domain classification store
+
+Revision ID: 002
+Revises: 001
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '002'
+down_revision = '001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Create domains table
+    op.create_table('domains',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('domain', sa.String(length=255), nullable=False),
+        sa.Column('category', sa.String(length=32), nullable=False),
+        sa.Column('evidence', sa.String(length=255), nullable=True),
+        sa.Column('rules_version', sa.Integer(), nullable=False),
+        sa.Column('classified_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_domains_domain', 'domains', ['domain'], unique=True)
+
+
+def downgrade() -> None:
+    # Drop tables
+    op.drop_index('ix_domains_domain', table_name='domains')
+    op.drop_table('domains')
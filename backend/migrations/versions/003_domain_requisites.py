@@ -0,0 +1,31 @@
+"""Company requisites for domains
+
+Revision ID: 003
+Revises: 002
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '003'
+down_revision = '002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Add requisites of the legal entity behind the domain
+    op.add_column('domains', sa.Column('inn', sa.String(length=12), nullable=True))
+    op.add_column('domains', sa.Column('ogrn', sa.String(length=15), nullable=True))
+    op.add_column('domains', sa.Column('kpp', sa.String(length=9), nullable=True))
+    op.create_index('ix_domains_inn', 'domains', ['inn'], unique=False)
+
+
+def downgrade() -> None:
+    # Drop requisites
+    op.drop_index('ix_domains_inn', table_name='domains')
+    op.drop_column('domains', 'kpp')
+    op.drop_column('domains', 'ogrn')
+    op.drop_column('domains', 'inn')
@@ -0,0 +1,35 @@
+"""Unique (query_norm, url) key for search results
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-19 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '004'
+down_revision = '003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Add normalized query (lower case, single spaces) and backfill it
+    op.add_column('search_results', sa.Column('query_norm', sa.String(length=255), nullable=True))
+    # Collapse all whitespace runs first, then trim, to match normalize_query (" ".join(q.lower().split()))
+    op.execute("UPDATE search_results SET query_norm = lower(btrim(regexp_replace(query, '\\s+', ' ', 'g')))")
+    # Drop duplicates left by repeated searches, keeping the newest row
+    op.execute(
+        "DELETE FROM search_results a USING search_results b "
+        "WHERE a.query_norm = b.query_norm AND a.url = b.url AND a.id < b.id"
+    )
+    op.alter_column('search_results', 'query_norm', nullable=False, server_default='')
+    op.create_unique_constraint('uq_search_results_query_norm_url', 'search_results', ['query_norm', 'url'])
+
+
+def downgrade() -> None:
+    # Drop the upsert key (removed duplicates are not restored)
+    op.drop_constraint('uq_search_results_query_norm_url', 'search_results', type_='unique')
+    op.drop_column('search_results', 'query_norm')
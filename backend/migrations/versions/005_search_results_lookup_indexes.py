@@ -0,0 +1,32 @@
+"""Cache lookup and domain indexes for search results
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '005'
+down_revision = '004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY does not lock writes but cannot run inside a transaction.
+    # If a build fails it leaves an INVALID index: drop it and run the migration again.
+    with op.get_context().autocommit_block():
+        op.create_index('ix_search_results_query_norm_updated_at', 'search_results', ['query_norm', 'updated_at'],
+                        unique=False, postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_search_results_domain', 'search_results', ['domain'],
+                        unique=False, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_search_results_domain', table_name='search_results',
+                      postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_search_results_query_norm_updated_at', table_name='search_results',
+                      postgresql_concurrently=True, if_exists=True)
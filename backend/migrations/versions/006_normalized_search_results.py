@@ -0,0 +1,235 @@
+"""Split search results into queries, search runs, domains and query results
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from urllib.parse import urlparse
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '006'
+down_revision = '005'
+branch_labels = None
+depends_on = None
+
+# Frozen copy of app.parser.utils.MULTI_LEVEL_SUFFIXES as of this revision, so the data move
+# does not change when the application's list does
+MULTI_LEVEL_SUFFIXES = {
+    'com.ru', 'net.ru', 'org.ru', 'pp.ru', 'msk.ru', 'spb.ru', 'msk.su', 'spb.su',
+    'com.ua', 'org.ua', 'kiev.ua', 'com.by', 'com.kz', 'org.kz', 'co.uk', 'org.uk',
+    'com.tr', 'com.cn', 'narod.ru', 'ucoz.ru', 'ucoz.net', 'tilda.ws', 'nethouse.ru',
+    'pulscen.ru', 'satom.ru', 'wixsite.com', 'blogspot.com'
+}
+
+
+def registrable_domain(host: str) -> str:
+    # Frozen copy of app.parser.utils.registrable_domain
+    if '://' in host:
+        host = urlparse(host).netloc
+    host = host.split('@')[-1].split(':')[0].strip('.').lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    labels = host.split('.')
+    if len(labels) <= 2 or host.replace('.', '').isdigit():
+        return host
+    if '.'.join(labels[-2:]) in MULTI_LEVEL_SUFFIXES:
+        return '.'.join(labels[-3:])
+    return '.'.join(labels[-2:])
+
+
+def create_table(name, *columns):
+    # The application creates missing tables at startup (init_db), so they may already exist
+    if not sa.inspect(op.get_bind()).has_table(name):
+        op.create_table(name, *columns)
+
+
+def create_index(name, table, columns, **kwargs):
+    if name not in {index['name'] for index in sa.inspect(op.get_bind()).get_indexes(table)}:
+        op.create_index(name, table, columns, **kwargs)
+
+
+def add_column(table, column):
+    if column.name not in {existing['name'] for existing in sa.inspect(op.get_bind()).get_columns(table)}:
+        op.add_column(table, column)
+
+
+def upgrade() -> None:
+    # One row per normalized query
+    create_table('queries',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('query', sa.String(length=255), nullable=False),
+        sa.Column('query_norm', sa.String(length=255), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    create_index('ix_queries_query_norm', 'queries', ['query_norm'], unique=True)
+
+    # One row per search run
+    create_table('search_runs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('query_id', sa.Integer(), nullable=False),
+        sa.Column('search_mode', sa.String(length=16), nullable=True),
+        sa.Column('results', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['query_id'], ['queries.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    create_index('ix_search_runs_query_id_created_at', 'search_runs', ['query_id', 'created_at'])
+
+    # Domains also hold company contacts; rows of not yet classified domains have no category
+    add_column('domains', sa.Column('company_name', sa.String(length=255), nullable=True))
+    add_column('domains', sa.Column('email', sa.String(length=255), nullable=True))
+    add_column('domains', sa.Column('phone', sa.String(length=64), nullable=True))
+    add_column('domains', sa.Column('region', sa.String(length=128), nullable=True))
+    op.alter_column('domains', 'category', existing_type=sa.String(length=32), nullable=True)
+    op.alter_column('domains', 'classified_at', existing_type=sa.DateTime(), nullable=True)
+    op.alter_column('domains', 'rules_version', existing_type=sa.Integer(), server_default='0')
+
+    create_table('query_results',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('query_id', sa.Integer(), nullable=False),
+        sa.Column('domain_id', sa.Integer(), nullable=False),
+        sa.Column('run_id', sa.Integer(), nullable=False),
+        sa.Column('rank', sa.Integer(), nullable=False),
+        sa.Column('url', sa.String(length=2048), nullable=False),
+        sa.Column('title', sa.String(length=512), nullable=True),
+        sa.Column('snippet', sa.String(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['query_id'], ['queries.id']),
+        sa.ForeignKeyConstraint(['domain_id'], ['domains.id']),
+        sa.ForeignKeyConstraint(['run_id'], ['search_runs.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('query_id', 'domain_id', name='uq_query_results_query_id_domain_id')
+    )
+
+    # Recompute query_norm with the application's rule (" ".join(q.lower().split())); databases migrated
+    # with an earlier 004 trimmed only spaces, so queries with edge tabs or newlines would miss the cache
+    connection = op.get_bind()
+    renormalized = [
+        {"id": row.id, "query_norm": " ".join(row.query.lower().split())[:255]}
+        for row in connection.execute(sa.text("SELECT id, query, query_norm FROM search_results"))
+        if row.query_norm != " ".join(row.query.lower().split())[:255]
+    ]
+    if renormalized:
+        # Rows may now collide on (query_norm, url); the newest one is kept when rows are moved below
+        op.drop_constraint('uq_search_results_query_norm_url', 'search_results', type_='unique')
+        connection.execute(sa.text("UPDATE search_results SET query_norm = :query_norm WHERE id = :id"), renormalized)
+
+    # Move queries: the earliest spelling of each normalized query
+    op.execute(
+        "INSERT INTO queries (query, query_norm, created_at) "
+        "SELECT DISTINCT ON (query_norm) query, query_norm, created_at FROM search_results "
+        "ORDER BY query_norm, created_at "
+        "ON CONFLICT (query_norm) DO NOTHING"
+    )
+
+    # Map result hosts to registrable domains (rule frozen above) through a temporary table
+    op.execute("CREATE TEMP TABLE search_results_domains (host varchar PRIMARY KEY, domain varchar NOT NULL)")
+    hosts = [row[0] for row in connection.execute(sa.text("SELECT DISTINCT domain FROM search_results"))]
+    mapping = [{"host": host, "domain": registrable_domain(host)} for host in hosts if host]
+    if mapping:
+        connection.execute(
+            sa.text("INSERT INTO search_results_domains (host, domain) VALUES (:host, :domain)"), mapping
+        )
+    op.execute(
+        "INSERT INTO domains (domain, rules_version) "
+        "SELECT DISTINCT domain, 0 FROM search_results_domains WHERE domain <> '' "
+        "ON CONFLICT (domain) DO NOTHING"
+    )
+
+    # Rows of one search were written within moments of each other (per-row timestamps before the
+    # bulk writer), so rows of a query within one minute form a run; ids follow time, as in the writer
+    op.execute(
+        "INSERT INTO search_runs (query_id, results, created_at) "
+        "SELECT q.id, count(*), date_trunc('minute', r.updated_at) AS started FROM search_results r "
+        "JOIN queries q ON q.query_norm = r.query_norm "
+        "GROUP BY q.id, started ORDER BY started, q.id"
+    )
+
+    # Keep the newest row per (query, domain); rank follows the original insertion order within the run
+    op.execute(
+        "INSERT INTO query_results (query_id, domain_id, run_id, rank, url, title, snippet, created_at, updated_at) "
+        "SELECT query_id, domain_id, run_id, "
+        "row_number() OVER (PARTITION BY run_id ORDER BY id), url, title, snippet, created_at, updated_at FROM ("
+        "  SELECT DISTINCT ON (q.id, d.id) r.id, q.id AS query_id, d.id AS domain_id, s.id AS run_id, "
+        "  r.result_url AS url, r.title, r.snippet, r.created_at, r.updated_at "
+        "  FROM search_results r "
+        "  JOIN queries q ON q.query_norm = r.query_norm "
+        "  JOIN search_results_domains m ON m.host = r.domain "
+        "  JOIN domains d ON d.domain = m.domain "
+        "  JOIN search_runs s ON s.query_id = q.id AND s.created_at = date_trunc('minute', r.updated_at) "
+        "  ORDER BY q.id, d.id, r.updated_at DESC, r.id"
+        ") latest "
+        # Rows the application already wrote to the new tables are newer and win
+        "ON CONFLICT (query_id, domain_id) DO NOTHING"
+    )
+    op.execute("UPDATE search_runs s SET results = (SELECT count(*) FROM query_results r WHERE r.run_id = s.id)")
+
+    # Contacts found for results become contacts of the domain (existing values win)
+    op.execute(
+        "UPDATE domains d SET "
+        "company_name = coalesce(d.company_name, c.company_name), email = coalesce(d.email, c.email), "
+        "phone = coalesce(d.phone, c.phone), region = coalesce(d.region, c.region) "
+        "FROM (SELECT m.domain, max(r.company_name) AS company_name, max(r.email) AS email, "
+        "      max(r.phone) AS phone, max(r.region) AS region "
+        "      FROM search_results r JOIN search_results_domains m ON m.host = r.domain GROUP BY m.domain) c "
+        "WHERE d.domain = c.domain"
+    )
+    op.execute("DROP TABLE search_results_domains")
+
+    create_index('ix_query_results_query_id_run_id_rank', 'query_results', ['query_id', 'run_id', 'rank'])
+    create_index('ix_query_results_domain_id', 'query_results', ['domain_id'])
+    op.drop_table('search_results')
+
+
+def downgrade() -> None:
+    # Recreate the flat table from the latest rows (runs, ranks and rows of older runs are lost)
+    op.create_table('search_results',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('url', sa.String(), nullable=False),
+        sa.Column('domain', sa.String(), nullable=False),
+        sa.Column('company_name', sa.String(), nullable=True),
+        sa.Column('email', sa.String(), nullable=True),
+        sa.Column('phone', sa.String(), nullable=True),
+        sa.Column('region', sa.String(), nullable=True),
+        sa.Column('category', sa.String(), nullable=True),
+        sa.Column('query', sa.String(length=255), nullable=False),
+        sa.Column('query_norm', sa.String(length=255), nullable=False, server_default=''),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.Column('result_url', sa.String(length=2048), nullable=False),
+        sa.Column('title', sa.String(length=512), nullable=True),
+        sa.Column('snippet', sa.String(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('query_norm', 'url', name='uq_search_results_query_norm_url')
+    )
+    op.execute(
+        "INSERT INTO search_results (url, domain, company_name, email, phone, region, category, query, query_norm, "
+        "created_at, updated_at, result_url, title, snippet) "
+        "SELECT r.url, d.domain, d.company_name, d.email, d.phone, d.region, d.category, q.query, q.query_norm, "
+        "r.created_at, r.updated_at, r.url, r.title, r.snippet "
+        "FROM query_results r JOIN queries q ON q.id = r.query_id JOIN domains d ON d.id = r.domain_id "
+        "ORDER BY r.id"
+    )
+    op.create_index('ix_search_results_query_norm_updated_at', 'search_results', ['query_norm', 'updated_at'])
+    op.create_index('ix_search_results_domain', 'search_results', ['domain'])
+
+    op.drop_table('query_results')
+    # Placeholder rows of never classified domains cannot satisfy the NOT NULL columns again
+    op.execute("DELETE FROM domains WHERE category IS NULL OR classified_at IS NULL")
+    op.alter_column('domains', 'rules_version', existing_type=sa.Integer(), server_default=None)
+    op.alter_column('domains', 'classified_at', existing_type=sa.DateTime(), nullable=False)
+    op.alter_column('domains', 'category', existing_type=sa.String(length=32), nullable=False)
+    op.drop_column('domains', 'region')
+    op.drop_column('domains', 'phone')
+    op.drop_column('domains', 'email')
+    op.drop_column('domains', 'company_name')
+    op.drop_index('ix_search_runs_query_id_created_at', table_name='search_runs')
+    op.drop_table('search_runs')
+    op.drop_index('ix_queries_query_norm', table_name='queries')
+    op.drop_table('queries')
@@ -0,0 +1,40 @@
+"""Classification, contacts and run summary stored with search results
+
+Revision ID: 007
+Revises: 006
+Create Date: 2026-10-19 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '007'
+down_revision = '006'
+branch_labels = None
+depends_on = None
+
+
+def add_column(table, column):
+    # The application creates missing tables at startup (init_db), possibly already with these columns
+    if column.name not in {existing['name'] for existing in sa.inspect(op.get_bind()).get_columns(table)}:
+        op.add_column(table, column)
+
+
+def upgrade() -> None:
+    # Label, evidence, INN and contacts of each result as returned by its run
+    add_column('query_results', sa.Column('category', sa.String(length=16), nullable=True))
+    add_column('query_results', sa.Column('evidence', sa.String(length=255), nullable=True))
+    add_column('query_results', sa.Column('inn', sa.String(length=12), nullable=True))
+    add_column('query_results', sa.Column('contacts', sa.JSON(), nullable=True))
+    # Counters and saved files of the search response; runs without it are not served from the cache
+    add_column('search_runs', sa.Column('summary', sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    # Drop cached response data
+    op.drop_column('search_runs', 'summary')
+    op.drop_column('query_results', 'contacts')
+    op.drop_column('query_results', 'inn')
+    op.drop_column('query_results', 'evidence')
+    op.drop_column('query_results', 'category')
@@ -0,0 +1,30 @@
+"""Index for reading search results changed since a watermark
+
+Revision ID: 008
+Revises: 007
+Create Date: 2026-10-19 18:00:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '008'
+down_revision = '007'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Repeat searches update rows in place, so the Parquet export reads by (updated_at, id) instead of id.
+    # CREATE INDEX CONCURRENTLY does not lock writes but cannot run inside a transaction; the application
+    # may already have created the index at startup (init_db), hence IF NOT EXISTS.
+    # If a build fails it leaves an INVALID index: drop it and run the migration again.
+    with op.get_context().autocommit_block():
+        op.create_index('ix_query_results_updated_at_id', 'query_results', ['updated_at', 'id'],
+                        unique=False, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_query_results_updated_at_id', table_name='query_results',
+                      postgresql_concurrently=True, if_exists=True)
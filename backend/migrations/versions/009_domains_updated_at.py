@@ -0,0 +1,29 @@
+"""Change marker for domains
+
+Revision ID: 009
+Revises: 008
+Create Date: 2026-10-19 20:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '009'
+down_revision = '008'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Export ETags cover domain classification and contacts through the latest domains.updated_at.
+    # The application creates missing tables at startup (init_db), possibly already with this column
+    if 'updated_at' not in {column['name'] for column in sa.inspect(op.get_bind()).get_columns('domains')}:
+        op.add_column('domains', sa.Column('updated_at', sa.DateTime(), nullable=True))
+    op.execute("UPDATE domains SET updated_at = COALESCE(classified_at, CURRENT_TIMESTAMP) WHERE updated_at IS NULL")
+    op.alter_column('domains', 'updated_at', existing_type=sa.DateTime(), nullable=False)
+
+
+def downgrade() -> None:
+    # Drop the change marker
+    op.drop_column('domains', 'updated_at')
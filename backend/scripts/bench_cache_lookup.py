@@ -0,0 +1,115 @@
+"""
+Замер поиска результатов в кэше (ParserService.get_cached_results) и проверка плана запроса.
+
+Заполняет таблицы результатов синтетическими запусками поиска (если указано --rows),
+выводит план запроса последнего запуска (EXPLAIN) и проверяет, что query_results читается
+по индексу ix_query_results_query_id_run_id_rank, а не полным просмотром, затем
+замеряет время поиска по случайным запросам.
+
+База берется из DATABASE_URL (PostgreSQL; для проверки можно sqlite+aiosqlite).
+
+Использование:
+    python scripts/bench_cache_lookup.py [--rows 200000] [--queries 2000] [--lookups 500]
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlmodel import SQLModel
+from app.db.session import engine
+import app.models  # регистрирует таблицы для create_all
+from app.parser.parser_config import ParserConfig
+from app.parser.result_writer import SearchResultWriter, latest_results_statement
+
+INDEX_NAME = "ix_query_results_query_id_run_id_rank"
+
+def query_text(number: int) -> str:
+    return f"Труба стальная {number} мм"
+
+async def populate(rows: int, queries: int, runs: int) -> None:
+    """Пишет rows строк: queries запросов, по runs запусков на запрос."""
+    writer = SearchResultWriter()
+    per_run = max(1, rows // (queries * runs))
+    started = time.perf_counter()
+    for run in range(runs):
+        for number in range(queries):
+            await writer.write(query_text(number), [
+                {"url": f"https://site{(number * 7 + run * 3 + i) % 50000}.ru/page{i}", "title": f"Результат {i}"}
+                for i in range(per_run)
+            ])
+    print(f"Записано ~{per_run * queries * runs} строк за {time.perf_counter() - started:.1f} сек")
+
+async def explain(connection, keyword: str, limit: int, ttl_days: int) -> str:
+    """Возвращает план запроса последнего запуска в текстовом виде."""
+    compiled = latest_results_statement(keyword, limit, ttl_days).compile(dialect=connection.dialect)
+    if compiled.positional:
+        params = tuple(compiled.params[name] for name in compiled.positiontup)
+    else:
+        params = compiled.params
+    if connection.dialect.name == "postgresql":
+        result = await connection.exec_driver_sql(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {compiled}", params)
+        plan = result.scalar()
+        return json.dumps(plan if not isinstance(plan, str) else json.loads(plan), ensure_ascii=False, indent=2)
+    result = await connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}", params)
+    return "\n".join(str(row[-1]) for row in result.all())
+
+def check_plan(plan: str) -> bool:
+    """Проверяет, что query_results читается по индексу, а не полным просмотром."""
+    if plan.lstrip().startswith("["):
+        # PostgreSQL: узел Seq Scan по query_results - полный просмотр
+        def nodes(node):
+            yield node
+            for child in node.get("Plans", []):
+                yield from nodes(child)
+        full_scan = any(node.get("Node Type") == "Seq Scan" and node.get("Relation Name") == "query_results"
+                        for node in nodes(json.loads(plan)[0]["Plan"]))
+    else:
+        # SQLite: SEARCH - поиск по индексу, SCAN - просмотр всей таблицы (или всего индекса)
+        full_scan = any(line.strip(" |-`").startswith("SCAN query_results") for line in plan.splitlines())
+    return INDEX_NAME in plan and not full_scan
+
+async def main():
+    parser = argparse.ArgumentParser(description="Замер поиска результатов в кэше")
+    parser.add_argument("--rows", type=int, default=0, help="сколько строк записать перед замером")
+    parser.add_argument("--queries", type=int, default=2000, help="количество разных запросов")
+    parser.add_argument("--runs", type=int, default=3, help="запусков поиска на запрос")
+    parser.add_argument("--lookups", type=int, default=500, help="количество замеряемых поисков")
+    parser.add_argument("--limit", type=int, default=100, help="результатов на поиск")
+    args = parser.parse_args()
+    ttl_days = ParserConfig().search_cache_ttl_days
+
+    async with engine.begin() as connection:
+        await connection.run_sync(SQLModel.metadata.create_all)
+    if args.rows:
+        await populate(args.rows, args.queries, args.runs)
+
+    async with engine.connect() as connection:
+        plan = await explain(connection, query_text(args.queries // 2), args.limit, ttl_days)
+        print(plan)
+        ok = check_plan(plan)
+        print(f"План: {'индекс ' + INDEX_NAME if ok else 'НЕТ ИНДЕКСА / ПОЛНЫЙ ПРОСМОТР'}")
+
+        timings = []
+        found = 0
+        for _ in range(args.lookups):
+            keyword = query_text(random.randrange(args.queries))
+            started = time.perf_counter()
+            result = await connection.execute(latest_results_statement(keyword, args.limit, ttl_days))
+            found += len(result.all())
+            timings.append(time.perf_counter() - started)
+    await engine.dispose()
+
+    timings.sort()
+    p50 = timings[len(timings) // 2] * 1000
+    p95 = timings[int(len(timings) * 0.95)] * 1000
+    print(f"Поисков: {len(timings)}, найдено строк: {found}, p50 {p50:.2f} мс, p95 {p95:.2f} мс")
+    sys.exit(0 if ok else 1)
+
+if __name__ == "__main__":
+    asyncio.run(main())
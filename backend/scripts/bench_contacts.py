@@ -0,0 +1,68 @@
+"""
+Замер пропускной способности извлечения контактов.
+
+Извлекает контакты из сохраненных страниц (results/sites/*.html) или, если их нет,
+из синтетических страниц и сравнивает скорость с целевой.
+
+Использование:
+    python scripts/bench_contacts.py [директория с HTML] [целевая скорость, МБ/с]
+"""
+import os
+import sys
+import glob
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.parser.contacts import contact_extractor
+
+# Целевая пропускная способность на типичном HTML (МБ/с)
+TARGET_MB_S = 5.0
+
+SAMPLE_PAGE = """
+<html><head><title>ООО Металл - трубы оптом</title></head><body>
+<nav><a href="/catalog">Каталог</a> <a href="/contacts">Контакты</a></nav>
+<div class="content">{filler}</div>
+<footer>
+  <a href="mailto:Sales@Metall-Opt.ru?subject=Заказ">sales@metall-opt.ru</a>
+  Отдел закупок: zakaz [at] metall-opt [dot] ru
+  Тел.: 8 (495) 123-45-67, <a href="tel:+74951234568">+7 495 123-45-68</a>
+  <a href="https://wa.me/79991234567">WhatsApp</a> <a href="https://t.me/metall_opt">Telegram</a>
+  ИНН 7707083893
+</footer></body></html>
+"""
+
+def load_documents(html_dir: str) -> list:
+    """Загружает сохраненные страницы или строит синтетические."""
+    documents = []
+    for path in glob.glob(os.path.join(html_dir, "**", "*.html"), recursive=True):
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            documents.append(f.read())
+    if not documents:
+        filler = "<p>Трубы стальные электросварные, профильные и бесшовные со склада в Москве. " \
+                 "Lorem ipsum dolor sit amet, consectetur adipiscing elit, 2024-01-15, арт. 100500.</p>" * 200
+        documents = [SAMPLE_PAGE.format(filler=filler)] * 300
+    return documents
+
+def main():
+    html_dir = sys.argv[1] if len(sys.argv) > 1 else "/app/results/sites"
+    target = float(sys.argv[2]) if len(sys.argv) > 2 else TARGET_MB_S
+
+    documents = load_documents(html_dir)
+    size_mb = sum(len(document.encode("utf-8")) for document in documents) / (1024 * 1024)
+
+    start = time.perf_counter()
+    results = contact_extractor.extract_many(documents)
+    elapsed = time.perf_counter() - start
+
+    throughput = size_mb / elapsed
+    found = sum(len(values) for result in results for values in result.values())
+    print(f"Документов: {len(documents)}, объем: {size_mb:.1f} МБ, найдено контактов: {found}")
+    print(f"Время: {elapsed:.2f} сек, пропускная способность: {throughput:.1f} МБ/с (цель {target:.1f} МБ/с)")
+
+    if throughput < target:
+        print("Пропускная способность ниже целевой")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
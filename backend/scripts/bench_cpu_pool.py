@@ -0,0 +1,64 @@
+"""
+Замер задержки цикла событий при обработке больших страниц на месте и в пуле процессов.
+
+Параллельно с заданиями classify и parse работает фоновая задача, которая каждую
+миллисекунду засыпает и запоминает самую долгую паузу: это время, на которое
+обработка страниц блокирует остальные запросы воркера.
+
+Использование:
+    python scripts/bench_cpu_pool.py [количество страниц] [количество процессов]
+"""
+import os
+import sys
+import time
+import asyncio
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.parser.cpu_pool import CpuPool
+
+SAMPLE_PAGE = """<html><head><title>ООО Металл</title></head><body>{filler}
+<footer>ООО "Металл", ИНН 7707083893, sales@metall-opt.ru, +7 (495) 123-45-67</footer></body></html>"""
+
+async def max_stall(stop: asyncio.Event) -> float:
+    """Возвращает самую долгую паузу цикла событий в секундах."""
+    stall = 0.0
+    previous = time.perf_counter()
+    while not stop.is_set():
+        await asyncio.sleep(0.001)
+        now = time.perf_counter()
+        stall = max(stall, now - previous)
+        previous = now
+    return stall
+
+async def measure(pool: CpuPool, pages: list) -> tuple:
+    """Обрабатывает страницы и возвращает общее время и самую долгую паузу цикла событий."""
+    stop = asyncio.Event()
+    watcher = asyncio.create_task(max_stall(stop))
+    start = time.perf_counter()
+    await asyncio.gather(pool.map("classify", pages), pool.map("parse", pages))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    return elapsed, await watcher
+
+async def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 32
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else 0
+    filler = "<div><a href='/catalog'>Каталог</a> Трубы стальные со склада в Москве</div>" * 10000
+    pages = [SAMPLE_PAGE.format(filler=filler)] * count
+    print(f"Страниц: {count}, размер страницы: {len(pages[0].encode('utf-8')) / 1024:.0f} КБ")
+
+    elapsed, stall = await measure(CpuPool(), pages)
+    print(f"На месте: {elapsed:.2f} сек, максимальная пауза цикла событий {stall * 1000:.0f} мс")
+
+    pool = CpuPool()
+    pool.start(workers=workers)
+    # Первое задание запускает процессы, в замер оно не входит
+    await pool.run("classify", pages[0])
+    elapsed, stall = await measure(pool, pages)
+    print(f"Пул ({pool.workers} процессов): {elapsed:.2f} сек, максимальная пауза цикла событий {stall * 1000:.0f} мс")
+    print(f"Статистика пула: {pool.get_stats()}")
+    await pool.shutdown()
+
+if __name__ == "__main__":
+    asyncio.run(main())
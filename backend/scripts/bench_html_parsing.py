@@ -0,0 +1,86 @@
+"""
+Сравнение скорости разбора HTML: BeautifulSoup (html.parser) и общий модуль html_parsing (selectolax).
+
+Для каждой страницы извлекаются результаты выдачи, видимый текст и ссылки.
+Используются сохраненные страницы (results/sites/*.html) или синтетические, если их нет.
+
+Использование:
+    python scripts/bench_html_parsing.py [директория с HTML] [количество страниц]
+"""
+import os
+import re
+import sys
+import glob
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bs4 import BeautifulSoup
+from app.parser.html_parsing import parse_html, serp_items, visible_text, extract_links
+
+SERP_ITEM = """
+<div class="serp-item"><a class="link" href="https://site{n}.ru/catalog">Трубы стальные {n} - ООО Металл</a>
+<div class="text-container">Продажа труб оптом и в розницу, цены от 100 руб. Доставка по России.</div></div>
+"""
+
+SAMPLE_PAGE = """<html><head><title>Поиск</title><style>.a{{color:red}}</style>
+<script>var data = {{"items": [1, 2, 3]}};</script></head>
+<body><header><nav>{nav}</nav></header><div class="content">{items}</div>
+<footer><p>ИНН 7707083893</p><a href="/contacts">Контакты</a></footer></body></html>"""
+
+def load_pages(html_dir: str, count: int) -> list:
+    """Загружает сохраненные страницы или строит синтетические."""
+    pages = []
+    for path in glob.glob(os.path.join(html_dir, "**", "*.html"), recursive=True)[:count]:
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            pages.append(f.read())
+    if not pages:
+        nav = "".join(f'<a href="/section{n}">Раздел {n}</a>' for n in range(30))
+        items = "".join(SERP_ITEM.format(n=n) for n in range(20))
+        pages = [SAMPLE_PAGE.format(nav=nav, items=items)] * count
+    return pages
+
+def with_beautifulsoup(html: str) -> tuple:
+    """Текущий путь: BeautifulSoup с html.parser."""
+    soup = BeautifulSoup(html, "html.parser")
+    items = []
+    for item in soup.select("div.serp-item"):
+        link = item.select_one("a.link")
+        if link and link.get("href"):
+            items.append({"url": link.get("href"), "title": link.get_text(strip=True)})
+    links = [a.get("href") for a in soup.find_all("a") if a.get("href")]
+    for tag in soup(["script", "style", "noscript", "template", "svg", "iframe", "head"]):
+        tag.decompose()
+    text = re.sub(r"\s+", " ", soup.get_text(" ")).strip()
+    return items, text, links
+
+def with_selectolax(html: str) -> tuple:
+    """Новый путь: общий модуль html_parsing."""
+    tree = parse_html(html)
+    items = serp_items(tree, "div.serp-item", "a.link")
+    links = extract_links(tree)
+    text = visible_text(tree)
+    return items, text, links
+
+def measure(function, pages: list) -> float:
+    """Возвращает количество страниц в секунду."""
+    start = time.perf_counter()
+    for page in pages:
+        function(page)
+    return len(pages) / (time.perf_counter() - start)
+
+def main():
+    html_dir = sys.argv[1] if len(sys.argv) > 1 else "/app/results/sites"
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    pages = load_pages(html_dir, count)
+    size_kb = sum(len(page.encode("utf-8")) for page in pages) / len(pages) / 1024
+    print(f"Страниц: {len(pages)}, средний размер: {size_kb:.0f} КБ")
+
+    old = measure(with_beautifulsoup, pages)
+    new = measure(with_selectolax, pages)
+    print(f"BeautifulSoup (html.parser): {old:.0f} стр/с")
+    print(f"selectolax (html_parsing):   {new:.0f} стр/с")
+    print(f"Ускорение: {new / old:.1f}x")
+
+if __name__ == "__main__":
+    main()
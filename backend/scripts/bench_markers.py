@@ -0,0 +1,57 @@
+"""
+Сравнение скорости поиска маркеров компании: прежний способ (html.lower() на каждый маркер
+и поиск подстроки) и общий автомат MarkerMatcher (строки и байты UTF-8).
+
+Использование:
+    python scripts/bench_markers.py [директория с HTML] [количество повторов]
+"""
+import os
+import sys
+import glob
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.parser.markers import COMPANY_MARKERS, company_matcher
+
+SAMPLE_PAGE = """<html><head><title>Трубы стальные</title></head><body>{filler}
+<footer>ООО "Металл", ИНН 7707083893, реквизиты для оплаты</footer></body></html>"""
+
+def load_documents(html_dir: str) -> list:
+    """Загружает сохраненные страницы или строит синтетические."""
+    documents = []
+    for path in glob.glob(os.path.join(html_dir, "**", "*.html"), recursive=True):
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            documents.append(f.read())
+    if not documents:
+        filler = "<div class='item'><a href='/catalog/truby'>Трубы</a> типовые стальные трубы " \
+                 "со склада в Москве, Lorem ipsum dolor sit amet</div>\n" * 20000
+        documents = [SAMPLE_PAGE.format(filler=filler)] * 10
+    return documents
+
+def with_lower(html: str) -> list:
+    """Прежний способ: копия документа в нижнем регистре на каждый маркер."""
+    return [marker for marker in COMPANY_MARKERS if marker.lower() in html.lower()]
+
+def measure(function, documents: list, repeats: int) -> float:
+    """Возвращает пропускную способность в МБ/с."""
+    size_mb = sum(len(document) for document in documents) * repeats / (1024 * 1024)
+    start = time.perf_counter()
+    for _ in range(repeats):
+        for document in documents:
+            function(document)
+    return size_mb / (time.perf_counter() - start)
+
+def main():
+    html_dir = sys.argv[1] if len(sys.argv) > 1 else "/app/results/sites"
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+
+    documents = load_documents(html_dir)
+    encoded = [document.encode("utf-8") for document in documents]
+    print(f"Документов: {len(documents)}")
+    print(f"html.lower() на каждый маркер: {measure(with_lower, documents, repeats):.0f} МБ/с")
+    print(f"MarkerMatcher (строки):        {measure(company_matcher.matched, documents, repeats):.0f} МБ/с")
+    print(f"MarkerMatcher (байты UTF-8):   {measure(company_matcher.matched, encoded, repeats):.0f} МБ/с")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Калибровка порогов оценщика сайтов по размеченным результатам.
+
+Читает results/suppliers и results/others, подбирает пороги, сохраняет их в файл калибровки
+и замеряет скорость оценки пакета из 10 000 записей.
+
+Использование:
+    python scripts/calibrate_scorer.py [директория результатов] [файл калибровки]
+"""
+import os
+import sys
+import time
+import random
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.parser.scoring import SiteScorer
+
+def benchmark(scorer: SiteScorer, sites: list, size: int = 10000) -> float:
+    """Возвращает время оценки пакета из size записей (мс)."""
+    if not sites:
+        sites = [{
+            "url": "https://metall-opt.ru/catalog/truby",
+            "title": "Трубы стальные оптом - ООО Металл",
+            "snippet": "Цены от 100 руб., в наличии на складе, доставка. Телефон +7 (495) 123-45-67"
+        }]
+    batch = [random.choice(sites) for _ in range(size)]
+    start = time.perf_counter()
+    scorer.score_batch(batch)
+    return (time.perf_counter() - start) * 1000
+
+def main():
+    results_dir = sys.argv[1] if len(sys.argv) > 1 else "/app/results"
+    output = sys.argv[2] if len(sys.argv) > 2 else os.path.join(results_dir, "scorer_calibration.json")
+
+    scorer = SiteScorer()
+    suppliers, others = SiteScorer.load_labelled(results_dir)
+    print(f"Размечено: поставщиков {len(suppliers)}, других {len(others)}")
+
+    if suppliers and others:
+        result = scorer.calibrate(suppliers, others)
+        print(f"Порог поставщика: {result['supplier_threshold']:.2f}")
+        print(f"Порог другого сайта: {result['other_threshold']:.2f}")
+        print(f"Решается без скачивания: {result['decided_share']:.0%}")
+        scorer.save(output)
+        print(f"Калибровка сохранена в {output}")
+    else:
+        print("Недостаточно размеченных данных, калибровка пропущена")
+
+    elapsed = benchmark(scorer, suppliers + others)
+    print(f"Оценка 10000 записей: {elapsed:.1f} мс")
+
+if __name__ == "__main__":
+    main()
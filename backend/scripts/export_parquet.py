@@ -0,0 +1,38 @@
+"""
+Выгрузка результатов поиска с классификацией доменов в набор данных Parquet
+(партиции date=YYYY-MM-DD/query=<запрос>).
+
+По умолчанию дописываются только строки, появившиеся после прошлой выгрузки,
+поэтому скрипт можно запускать по расписанию (cron).
+
+Пример чтения в pandas:
+    import pyarrow.dataset as ds
+    df = ds.dataset(path, partitioning=ds.HivePartitioning.discover(infer_dictionary=True)).to_table().to_pandas()
+
+Использование:
+    python scripts/export_parquet.py [директория набора данных] [--full]
+"""
+import os
+import sys
+import asyncio
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.parser.parser_config import ParserConfig
+from app.parser.parquet_export import ParquetExporter
+
+def main():
+    parser = argparse.ArgumentParser(description="Выгрузка результатов поиска в Parquet")
+    parser.add_argument("output_dir", nargs="?", default=ParserConfig().parquet_export_dir)
+    parser.add_argument("--full", action="store_true", help="пересобрать набор данных заново")
+    parser.add_argument("--batch-size", type=int, default=5000, help="строк за один запрос к базе")
+    args = parser.parse_args()
+
+    exporter = ParquetExporter(args.output_dir, batch_size=args.batch_size)
+    stats = asyncio.run(exporter.export(full=args.full))
+    print(f"Выгружено строк: {stats['rows']}, файлов: {stats['files']}, "
+          f"последний id: {stats['last_id']}, за {stats['duration']} с -> {args.output_dir}")
+
+if __name__ == "__main__":
+    main()
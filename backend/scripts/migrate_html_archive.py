@@ -0,0 +1,125 @@
+"""
+Перенос сохраненных HTML-файлов (results/suppliers, results/others, results/sites) в сжатый архив
+с адресацией по содержимому (results/archive).
+
+Файлы сайтов из хранилища (Storage) переносятся в архив, и их записи в журнале хранилища
+обновляются (digest, codec, stored_size), поэтому get_site_html читает их уже из архива.
+Остальные файлы <домен>.html сохраняются в архив под именем <директория>/<домен>.
+Каждый объект после записи читается обратно и сверяется по SHA-256. Повторный запуск
+безопасен: уже перенесенные сайты и одинаковые страницы не записываются снова.
+
+Использование:
+    python scripts/migrate_html_archive.py [директория results] [--delete] [--codec zstd|gzip]
+
+    --delete  удалить исходные файлы после успешной сверки
+"""
+import os
+import sys
+import glob
+import asyncio
+import argparse
+import logging
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.parser.archive import HtmlArchive
+
+CATEGORY_DIRS = ("suppliers", "others", "sites")
+
+def verified_put(archive: HtmlArchive, path: str) -> dict:
+    """Сохраняет файл в архив и проверяет, что объект читается без искажений."""
+    with open(path, "rb") as f:
+        data = f.read()
+    entry = archive.put(data)
+    if archive.digest(archive.get(entry["digest"])) != entry["digest"]:
+        raise RuntimeError(f"Объект {entry['digest']} для {path} не совпадает с исходным файлом")
+    return entry
+
+async def migrate(results_dir: str, delete: bool, codec: str = None) -> dict:
+    """Переносит файлы в архив и возвращает статистику."""
+    # Storage работает с директорией results в текущей рабочей директории
+    os.chdir(os.path.dirname(os.path.abspath(results_dir)))
+    from app.parser.storage import Storage
+    storage = Storage()
+    archive = storage.archive if codec is None else HtmlArchive(storage.archive.root, codec=codec)
+
+    stats = {"sites": 0, "files": 0, "deduplicated": 0, "errors": 0, "bytes_before": 0, "bytes_stored": 0}
+    migrated = set()
+
+    # 1. Сайты хранилища: переносим файл и обновляем запись в журнале
+    for domain, info in list(storage.processed_domains.items()):
+        if info.get("digest"):
+            continue
+        path = os.path.join(storage.base_dir, info["category"], info["filename"])
+        if not os.path.exists(path):
+            continue
+        try:
+            entry = await asyncio.to_thread(verified_put, archive, path)
+            await storage.update_site_info(domain, dict(
+                info,
+                filename=os.path.basename(entry["path"]),
+                file_path=entry["path"],
+                file_size=entry["size"],
+                digest=entry["digest"],
+                codec=entry["codec"],
+                stored_size=entry["stored_size"],
+            ))
+        except Exception as e:
+            print(f"Ошибка переноса {path}: {e}")
+            stats["errors"] += 1
+            continue
+        migrated.add(os.path.abspath(path))
+        stats["sites"] += 1
+        stats["bytes_before"] += entry["size"]
+        if entry["created"]:
+            stats["bytes_stored"] += entry["stored_size"]
+        else:
+            stats["deduplicated"] += 1
+
+    # 2. Остальные файлы: сохраняем под именем <директория>/<домен>
+    for category in CATEGORY_DIRS:
+        for path in sorted(glob.glob(os.path.join(storage.base_dir, category, "*.html"))):
+            if os.path.abspath(path) in migrated:
+                continue
+            name = f"{category}/{os.path.basename(path)[:-len('.html')]}"
+            try:
+                entry = await asyncio.to_thread(verified_put, archive, path)
+                await asyncio.to_thread(archive.link, name, entry["digest"])
+            except Exception as e:
+                print(f"Ошибка переноса {path}: {e}")
+                stats["errors"] += 1
+                continue
+            migrated.add(os.path.abspath(path))
+            stats["files"] += 1
+            stats["bytes_before"] += entry["size"]
+            if entry["created"]:
+                stats["bytes_stored"] += entry["stored_size"]
+            else:
+                stats["deduplicated"] += 1
+
+    await storage.close()
+
+    if delete:
+        for path in migrated:
+            os.remove(path)
+    return stats
+
+def main():
+    parser = argparse.ArgumentParser(description="Перенос HTML-файлов в сжатый архив")
+    parser.add_argument("results_dir", nargs="?", default="/app/results")
+    parser.add_argument("--delete", action="store_true", help="удалить исходные файлы после переноса")
+    parser.add_argument("--codec", choices=("zstd", "gzip"), default=None)
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    stats = asyncio.run(migrate(args.results_dir, args.delete, args.codec))
+    print(f"Перенесено сайтов хранилища: {stats['sites']}, прочих файлов: {stats['files']}, "
+          f"повторяющихся страниц: {stats['deduplicated']}, ошибок: {stats['errors']}")
+    if stats["bytes_before"]:
+        print(f"Объем: {stats['bytes_before'] / 1024 / 1024:.1f} МБ -> {stats['bytes_stored'] / 1024 / 1024:.1f} МБ "
+              f"({stats['bytes_before'] / max(stats['bytes_stored'], 1):.1f}x)")
+    if args.delete:
+        print("Исходные файлы удалены")
+
+if __name__ == "__main__":
+    main()
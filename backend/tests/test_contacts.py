@@ -0,0 +1,73 @@
+"""Извлечение контактов: адреса, телефоны, мессенджеры и номера, которые телефонами не являются."""
+import pytest
+from app.parser.contacts import extract_contacts, normalize_phone
+
+
+@pytest.mark.parametrize("text, emails", [
+    ("Пишите: sales@zavod.ru", ["sales@zavod.ru"]),
+    ("mailto:Sales@Zavod.RU?subject=заказ", ["sales@zavod.ru"]),
+    ("info [at] example [dot] ru", ["info@example.ru"]),
+    ("sales(at)metall.ru", ["sales@metall.ru"]),
+    ("opt [собака] snab [точка] ru", ["opt@snab.ru"]),
+    ("a&#64;b.ru", ["a@b.ru"]),
+    ("<img src='logo@2x.png'>", []),
+    ("background: url(icon@3x.webp)", []),
+    ("info@zavod.ru, INFO@ZAVOD.RU", ["info@zavod.ru"]),
+])
+def test_emails(text, emails):
+    assert extract_contacts(text)["emails"] == emails
+
+
+@pytest.mark.parametrize("text, phones", [
+    ("8 (495) 123-45-67", ["+74951234567"]),
+    ("+7 495 123 45 67", ["+74951234567"]),
+    ("+7(916)123-45-67 и 8-916-123-45-67", ["+79161234567"]),
+    ("tel:+74951234567", ["+74951234567"]),
+    ("tel:9161234567", ["+79161234567"]),
+    ("+44 20 7946 0958", ["+442079460958"]),
+    # ИНН, КПП и ОГРН - не телефоны
+    ("ИНН 7707083893 КПП 773601001", []),
+    ("ИНН 781234567890", []),
+    ("ОГРН 1027700132195", []),
+    ("ИНН/КПП 7707083893/773601001", []),
+])
+def test_phones(text, phones):
+    assert extract_contacts(text)["phones"] == phones
+
+
+@pytest.mark.parametrize("raw, phone", [
+    ("89161234567", "+79161234567"),
+    ("9161234567", "+79161234567"),
+    ("+7 (916) 123-45-67", "+79161234567"),
+    ("%2B79161234567", "+79161234567"),
+    ("0123456789", None),
+    ("+7 123", None),
+    ("+7 916 123 45 678", None),
+])
+def test_normalize_phone(raw, phone):
+    assert normalize_phone(raw) == phone
+
+
+@pytest.mark.parametrize("text, whatsapp", [
+    ("https://wa.me/79161234567", ["+79161234567"]),
+    ("https://wa.me/%2B79161234567", ["+79161234567"]),
+    ("https://api.whatsapp.com/send/?phone=79161234567", ["+79161234567"]),
+    ("whatsapp://send?phone=+79161234567", ["+79161234567"]),
+])
+def test_whatsapp(text, whatsapp):
+    contacts = extract_contacts(text)
+    assert contacts["whatsapp"] == whatsapp
+    assert contacts["phones"] == []
+
+
+@pytest.mark.parametrize("text, telegram", [
+    ("https://t.me/metall_opt", ["https://t.me/metall_opt"]),
+    ("https://telegram.me/Metall_Opt", ["https://t.me/metall_opt"]),
+    ("tg://resolve?domain=metall_opt", ["https://t.me/metall_opt"]),
+    ("https://t.me/share/url?url=x", []),
+    ("https://t.me/joinchat/abcdef", []),
+    ("https://t.me/addstickers/pack", []),
+    ("https://t.me/abc", []),
+])
+def test_telegram(text, telegram):
+    assert extract_contacts(text)["telegram"] == telegram
@@ -0,0 +1,42 @@
+"""Заголовок Range и выдача диапазона байтов потока выгрузки."""
+import asyncio
+import pytest
+from app.parser.export import byte_range, parse_range
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("bytes=0-", (0, None)),
+    ("bytes=5-", (5, None)),
+    ("bytes=5-9", (5, 9)),
+    ("bytes= 5-9", (5, 9)),
+    (None, None),
+    ("", None),
+    ("items=0-5", None),
+    ("bytes=-5", None),
+    ("bytes=0-1,5-6", None),
+    ("bytes=a-5", None),
+    ("bytes=5-b", None),
+])
+def test_parse_range(header, expected):
+    assert parse_range(header) == expected
+
+
+DATA = bytes(range(100))
+CHUNKS = [DATA[0:7], DATA[7:30], DATA[30:31], DATA[31:64], DATA[64:100]]
+
+
+async def _chunks():
+    for chunk in CHUNKS:
+        yield chunk
+
+
+async def _collect(start, end):
+    return b"".join([chunk async for chunk in byte_range(_chunks(), start, end)])
+
+
+@pytest.mark.parametrize("start, end", [
+    (0, None), (0, 0), (0, 6), (6, 7), (7, 29), (30, 30), (10, 70), (63, 64), (50, None), (99, 99), (90, 200), (100, None),
+])
+def test_byte_range(start, end):
+    expected = DATA[start:] if end is None else DATA[start:end + 1]
+    assert asyncio.run(_collect(start, end)) == expected
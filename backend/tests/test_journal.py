@@ -0,0 +1,112 @@
+"""Журнал изменений: восстановление, снимки, недописанные строки и запись из нескольких экземпляров."""
+import asyncio
+from app.parser.journal import Journal
+
+
+class State:
+    """Состояние владельца журнала: словарь ключ -> значение."""
+
+    def __init__(self, directory, compact_threshold=10000):
+        self.values = {}
+        self.journal = Journal(directory, "state", compact_threshold, apply=self.apply, reset=self.values.clear)
+
+    def apply(self, record):
+        self.values[record["key"]] = record["value"]
+
+    async def set(self, key, value):
+        record = {"key": key, "value": value}
+        self.apply(record)
+        await self.journal.append(record)
+
+    def records(self):
+        return [{"key": key, "value": value} for key, value in self.values.items()]
+
+
+def load(directory):
+    return list(Journal(directory, "state").load())
+
+
+def test_replay_in_order(tmp_path):
+    async def scenario():
+        state = State(tmp_path)
+        await state.set("a", 1)
+        await state.set("b", 2)
+        await state.set("a", 3)
+
+    asyncio.run(scenario())
+    assert load(tmp_path) == [{"key": "a", "value": 1}, {"key": "b", "value": 2}, {"key": "a", "value": 3}]
+
+
+def test_concurrent_appends_are_all_written(tmp_path):
+    async def scenario():
+        state = State(tmp_path)
+        await asyncio.gather(*(state.set(f"k{number}", number) for number in range(100)))
+        return state.journal.entries
+
+    assert asyncio.run(scenario()) == 100
+    assert [record["value"] for record in load(tmp_path)] == list(range(100))
+
+
+def test_compaction_replaces_journal_with_snapshot(tmp_path):
+    async def scenario():
+        state = State(tmp_path, compact_threshold=3)
+        for number in range(3):
+            await state.set("a", number)
+        assert state.journal.needs_compaction
+        await state.journal.compact(state.records)
+        assert state.journal.entries == 0
+        await state.set("b", 1)
+
+    asyncio.run(scenario())
+    assert (tmp_path / "state.snapshot").read_text(encoding="utf-8").count("\n") == 1
+    assert load(tmp_path) == [{"key": "a", "value": 2}, {"key": "b", "value": 1}]
+
+
+def test_compaction_below_threshold_is_skipped_unless_forced(tmp_path):
+    async def scenario():
+        state = State(tmp_path, compact_threshold=10)
+        await state.set("a", 1)
+        await state.journal.compact(state.records, force=False)
+        assert not (tmp_path / "state.snapshot").exists()
+        await state.journal.compact(state.records)
+        assert (tmp_path / "state.snapshot").exists()
+
+    asyncio.run(scenario())
+
+
+def test_partial_last_line_is_skipped_and_not_merged(tmp_path):
+    async def scenario():
+        state = State(tmp_path)
+        await state.set("a", 1)
+        # Сбой при записи: строка без перевода строки в конце
+        with open(tmp_path / "state.journal", "a", encoding="utf-8") as f:
+            f.write('{"key": "b", "val')
+        assert load(tmp_path) == [{"key": "a", "value": 1}]
+
+        restored = State(tmp_path)
+        for record in restored.journal.load():
+            restored.apply(record)
+        await restored.set("c", 3)
+
+    asyncio.run(scenario())
+    assert load(tmp_path) == [{"key": "a", "value": 1}, {"key": "c", "value": 3}]
+
+
+def test_writers_see_each_others_records(tmp_path):
+    async def scenario():
+        first, second = State(tmp_path), State(tmp_path)
+        await first.set("a", 1)
+        await second.set("b", 2)
+        assert second.values == {"a": 1, "b": 2}
+        await first.journal.refresh()
+        assert first.values == {"a": 1, "b": 2}
+
+        # Снимок другого экземпляра: состояние перечитывается целиком
+        await second.journal.compact(second.records)
+        await second.set("c", 3)
+        first.values["stale"] = True
+        await first.journal.refresh()
+        assert first.values == {"a": 1, "b": 2, "c": 3}
+
+    asyncio.run(scenario())
+    assert {record["key"] for record in load(tmp_path)} == {"a", "b", "c"}
@@ -0,0 +1,42 @@
+"""Поиск маркеров MarkerMatcher: границы слов, регистр, байты и выбор самого длинного маркера."""
+import pytest
+from app.parser.markers import MarkerMatcher
+
+MARKERS = ["ООО", "ОГРН", "поставщик", "ао"]
+
+
+@pytest.mark.parametrize("document, found", [
+    ("ООО Ромашка", ["ООО"]),
+    ("ооо ромашка", ["ООО"]),
+    ("ОООшка", []),
+    ("поставщики", []),
+    ("Каолин", []),
+    ("ао «Завод»", ["ао"]),
+    ("инфо-АО", ["ао"]),
+    ("ОГРН: 1027700132195", ["ОГРН"]),
+    ("СПАО", []),
+    ("поставщик, ООО и АО", ["поставщик", "ООО", "ао"]),
+])
+def test_word_boundaries(document, found):
+    matcher = MarkerMatcher(MARKERS)
+    assert matcher.matched(document) == found
+    assert matcher.matched(document.encode("utf-8")) == found
+
+
+def test_without_word_boundaries():
+    assert MarkerMatcher(["ао"], word_boundaries=False).matched("СПАО") == ["ао"]
+
+
+def test_longest_marker_wins():
+    assert list(MarkerMatcher(["О", "ООО"]).finditer("ООО")) == [("ООО", 0, 3)]
+
+
+def test_positions_in_characters_and_bytes():
+    matcher = MarkerMatcher(MARKERS)
+    assert matcher.find_all("ооо и ООО, АО") == {"ООО": [0, 6], "ао": [11]}
+    assert list(matcher.finditer("x ООО".encode("utf-8"))) == [("ООО", 2, 8)]
+
+
+def test_empty_markers():
+    with pytest.raises(ValueError):
+        MarkerMatcher(["", ""])
@@ -0,0 +1,63 @@
+"""Контрольные цифры и извлечение ИНН, ОГРН/ОГРНИП и КПП."""
+import pytest
+from app.parser.requisites import extract_requisites, is_valid_inn, is_valid_kpp, is_valid_ogrn
+
+
+@pytest.mark.parametrize("inn, valid", [
+    ("7707083893", True),
+    ("7707083894", False),
+    ("500100732259", True),
+    ("500100732250", False),
+    ("0000000000", False),
+    ("770708389", False),
+    ("77070838930", False),
+    ("77O7083893", False),
+])
+def test_inn_check_digits(inn, valid):
+    assert is_valid_inn(inn) is valid
+
+
+@pytest.mark.parametrize("ogrn, valid", [
+    ("1027700132195", True),
+    ("1027700132196", False),
+    ("304500116000157", True),
+    ("304500116000158", False),
+    ("0027700132195", False),
+    ("10277001321", False),
+])
+def test_ogrn_check_digit(ogrn, valid):
+    assert is_valid_ogrn(ogrn) is valid
+
+
+@pytest.mark.parametrize("kpp, valid", [
+    ("773601001", True),
+    ("7736AB001", True),
+    ("000001001", False),
+    ("77360100", False),
+    ("7736ab001", False),
+])
+def test_kpp_format(kpp, valid):
+    assert is_valid_kpp(kpp) is valid
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("<b>ИНН</b>: 7707083893", {"inn": ["7707083893"], "ogrn": [], "kpp": []}),
+    ("ИНН&nbsp;7707083893 ИНН 7707083893", {"inn": ["7707083893"], "ogrn": [], "kpp": []}),
+    ("ИНН/КПП 7707083893/773601001", {"inn": ["7707083893"], "ogrn": [], "kpp": ["773601001"]}),
+    ("ОГРН 1027700132195, КПП: 773601001", {"inn": [], "ogrn": ["1027700132195"], "kpp": ["773601001"]}),
+    ("ОГРНИП № 304500116000157", {"inn": [], "ogrn": ["304500116000157"], "kpp": []}),
+    # Неверная контрольная цифра и лишняя цифра
+    ("ИНН 7707083894", {"inn": [], "ogrn": [], "kpp": []}),
+    ("ИНН 77070838931", {"inn": [], "ogrn": [], "kpp": []}),
+    # Название реквизита внутри слова
+    ("Свинн 7707083893", {"inn": [], "ogrn": [], "kpp": []}),
+])
+def test_extract_requisites(text, expected):
+    assert extract_requisites(text) == expected
+
+
+def test_intermediate_block_skips_number_at_its_end():
+    # Номер в конце промежуточного блока может быть обрезан
+    requisites = extract_requisites("ИНН 7707083893", final=False)
+    assert requisites["inn"] == []
+    assert extract_requisites("ИНН 7707083893 КПП", requisites, final=False)["inn"] == ["7707083893"]
@@ -3,8 +3,9 @@ import re
 import logging
 from typing import Dict, Set
 from urllib.parse import urlparse
-from bs4 import BeautifulSoup
 from backend.app.services.storage_service import StorageService
+from backend.app.parser.markers import company_matcher
+from backend.app.parser.archive import HtmlArchive
 
 # Настройка логирования
 logging.basicConfig(level=logging.INFO)
@@ -17,16 +18,8 @@ def has_company_markers(html: str) -> bool:
     """
     Проверяет наличие маркеров компании в HTML-контенте.
     """
-    company_markers = [
-        'ИНН',
-        'ООО',
-        'ОАО',
-        'АО',
-        'ИП',
-        'реквизиты'
-    ]
-    
-    return any(marker.lower() in html.lower() for marker in company_markers)
+    # Все маркеры ищутся одним автоматом за один проход по документу
+    return company_matcher.search(html) is not None
 
 def looks_like_article(domain: str, html: str) -> bool:
     """
@@ -123,10 +116,6 @@ def save_html_content(url: str, html: str, processed_domains: Dict[str, str]) ->
         logger.info(f"Base directory: {base_dir}")
         logger.info(f"Results directory: {results_dir}")
 
-        # Создаем директории если они не существуют
-        os.makedirs(os.path.join(results_dir, 'suppliers'), exist_ok=True)
-        os.makedirs(os.path.join(results_dir, 'others'), exist_ok=True)
-
         # Определяем категорию и путь для сохранения
         if has_company_markers(html):
             category_dir = 'suppliers'
@@ -135,12 +124,11 @@ def save_html_content(url: str, html: str, processed_domains: Dict[str, str]) ->
             category_dir = 'others'
             logger.info(f"Categorized as other: {domain}")
 
-        file_path = os.path.join(results_dir, category_dir, f"{domain}.html")
-        logger.info(f"Saving to file: {file_path}")
-
-        with open(file_path, 'w', encoding='utf-8') as f:
-            f.write(html)
-            logger.info(f"Successfully saved content to {file_path}")
+        # Страница сохраняется сжатой в архив с адресацией по содержимому
+        name = f"{category_dir}/{domain}"
+        archive = HtmlArchive(os.path.join(results_dir, 'archive'))
+        entry = archive.put_named(name, html)
+        logger.info(f"Saved {name} to archive: {entry['path']} ({entry['size']} -> {entry['stored_size']} bytes)")
 
         processed_domains[domain] = category_dir
         logger.info(f"Added {domain} to processed domains")
@@ -1,6 +1,6 @@
 import logging
 import requests
-from bs4 import BeautifulSoup
+from .serp import serp_items
 from typing import List, Dict, Optional
 import time
 import random
@@ -63,21 +63,14 @@ class Parser:
                 if not html:
                     continue
 
-                soup = BeautifulSoup(html, 'html.parser')
-                search_results = soup.find_all('div', {'class': 'serp-item'})
+                search_results = serp_items(html, 'div.serp-item', 'a.link')
 
                 for item in search_results:
                     if len(results) >= limit:
                         break
 
                     try:
-                        link = item.find('a', {'class': 'link'})
-                        if not link:
-                            continue
-
-                        url = link.get('href')
-                        if not url:
-                            continue
+                        url = item['url']
 
                         # Получаем HTML-контент найденной страницы
                         html_content = self.get_page_content(url)
@@ -87,7 +80,7 @@ class Parser:
 
                         result = {
                             'url': url,
-                            'title': link.text.strip(),
+                            'title': item['title'],
                             'html_content': html_content
                         }
                         results.append(result)
@@ -123,20 +116,15 @@ class Parser:
                 if not html:
                     continue
 
-                soup = BeautifulSoup(html, 'html.parser')
-                search_results = soup.find_all('div', {'class': 'g'})
+                search_results = serp_items(html, 'div.g', 'a')
 
                 for item in search_results:
                     if len(results) >= limit:
                         break
 
                     try:
-                        link = item.find('a')
-                        if not link:
-                            continue
-
-                        url = link.get('href')
-                        if not url or not url.startswith('http'):
+                        url = item['url']
+                        if not url.startswith('http'):
                             continue
 
                         # Получаем HTML-контент найденной страницы
@@ -147,7 +135,7 @@ class Parser:
 
                         result = {
                             'url': url,
-                            'title': link.text.strip(),
+                            'title': item['title'],
                             'html_content': html_content
                         }
                         results.append(result)
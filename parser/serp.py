@@ -0,0 +1,35 @@
+import re
+from typing import Dict, List, Optional
+from selectolax.lexbor import LexborHTMLParser as HTMLParser, LexborNode as Node
+
+_WHITESPACE_REGEX = re.compile(r'\s+')
+
+def node_text(node: Optional[Node]) -> str:
+    """Возвращает текст узла без лишних пробелов (пустую строку, если узла нет)."""
+    if node is None:
+        return ""
+    return _WHITESPACE_REGEX.sub(' ', node.text(deep=True, separator=' ')).strip()
+
+def serp_items(html: str, item_selector: str, link_selector: str = "a",
+               title_selector: Optional[str] = None) -> List[Dict[str, str]]:
+    """
+    Извлекает результаты поисковой выдачи (selectolax с движком lexbor).
+
+    Args:
+        html: HTML страницы выдачи
+        item_selector: CSS-селектор блока одного результата
+        link_selector: CSS-селектор ссылки внутри блока
+        title_selector: CSS-селектор заголовка (по умолчанию текст ссылки)
+
+    Returns:
+        List[Dict[str, str]]: Результаты с ключами url и title (без пустых ссылок)
+    """
+    items = []
+    for item in HTMLParser(html or "").css(item_selector):
+        link = item.css_first(link_selector)
+        url = (link.attributes.get("href") or "") if link else ""
+        if not url:
+            continue
+        title = node_text(item.css_first(title_selector)) if title_selector else node_text(link)
+        items.append({"url": url, "title": title})
+    return items
@@ -6,7 +6,7 @@ setup(
     packages=find_packages(),
     install_requires=[
         "requests>=2.31.0",
-        "beautifulsoup4>=4.12.0",
+        "selectolax>=0.3.17",
         "lxml>=4.9.0",
         "pathlib>=1.0.1"
     ],